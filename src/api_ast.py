@@ -1,7 +1,7 @@
 from pathlib import Path
 from service import analyze_path, export_json
 from logger import logger
-from embeddings import export_tokens_as_json
+from embeddings import export_tokens_from_result
 
 result = analyze_path(
     Path("exemplos/exemplos_curtos"),
@@ -16,7 +16,5 @@ tnodes = first.tnodes
 logger.debug("Exporting JSON to ast.json")
 export_json(result, "ast.json")
 
-ast_json_path = "ast.json"
-
-logger.info(f"Lendo AST de {ast_json_path}")
-export_tokens_as_json(ast_json_path)
\ No newline at end of file
+logger.info("Gerando tokens a partir do resultado em memória")
+export_tokens_from_result(result, "ast_tokens.json")
\ No newline at end of file
@@ -4,3 +4,5 @@ from astcore.errors import PluginError, PassDependencyError, PassRegistrationErr
 from astcore.model import TNode, Ctx
 from astcore.phase import Phase 
 from astcore.walker import walk_module
+from astcore.memo import PassMemo
+from astcore.selectors import Selector
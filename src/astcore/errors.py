@@ -1,9 +1,6 @@
-from logger import logger
-
 class PluginError(Exception):
-    """Base class for plugin-related errors."""
+    """Base class for plugin-related errors (logged where handled: loader/registry, not here)."""
     def __init__(self, message="Plugin error occurred"):
-        logger.error(message)
         super().__init__(message)
     
 
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import ast
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .model import TNode
+
+# Only definitions are memoized: they are the subtrees that get duplicated
+# (vendored copies, generated clients, copy-pasted helpers).
+MEMO_NODE_TYPES: tuple[type[ast.AST], ...] = (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+def structural_hash(n: ast.AST) -> bytes:
+    """Hash of the subtree shape and values, ignoring positions (lineno/col_offset)."""
+    dumped = ast.dump(n, annotate_fields=False, include_attributes=False)
+    return hashlib.blake2b(dumped.encode("utf-8"), digest_size=16).digest()
+
+class PassMemo:
+    """
+    Bounded LRU of pure pass results, keyed by (pass name, structural hash).
+    Stores a copy of the fields a pass `provides` and replays them on identical subtrees.
+    Safe to share between threads (one lock around the LRU; copies are made outside it).
+    """
+    def __init__(self, maxsize: int = 4096):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, bytes], dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, pass_name: str, key: bytes) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get((pass_name, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((pass_name, key))
+            self.hits += 1
+            return entry
+
+    def store(self, pass_name: str, key: bytes, t: TNode, fields: tuple[str, ...]) -> None:
+        entry = {f: copy.deepcopy(getattr(t, f)) for f in fields}
+        with self._lock:
+            self._entries[(pass_name, key)] = entry
+            self._entries.move_to_end((pass_name, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def replay(entry: dict[str, Any], t: TNode) -> None:
+        for f, v in entry.items():
+            setattr(t, f, copy.deepcopy(v))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "size": size,
+            "maxsize": self.maxsize,
+            "hit_rate": (hits / total) if total else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
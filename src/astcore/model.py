@@ -15,9 +15,25 @@ class Ctx:
     # Space for plugins to store temporary data
     scratch: dict[str, Any] = field(default_factory=dict)
 
+@dataclass(frozen=True, slots=True)
+class DetachedNode:
+    """Fica no lugar de TNode.py_node depois de detach: só o tipo e os campos do nó, sem a subárvore."""
+    type: str
+    fields: tuple[str, ...]
+
+_DETACHED: dict[type, DetachedNode] = {}
+
+def detached_node(n: ast.AST) -> DetachedNode:
+    """Stub compartilhado por classe de nó (um objeto por tipo, não por nó)."""
+    cls = type(n)
+    stub = _DETACHED.get(cls)
+    if stub is None:
+        stub = _DETACHED[cls] = DetachedNode(cls.__name__, tuple(getattr(n, "_fields", ())))
+    return stub
+
 @dataclass
 class TNode:
-    py_node: ast.AST
+    py_node: ast.AST | DetachedNode
     lineno: Optional[int] = None
     end_lineno: Optional[int] = None
 
@@ -61,3 +77,9 @@ class TNode:
     module: str | None = None          # path_info
     depth: int = 0                     # path_info
     ext: str | None = None             # path_info
+
+    @property
+    def node_type(self) -> str:
+        """Nome da classe do nó ast (também depois de detach)."""
+        py = self.py_node
+        return py.type if isinstance(py, DetachedNode) else type(py).__name__
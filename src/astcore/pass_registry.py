@@ -1,12 +1,14 @@
 from __future__ import annotations
 import ast
+import threading
 from dataclasses import dataclass, field
 from heapq import heappush, heappop
 from typing import Callable, Iterable, Optional, Protocol, Any, TYPE_CHECKING
 
 from .model import TNode, Ctx
 from .phase import Phase
-from .errors import PassDependencyError
+from .errors import PassDependencyError, PassRegistrationError
+from .selectors import Selector
 
 from logger import logger
 
@@ -14,19 +16,26 @@ from logger import logger
 class PassFn(Protocol):
     def __call__(self, tnode: TNode, n: ast.AST, ctx: Ctx) -> None: ...
 
+class BatchPassFn(Protocol):
+    """Batch pass: recebe de uma vez todos os (TNode, nó) do arquivo que casam com node_types/when."""
+    def __call__(self, items: list[tuple[TNode, ast.AST]], ctx: Ctx) -> None: ...
+
 WhenFn = Callable[[TNode, ast.AST, Ctx], bool]
 
 @dataclass(order=True)
 class PassSpec:
     sort_index: tuple[int, str] = field(init=False, repr=False)
     name: str
-    fn: PassFn
+    fn: PassFn | BatchPassFn
     requires: tuple[str, ...] 
     phase: Phase = Phase.ENRICH
     order: int = 100
     node_types: tuple[type[ast.AST], ...] = (ast.AST,) # enquais nós roda
     when: Optional[WhenFn] = None
     provides: tuple[str, ...] = () # campos que este pass garante
+    pure: bool = False # resultado depende só da subárvore (sem ctx stacks/paths) -> memoizável
+    batch: bool = False # roda depois da travessia, uma chamada por arquivo com todos os nós do tipo
+    selector: Optional[Selector] = None # só os nós que casam (índice do arquivo) chegam ao pass
 
     def __post_init__(self):
         self.sort_index = (self.order, self.name) 
@@ -40,21 +49,91 @@ class PassSpec:
                 raise TypeError(f"invalid node_type: {t}")
         if len(set(self.provides)) != len(self.provides):
             raise ValueError(f"Provides list contains duplicates: {self.provides}")
+        if self.pure and not self.provides:
+            raise ValueError(f"Pure pass '{self.name}' must declare the fields it provides")
+        if self.batch and self.phase not in (Phase.ENRICH, Phase.POST):
+            # um batch PRE rodaria depois de todo o ENRICH: a ordem das fases se perderia
+            raise PassRegistrationError(f"Batch pass '{self.name}' must be ENRICH or POST, not {self.phase.value}")
+        if self.selector is not None and not isinstance(self.selector, Selector):
+            raise TypeError(f"invalid selector for pass '{self.name}': {self.selector!r}")
+
+@dataclass
+class PhasePlan:
+    """
+    Passes of one phase in topological order, split into per-node and batch passes.
+    `for_type` caches, per concrete AST class, the per-node passes whose node_types match it;
+    `for_node` also drops the passes with a selector unless the node is among their matches.
+    """
+    node: list[PassSpec]
+    batch: list[PassSpec]
+    selective: list[PassSpec] = field(default_factory=list)   # passes com selector (node e batch)
+    _by_type: dict[type, list[PassSpec]] = field(default_factory=dict, repr=False)
+    _plain_by_type: dict[type, list[PassSpec]] = field(default_factory=dict, repr=False)
+
+    def for_type(self, cls: type) -> list[PassSpec]:
+        specs = self._by_type.get(cls)
+        if specs is None:
+            # corrida entre threads só recalcula a mesma lista; setdefault fica com a primeira
+            specs = self._by_type.setdefault(cls, [s for s in self.node if issubclass(cls, s.node_types)])
+        return specs
+
+    def for_node(self, cls: type, hits: Optional[set[str]]) -> list[PassSpec]:
+        """Per-node passes for a node of `cls` whose selector matches are `hits` (pass names)."""
+        if hits:
+            return [s for s in self.for_type(cls) if s.selector is None or s.name in hits]
+        specs = self._plain_by_type.get(cls)
+        if specs is None:
+            specs = self._plain_by_type.setdefault(cls, [s for s in self.for_type(cls) if s.selector is None])
+        return specs
 
 class PassRegistry:
+    """
+    Passes by phase. Registration and plan building take a lock, so threads analyzing files
+    can share the registry; a plan already handed out is immutable apart from its type cache.
+    """
     def __init__(self):
         self._passes: dict[Phase, list[PassSpec]] = {p: [] for p in Phase}
         self._index: dict[str, PassSpec] = {}
+        self._plans: dict[Phase, PhasePlan] = {}
+        self._lock = threading.RLock()
 
     def register(self, spec: PassSpec) -> None:
-        if spec.name in self._index:
-            raise ValueError(f"Pass with name '{spec.name}' is already registered")
-        self._index[spec.name] = spec
-        self._passes[spec.phase].append(spec)
-        self._passes[spec.phase].sort()
+        with self._lock:
+            if spec.name in self._index:
+                raise ValueError(f"Pass with name '{spec.name}' is already registered")
+            self._index[spec.name] = spec
+            self._passes[spec.phase] = sorted(self._passes[spec.phase] + [spec])
+            self._plans = {}
 
     def get_for_phase(self, phase: Phase) -> list[PassSpec]:
         return list(self._passes[phase])
+
+    def plan(self, phase: Phase) -> PhasePlan:
+        """Ordered passes of a phase; computed once and reused until a new pass is registered."""
+        plan = self._plans.get(phase)
+        if plan is not None:
+            return plan
+        with self._lock:
+            plan = self._plans.get(phase)
+            if plan is not None:
+                return plan
+            try:
+                ordered = self.topological(self._passes[phase])
+                batch_names = {s.name for s in ordered if s.batch}
+                for s in ordered:
+                    bad = [r for r in s.requires if r in batch_names]
+                    if bad and not s.batch:
+                        # batch passes só rodam depois da travessia: um pass por nó nunca veria o resultado
+                        raise PassDependencyError(f"Per-node pass '{s.name}' cannot require batch passes {bad}")
+            except PassDependencyError as e:
+                logger.error(f"Cannot plan {phase.value} passes: {e}")
+                raise
+            plan = self._plans[phase] = PhasePlan(
+                node=[s for s in ordered if not s.batch],
+                batch=[s for s in ordered if s.batch],
+                selective=[s for s in ordered if s.selector is not None],
+            )
+            return plan
     
     def topological(self, specs: Iterable[PassSpec]) -> list[PassSpec]:
         """Return the passes sorted topologically according to dependencies and order."""
@@ -128,11 +207,30 @@ def register_pass(
     node_types: tuple[type[ast.AST], ...] = (ast.AST,),
     when: Optional[WhenFn] = None,
     provides: tuple[str, ...] = (),
+    pure: bool = False,
+    batch: bool = False,
+    selector: Optional[Selector] = None,
 ) -> Callable[[PassFn], PassFn]:
+    """
+    Registers a pass. By default `fn(tnode, n, ctx)` runs on each matching node during traversal.
+    With `batch=True`, `fn(items, ctx)` runs once per file after traversal with every matching
+    `(TNode, ast node)` pair in traversal order; ctx.class_stack/func_stack are empty by then.
+    Only ENRICH and POST passes can be batch. Batch passes follow the same requires/provides
+    ordering and may require per-node passes of their phase, but per-node passes cannot
+    require batch ones.
+    Phase order holds across batch passes: after the traversal (PRE and ENRICH per node) come
+    the ENRICH batch passes, then the POST per-node passes in a second sweep (exit order, empty
+    ctx stacks), then the POST batch passes.
+    `selector` (astcore.selectors.Selector: decorator, base class, has_comment, name regex) is
+    resolved per file against an index built before the traversal: nodes it does not match are
+    never dispatched to the pass. Unlike `when`, it costs nothing per node; `when` still applies
+    to the matches.
+    """
     def deco(fn: PassFn):
         REGISTRY.register(PassSpec(
             name=name, fn=fn, phase=phase, order=order,
-            requires=requires, node_types=node_types, when=when, provides=provides
+            requires=requires, node_types=node_types, when=when, provides=provides,
+            pure=pure, batch=batch, selector=selector,
         ))
         return fn
     return deco
\ No newline at end of file
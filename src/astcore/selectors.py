@@ -0,0 +1,122 @@
+from __future__ import annotations
+import ast
+import re
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from .model import Ctx
+from utils import decorator_to_str, dotted_names
+
+Names = Union[str, tuple[str, ...]]
+
+DEF_TYPES: tuple[type[ast.AST], ...] = (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+def _as_tuple(v: Optional[Names]) -> tuple[str, ...]:
+    if v is None:
+        return ()
+    return (v,) if isinstance(v, str) else tuple(v)
+
+@dataclass(frozen=True)
+class Selector:
+    """
+    Declarative filter of a pass, evaluated against the per-file FileIndex (see select_nodes).
+    Every criterion given must hold:
+    - decorator: one of these decorators, ignoring arguments ("lru_cache" or "functools.lru_cache";
+      a bare name also matches the last dotted part)
+    - base: one of these base classes, same matching (Generic[T] -> "Generic")
+    - has_comment: a comment inside the node's lines (decorators included) or right above it
+      (True), or none (False)
+    - name: regex that must match the whole name (re.fullmatch); only classes/functions have names
+    decorator/base/name only select classes and functions.
+    """
+    decorator: Optional[Names] = None
+    base: Optional[Names] = None
+    has_comment: Optional[bool] = None
+    name: Optional[str] = None
+    _name_re: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "decorator", _as_tuple(self.decorator) or None)
+        object.__setattr__(self, "base", _as_tuple(self.base) or None)
+        if self.name is not None:
+            object.__setattr__(self, "_name_re", re.compile(self.name))
+        if self.decorator is None and self.base is None and self.has_comment is None and self.name is None:
+            raise ValueError("Selector needs at least one criterion")
+
+@dataclass
+class FileIndex:
+    """
+    What selectors look at, built once per file from the parsed tree: definitions by decorator,
+    base class and name (full dotted string and last part), nodes with a position, and the
+    comment lines. Only built when some registered pass has a selector.
+    """
+    decorators: dict[str, list[ast.AST]] = field(default_factory=dict)
+    bases: dict[str, list[ast.AST]] = field(default_factory=dict)
+    names: dict[str, list[ast.AST]] = field(default_factory=dict)
+    positioned: list[ast.AST] = field(default_factory=list)
+    comment_lines: list[int] = field(default_factory=list)   # ordenadas
+    own_line_comments: set[int] = field(default_factory=set)  # linhas só com comentário
+
+    @classmethod
+    def build(cls, tree: ast.AST, ctx: Ctx) -> "FileIndex":
+        idx = cls()
+        for n in ast.walk(tree):
+            if getattr(n, "lineno", None) is not None:
+                idx.positioned.append(n)
+            if not isinstance(n, DEF_TYPES):
+                continue
+            idx.names.setdefault(n.name, []).append(n)
+            for d in n.decorator_list:
+                _add_dotted(idx.decorators, decorator_to_str(d), n)
+            if isinstance(n, ast.ClassDef):
+                for b in n.bases:
+                    _add_dotted(idx.bases, decorator_to_str(b), n)
+        idx.comment_lines = sorted(ctx.comments_by_line)
+        for ln, comms in ctx.comments_by_line.items():
+            line = ctx.lines[ln - 1] if 0 < ln <= len(ctx.lines) else ""
+            if any(not line[: c.get("col", 0)].strip() for c in comms):
+                idx.own_line_comments.add(ln)
+        return idx
+
+    def has_comment(self, n: ast.AST) -> bool:
+        first = getattr(n, "lineno", None)
+        if first is None:
+            return False
+        for d in getattr(n, "decorator_list", ()):
+            first = min(first, d.lineno)
+        last = getattr(n, "end_lineno", None) or first
+        i = bisect_left(self.comment_lines, first)
+        if i < len(self.comment_lines) and self.comment_lines[i] <= last:
+            return True
+        return (first - 1) in self.own_line_comments
+
+def _add_dotted(index: dict[str, list[ast.AST]], dotted: str, n: ast.AST) -> None:
+    for key in dotted_names(dotted):
+        bucket = index.setdefault(key, [])
+        if not bucket or bucket[-1] is not n:
+            bucket.append(n)
+
+def _lookup(index: dict[str, list[ast.AST]], keys: tuple[str, ...]) -> dict[int, ast.AST]:
+    return {id(n): n for k in keys for n in index.get(k, ())}
+
+def select_nodes(sel: Selector, idx: FileIndex, node_types: tuple[type[ast.AST], ...]) -> set[int]:
+    """ids of the nodes of `node_types` that `sel` matches, answered from the index."""
+    cands: Optional[dict[int, ast.AST]] = None
+    for keys, index in ((sel.decorator, idx.decorators), (sel.base, idx.bases)):
+        if keys is not None:
+            found = _lookup(index, keys)
+            cands = found if cands is None else {k: v for k, v in cands.items() if k in found}
+    if sel._name_re is not None:
+        # regex uma vez por nome distinto, não por nó
+        found = {id(n): n for name, ns in idx.names.items() if sel._name_re.fullmatch(name) for n in ns}
+        cands = found if cands is None else {k: v for k, v in cands.items() if k in found}
+    nodes = cands.values() if cands is not None else idx.positioned
+    out = set()
+    for n in nodes:
+        if not isinstance(n, node_types):
+            continue
+        if sel.has_comment is not None and idx.has_comment(n) != sel.has_comment:
+            continue
+        out.add(id(n))
+    return out
@@ -1,52 +1,140 @@
 from __future__ import annotations
 import ast
-from typing import Iterable
+import logging
+from itertools import chain
+from typing import Iterable, Optional
+from .memo import PassMemo, MEMO_NODE_TYPES, structural_hash
 from .model import TNode, Ctx
-from .pass_registry import REGISTRY
+from .pass_registry import REGISTRY, PassRegistry, PassSpec
 from .phase import Phase
+from .selectors import FileIndex, select_nodes
 from .traversal import Event
 from .strategy_factory import get_strategy, StrategyName
 
 from logger import logger
 
-def _run_passes_for_node(phase: Phase, t: TNode, n: ast.AST, ctx: Ctx) -> None:
-    """Run all registered passes for a given node and phase."""
-    ordered_specs = REGISTRY.topological(REGISTRY.get_for_phase(phase))
-    
-    for s in ordered_specs:
-        if not isinstance(n, s.node_types):    
-            continue
+def _run_passes_for_node(specs: list[PassSpec], t: TNode, n: ast.AST, ctx: Ctx,
+                         memo: Optional[PassMemo] = None, key: Optional[bytes] = None) -> None:
+    """Run the per-node passes of a phase (already filtered by node type) on a node."""
+    for s in specs:
         if s.when and not s.when(t, n, ctx):
             continue
+        if memo is not None and key is not None and s.pure:
+            entry = memo.lookup(s.name, key)
+            if entry is not None:
+                memo.replay(entry, t)
+                continue
+            s.fn(t, n, ctx)
+            memo.store(s.name, key, t, s.provides)
+            continue
         s.fn(t, n, ctx)
 
-def walk_module(root: ast.AST, ctx: Ctx, strategy: StrategyName) -> list[TNode]:
-    """Walk the AST rooted at `root`, applying registered passes."""
+def _select(specs: list[PassSpec], root: ast.AST, ctx: Ctx) -> dict[int, set[str]]:
+    """id(node) -> names of the passes whose selector matches it, from one index of the file."""
+    hits: dict[int, set[str]] = {}
+    if not specs:
+        return hits
+    idx = FileIndex.build(root, ctx)
+    for s in specs:
+        for i in select_nodes(s.selector, idx, s.node_types):
+            hits.setdefault(i, set()).add(s.name)
+    return hits
+
+def _run_batch_passes(specs: list[PassSpec], tnodes: list[TNode], ctx: Ctx,
+                      memo: Optional[PassMemo], keys: dict[int, bytes], hits: dict[int, set[str]]) -> None:
+    """Run batch passes over the whole file: one call per pass with its (TNode, node) pairs."""
+    by_type: dict[type, list[int]] = {}
+    for i, t in enumerate(tnodes):
+        by_type.setdefault(type(t.py_node), []).append(i)
+    for s in specs:
+        lists = [idx for cls, idx in by_type.items() if issubclass(cls, s.node_types)]
+        order = lists[0] if len(lists) == 1 else sorted(chain.from_iterable(lists))
+        items = [(tnodes[i], tnodes[i].py_node) for i in order]
+        if s.selector is not None:
+            items = [(t, n) for t, n in items if s.name in hits.get(id(n), ())]
+        if s.when:
+            items = [(t, n) for t, n in items if s.when(t, n, ctx)]
+        misses: list[tuple[TNode, bytes]] = []
+        if memo is not None and s.pure:
+            todo = []
+            for t, n in items:
+                key = keys.get(id(n))
+                if key is None:
+                    todo.append((t, n))
+                    continue
+                entry = memo.lookup(s.name, key)
+                if entry is not None:
+                    memo.replay(entry, t)
+                else:
+                    todo.append((t, n))
+                    misses.append((t, key))
+            items = todo
+        if items:
+            s.fn(items, ctx)
+        for t, key in misses:
+            memo.store(s.name, key, t, s.provides)
+
+def walk_module(root: ast.AST, ctx: Ctx, strategy: StrategyName, memo: Optional[PassMemo] = None,
+                registry: Optional[PassRegistry] = None) -> list[TNode]:
+    """
+    Walk the AST rooted at `root`, applying registered passes.
+    If `memo` is given, results of pure passes on definitions are reused across identical subtrees.
+    POST passes run after the traversal, once the ENRICH batch passes are done (see register_pass).
+    Passes with a selector only see the nodes it matches in this file's FileIndex.
+    `registry` replaces the global REGISTRY (e.g. to run only a subset of passes).
+    """
+    registry = registry if registry is not None else REGISTRY
     tnodes: list[TNode] = []
     t_by_id: dict[int, TNode] = {}
+    keys: dict[int, bytes] = {}
+    exited: list[TNode] = []   # ordem de saída, para o sweep de POST
+    # ordem dos passes resolvida uma vez por arquivo, não por nó
+    pre, enrich, post = registry.plan(Phase.PRE), registry.plan(Phase.ENRICH), registry.plan(Phase.POST)
+    # índice só quando algum pass tem selector; sem isso hits fica vazio e nada muda por nó
+    hits = _select(pre.selective + enrich.selective + post.selective, root, ctx)
     traversal_strategy = get_strategy(strategy)
+    # nível checado uma vez por arquivo: com DEBUG desligado o custo por nó é um teste de bool
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("walk %s (strategy=%s)", ctx.file_path, strategy)
     for ev, n in traversal_strategy.walk(root):
         if ev == Event.ENTER:
+            if debug:
+                logger.debug("enter %s at line %s", type(n).__name__, getattr(n, "lineno", None))
             t = TNode(py_node=n,
                       lineno=getattr(n, 'lineno', None),
                       end_lineno=getattr(n, 'end_lineno', None))
             t_by_id[id(n)] = t
+            key = structural_hash(n) if memo is not None and isinstance(n, MEMO_NODE_TYPES) else None
+            if key is not None:
+                keys[id(n)] = key
+            cls = type(n)
+            h = hits.get(id(n)) if hits else None
             # PRE 
-            _run_passes_for_node(Phase.PRE, t, n, ctx)
+            _run_passes_for_node(pre.for_node(cls, h), t, n, ctx, memo, key)
             if isinstance(n, ast.ClassDef):
                 ctx.class_stack.append(n.name)
             if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)):
                 ctx.func_stack.append(n.name)
             # ENRICH
-            _run_passes_for_node(Phase.ENRICH, t, n, ctx)
+            _run_passes_for_node(enrich.for_node(cls, h), t, n, ctx, memo, key)
             tnodes.append(t)
         else:  
             # EXIT
-            t = t_by_id[id(n)]
-            # POST 
-            _run_passes_for_node(Phase.POST, t, n, ctx)
+            exited.append(t_by_id[id(n)])
             if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)):
                 ctx.func_stack.pop()
             if isinstance(n, ast.ClassDef):
                 ctx.class_stack.pop()
-    return tnodes
\ No newline at end of file
+    if enrich.batch:
+        _run_batch_passes(enrich.batch, tnodes, ctx, memo, keys, hits)
+    # POST só depois de todo o ENRICH (inclusive batch)
+    if post.node:
+        for t in exited:
+            n = t.py_node
+            _run_passes_for_node(post.for_node(type(n), hits.get(id(n)) if hits else None), t, n, ctx)
+    if post.batch:
+        _run_batch_passes(post.batch, tnodes, ctx, memo, keys, hits)
+    if debug:
+        logger.debug("walked %s: %d nodes", ctx.file_path, len(tnodes))
+    return tnodes
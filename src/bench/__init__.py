@@ -0,0 +1,3 @@
+"""
+Benchmarks and performance budgets (run from src/, e.g. `python -m bench.startup`).
+"""
@@ -0,0 +1,271 @@
+"""
+Micro-benchmark of individual passes: times only one pass's function over every node it
+would run on in a corpus, and compares ns/node and memory/node with a stored baseline.
+
+Setup (not timed): each file is parsed once and walked with only the pass's `requires`
+closure; a recorder sitting at the pass's position in the pipeline captures each matching
+node (after `when`) with a copy of the ctx stacks, or the whole (TNode, node) list for a batch
+pass. Each round then calls the pass on fresh copies of those TNodes.
+Memory comes from one extra round under tracemalloc: "retained" is the blocks/bytes still held
+after it (what the pass leaves on the nodes); "peak" is, for each call, the high-water mark of
+traced bytes above what was live before the call (temporaries the pass makes and frees: regex
+matches, split lists, unparse strings), summed over the calls. Both are divided by the nodes.
+
+Usage (from src/):
+    python -m bench.passes [PATH] [--pass NAME ...] [--rounds 5] [--plugins MODULE ...]
+                           [--baseline bench/passes_baseline.json] [--threshold 0.25] [--save-baseline]
+"""
+from __future__ import annotations
+import argparse
+import ast
+import copy
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from astcore.model import Ctx, TNode
+from astcore.pass_registry import REGISTRY, PassRegistry, PassSpec
+from astcore.phase import Phase
+from astcore.walker import walk_module
+from discovery import iter_py_files
+from pass_plugins.loader import load_pass_plugins
+from service import _read_text
+from utils import collect_comments, comments_by_line
+
+DEFAULT_PATH = Path(json.__file__).resolve().parents[1] / "email"   # stdlib: ~30 arquivos reais
+DEFAULT_BASELINE = Path(__file__).resolve().with_name("passes_baseline.json")
+_RECORDER = "__bench_recorder__"
+
+@dataclass
+class ParsedFile:
+    path: Path
+    tree: ast.AST
+    lines: List[str]
+    comments_by_line: Dict[int, list]
+
+@dataclass
+class PassResult:
+    name: str
+    nodes: int
+    ns_per_node: float        # mediana das rodadas
+    best_ns_per_node: float   # melhor rodada: o que vai para o baseline e é comparado
+    retained_blocks_per_node: float   # blocos ainda vivos após o pass, por nó
+    retained_bytes_per_node: float
+    peak_bytes_per_node: float        # pico transitório de cada chamada (inclui o que é liberado), por nó
+
+def parse_corpus(path: Path) -> List[ParsedFile]:
+    out = []
+    for f in iter_py_files(path):
+        src = _read_text(f)
+        try:
+            tree = ast.parse(src)
+        except SyntaxError:
+            continue
+        out.append(ParsedFile(f, tree, src.splitlines(), comments_by_line(collect_comments(src))))
+    return out
+
+def _registered() -> Dict[str, PassSpec]:
+    return {s.name: s for phase in Phase for s in REGISTRY.get_for_phase(phase)}
+
+def _closure(spec: PassSpec) -> List[PassSpec]:
+    """Os passes de que `spec` depende (transitivamente), sem o próprio."""
+    index = _registered()
+    seen: Dict[str, PassSpec] = {}
+    todo = list(spec.requires)
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen[name] = index[name]
+        todo.extend(index[name].requires)
+    return list(seen.values())
+
+def _setup(spec: PassSpec, corpus: Sequence[ParsedFile], root: Path) -> List[tuple]:
+    """Walks the corpus with the requires closure; returns the recorded calls of `spec`."""
+    calls: List[tuple] = []
+    registry = PassRegistry()
+    for s in _closure(spec):
+        registry.register(s)
+
+    if spec.batch:
+        def record(items: list, ctx: Ctx) -> None:
+            items = [(t, n) for t, n in items if spec.when is None or spec.when(t, n, ctx)]
+            if items:
+                calls.append((items, ctx))
+    else:
+        def record(t: TNode, n: ast.AST, ctx: Ctx) -> None:
+            if spec.when is None or spec.when(t, n, ctx):
+                calls.append((t, n, replace(ctx, class_stack=list(ctx.class_stack), func_stack=list(ctx.func_stack))))
+
+    registry.register(PassSpec(
+        name=_RECORDER, fn=record, requires=spec.requires, phase=spec.phase, order=spec.order,
+        node_types=spec.node_types, batch=spec.batch, selector=spec.selector,
+    ))
+    for pf in corpus:
+        ctx = Ctx(lines=pf.lines, comments_by_line=pf.comments_by_line, root_path=root, file_path=pf.path)
+        walk_module(pf.tree, ctx, strategy="recursive_pre", registry=registry)
+    return calls
+
+def _fresh(t: TNode, fields: Sequence[str]) -> TNode:
+    # cópia rasa + campos que o pass escreve no estado de antes dele (listas novas a cada rodada)
+    t2 = copy.copy(t)
+    for f in fields:
+        setattr(t2, f, copy.deepcopy(getattr(t, f)))
+    return t2
+
+def _round(spec: PassSpec, calls: List[tuple]) -> Callable[[], int]:
+    """Prepara cópias novas (fora do tempo) e devolve a função que roda o pass sobre elas."""
+    fn, fields = spec.fn, spec.provides
+    if spec.batch:
+        batches = [([(_fresh(t, fields), n) for t, n in items], ctx) for items, ctx in calls]
+
+        def run() -> int:
+            t0 = time.perf_counter_ns()
+            for items, ctx in batches:
+                fn(items, ctx)
+            return time.perf_counter_ns() - t0
+    else:
+        items = [(_fresh(t, fields), n, ctx) for t, n, ctx in calls]
+
+        def run() -> int:
+            t0 = time.perf_counter_ns()
+            for t, n, ctx in items:
+                fn(t, n, ctx)
+            return time.perf_counter_ns() - t0
+    return run
+
+def _memory(spec: PassSpec, calls: List[tuple]) -> Tuple[int, int, int]:
+    """Uma rodada sob tracemalloc: (blocos retidos, bytes retidos, soma dos picos de cada chamada)."""
+    fn, fields = spec.fn, spec.provides
+    if spec.batch:
+        steps = [([(_fresh(t, fields), n) for t, n in items], ctx) for items, ctx in calls]
+    else:
+        steps = [(_fresh(t, fields), n, ctx) for t, n, ctx in calls]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        peaks = 0
+        for args in steps:
+            tracemalloc.reset_peak()
+            live = tracemalloc.get_traced_memory()[0]
+            fn(*args)
+            peaks += tracemalloc.get_traced_memory()[1] - live
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    return sum(d.count_diff for d in diff), sum(d.size_diff for d in diff), peaks
+
+def bench_pass(name: str, corpus: Sequence[ParsedFile], root: Path, rounds: int = 5) -> PassResult:
+    spec = _registered().get(name)
+    if spec is None:
+        raise SystemExit(f"unknown pass: {name}")
+    calls = _setup(spec, corpus, root)
+    nodes = sum(len(c[0]) for c in calls) if spec.batch else len(calls)
+    per_node = max(nodes, 1)
+
+    _round(spec, calls)()   # aquecimento: caches de utils, código frio
+    times = []
+    for _ in range(rounds):
+        run = _round(spec, calls)
+        gc.disable()   # como o timeit: coletas no meio da rodada viram ruído
+        try:
+            times.append(run())
+        finally:
+            gc.enable()
+
+    blocks, size, peaks = _memory(spec, calls)
+
+    return PassResult(
+        name=name,
+        nodes=nodes,
+        ns_per_node=statistics.median(times) / per_node,
+        best_ns_per_node=min(times) / per_node,
+        retained_blocks_per_node=blocks / per_node,
+        retained_bytes_per_node=size / per_node,
+        peak_bytes_per_node=peaks / per_node,
+    )
+
+def compare(results: Sequence[PassResult], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Regressions against the baseline: best ns/node, retained blocks/node or peak bytes/node above
+    baseline * (1 + threshold). Metrics missing from an older baseline are skipped.
+    """
+    failures = []
+    for r in results:
+        base = baseline.get("passes", {}).get(r.name)
+        if base is None:
+            continue
+        if r.best_ns_per_node > base["ns_per_node"] * (1 + threshold):
+            failures.append(f"{r.name}: {r.best_ns_per_node:.0f} ns/node > baseline {base['ns_per_node']:.0f} (+{threshold:.0%})")
+        # folgas absolutas (+0.05 bloco, +16 bytes por nó): ruído do tracemalloc com poucos nós
+        if "retained_blocks_per_node" in base and \
+                r.retained_blocks_per_node > base["retained_blocks_per_node"] * (1 + threshold) + 0.05:
+            failures.append(f"{r.name}: {r.retained_blocks_per_node:.2f} retained blocks/node > baseline "
+                            f"{base['retained_blocks_per_node']:.2f} (+{threshold:.0%})")
+        if "peak_bytes_per_node" in base and r.peak_bytes_per_node > base["peak_bytes_per_node"] * (1 + threshold) + 16:
+            failures.append(f"{r.name}: {r.peak_bytes_per_node:.0f} peak bytes/node > baseline "
+                            f"{base['peak_bytes_per_node']:.0f} (+{threshold:.0%})")
+    return failures
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", nargs="?", type=Path, default=DEFAULT_PATH, help="corpus (file or directory)")
+    parser.add_argument("--pass", dest="passes", action="append", default=[], metavar="NAME",
+                        help="pass to measure (repeatable; default: every registered pass)")
+    parser.add_argument("--plugins", action="append", default=[], metavar="MODULE",
+                        help="pass plugin module to load (default: pass_plugins.builtin)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression (0.25 = +25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    load_pass_plugins(args.plugins or ["pass_plugins.builtin"])
+    names = args.passes or list(_registered())
+    root = args.path.resolve()
+    t0 = time.perf_counter()
+    corpus = parse_corpus(root)
+    print(f"corpus     {len(corpus)} files parsed in {time.perf_counter() - t0:.2f} s ({root})")
+
+    baseline: Dict[str, Any] = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    results = [bench_pass(n, corpus, root, args.rounds) for n in names]
+    print(f"{'pass':24} {'nodes':>7} {'ns/node':>9} {'best':>9} {'retained blk/node':>18} "
+          f"{'retained B/node':>16} {'peak B/node':>12}  vs baseline")
+    for r in results:
+        base = baseline.get("passes", {}).get(r.name)
+        delta = f"{r.best_ns_per_node / base['ns_per_node'] - 1:+.1%}" if base and base["ns_per_node"] else "-"
+        print(f"{r.name:24} {r.nodes:7d} {r.ns_per_node:9.0f} {r.best_ns_per_node:9.0f} "
+              f"{r.retained_blocks_per_node:18.2f} {r.retained_bytes_per_node:16.1f} {r.peak_bytes_per_node:12.1f}  {delta}")
+
+    if args.save_baseline:
+        payload = {
+            "corpus": str(root),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "passes": {r.name: {"nodes": r.nodes, "ns_per_node": round(r.best_ns_per_node, 1),
+                                "retained_blocks_per_node": round(r.retained_blocks_per_node, 3),
+                                "peak_bytes_per_node": round(r.peak_bytes_per_node, 1)} for r in results},
+        }
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote      {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"no baseline at {args.baseline} (run with --save-baseline)", file=sys.stderr)
+        return 0
+    failures = compare(results, baseline, args.threshold)
+    for f in failures:
+        print(f, file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
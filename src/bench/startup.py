@@ -0,0 +1,97 @@
+"""
+Cold-start budget for the library entry points, measured with `python -X importtime`.
+
+Each entry point is imported in a fresh interpreter; the run fails if the cumulative
+import time exceeds its budget or if it pulls a module that must stay lazy (pandas,
+numpy, builtin pass plugins).
+
+Usage (from src/):
+    python -m bench.startup [--runs N] [--budget service=150000]
+"""
+from __future__ import annotations
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1]
+
+# microseconds of cumulative import time, as reported by -X importtime
+BUDGETS_US: dict[str, int] = {
+    "service": 150_000,
+    "embeddings": 100_000,
+    "embeddings.dataset": 120_000,
+}
+
+# modules that must not be imported just by importing the entry point
+LAZY: dict[str, tuple[str, ...]] = {
+    "service": ("pandas", "numpy", "pass_plugins.builtin"),
+    "embeddings": ("pandas", "numpy"),
+    "embeddings.dataset": ("pandas", "numpy"),
+}
+
+def _importtime(module: str) -> tuple[int, set[str]]:
+    """Return (cumulative us for `module`, all modules imported) from one fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative = 0
+    imported: set[str] = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not cum.isdigit():   # cabeçalho
+            continue
+        imported.add(name)
+        if name == module:
+            cumulative = int(cum)
+    return cumulative, imported
+
+def measure(module: str, runs: int = 5) -> tuple[int, set[str]]:
+    """Median cumulative import time over `runs` fresh interpreters."""
+    samples = []
+    imported: set[str] = set()
+    for _ in range(runs):
+        us, mods = _importtime(module)
+        samples.append(us)
+        imported |= mods
+    return int(statistics.median(samples)), imported
+
+def check(budgets: dict[str, int] = BUDGETS_US, runs: int = 5) -> list[str]:
+    """Return the list of violations (empty when every entry point is within budget)."""
+    failures: list[str] = []
+    for module, budget in budgets.items():
+        us, imported = measure(module, runs)
+        eager = sorted(m for m in LAZY.get(module, ()) if m in imported)
+        status = "ok" if us <= budget and not eager else "FAIL"
+        print(f"{status:4} {module:24} {us / 1000:8.1f} ms  (budget {budget / 1000:.1f} ms)")
+        if us > budget:
+            failures.append(f"{module}: {us} us > {budget} us")
+        if eager:
+            failures.append(f"{module}: imports {', '.join(eager)} eagerly")
+    return failures
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=US",
+                        help="override the budget of one entry point (microseconds)")
+    args = parser.parse_args(argv)
+
+    budgets = dict(BUDGETS_US)
+    for item in args.budget:
+        module, _, us = item.partition("=")
+        budgets[module] = int(us)
+
+    failures = check(budgets, args.runs)
+    for f in failures:
+        print(f, file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
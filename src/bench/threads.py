@@ -0,0 +1,76 @@
+"""
+Stress check for the thread-parallel mode: analyzes a tree serially once, then several times
+with `parallel="thread"` (forced even under the GIL, with a tiny switch interval so threads
+interleave inside passes and caches), and fails if any file's nodes differ from the serial run.
+
+On a free-threaded build (python3.13t) it also reports the speedup over the serial run.
+
+Usage (from src/):
+    python -m bench.threads [PATH] [--threads 8] [--rounds 3] [--chunk-size 2]
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from astcore.memo import PassMemo
+from service import AnalysisResult, analyze_path, gil_enabled
+from utils import clear_caches
+
+DEFAULT_PATH = Path(json.__file__).resolve().parents[1] / "email"   # stdlib: ~30 arquivos reais
+
+def _fingerprint(result: AnalysisResult) -> Dict[str, str]:
+    return {str(fa.file): json.dumps(list(fa.nodes_json), ensure_ascii=False) for fa in result.files}
+
+def run(path: Path, threads: int, rounds: int, chunk_size: int, switch: float) -> List[str]:
+    """Return the list of mismatches (empty when every threaded round equals the serial run)."""
+    clear_caches()
+    t0 = time.perf_counter()
+    serial = analyze_path(path, memo=PassMemo())
+    serial_s = time.perf_counter() - t0
+    expected = _fingerprint(serial)
+    order = [str(fa.file) for fa in serial.files]
+    print(f"serial      {len(order)} files in {serial_s:.2f} s (GIL {'enabled' if gil_enabled() else 'disabled'})")
+
+    failures: List[str] = []
+    old_switch = sys.getswitchinterval()
+    sys.setswitchinterval(switch)
+    try:
+        for r in range(rounds):
+            clear_caches()   # caches frios: as threads disputam os mesmos slots do LRU
+            memo = PassMemo(64)   # pequeno: força despejos concorrentes
+            t0 = time.perf_counter()
+            threaded = analyze_path(path, memo=memo, workers=threads, chunk_size=chunk_size,
+                                    parallel="thread", gil_fallback=False)
+            dt = time.perf_counter() - t0
+            got = _fingerprint(threaded)
+            if [str(fa.file) for fa in threaded.files] != order:
+                failures.append(f"round {r}: file order differs")
+            bad = [f for f in order if got.get(f) != expected[f]]
+            failures.extend(f"round {r}: {f} differs from the serial run" for f in bad)
+            print(f"round {r}     {threads} threads {dt:.2f} s (x{serial_s / dt:.2f}), "
+                  f"memo hit rate {memo.stats()['hit_rate']:.1%}, {len(bad)} mismatches")
+    finally:
+        sys.setswitchinterval(old_switch)
+    return failures
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", nargs="?", type=Path, default=DEFAULT_PATH)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=2)
+    parser.add_argument("--switch-interval", type=float, default=1e-6,
+                        help="sys.setswitchinterval while the threads run (GIL builds)")
+    args = parser.parse_args(argv)
+
+    failures = run(args.path, args.threads, args.rounds, args.chunk_size, args.switch_interval)
+    for f in failures:
+        print(f, file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+"""
+Formato binário compacto do AnalysisResult (.astb), com leitura por mmap sem cópia.
+
+Layout (little-endian):
+
+    cabeçalho   "GASTBIN1", versão u32, reservado u32
+    blocos      um por arquivo analisado, cada um autocontido e alinhado em 8 bytes:
+                  header   _BLOCK_HEADER
+                  schema   n_fields x (nome: id de string u32, tipo u32)
+                  strings  offsets u32 (n_strings + 1) + bytes UTF-8 (tabela do arquivo)
+                  records  n_nodes registros de tamanho fixo (struct do schema)
+                  pool     u32 com os ids das listas de strings (offset/len no registro)
+    índice      (offset, length) u64 por bloco
+    meta        JSON: chaves de topo do export (strategy) + caminhos dos arquivos
+    trailer     _TRAILER (offset/tamanho do índice e do meta, "GASTEND1")
+
+Tipos de campo: str (id, 0xFFFFFFFF = None), int (i32, -2**31 = None), bool (u8, 255 = None),
+strlist (offset/len no pool) e json (id da string com o valor serializado: dicts, listas mistas...).
+Um arquivo cujos nós não compartilham as mesmas chaves grava cada nó inteiro como json.
+"""
+from __future__ import annotations
+import json
+import mmap
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from utils import open_text
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SUFFIX = ".astb"
+MAGIC = b"GASTBIN1"
+END_MAGIC = b"GASTEND1"
+BLOCK_MAGIC = b"FBLK"
+VERSION = 1
+
+KIND_STR, KIND_INT, KIND_BOOL, KIND_STRLIST, KIND_JSON = range(5)
+_KIND_FMT = {KIND_STR: "I", KIND_INT: "i", KIND_BOOL: "B", KIND_STRLIST: "II", KIND_JSON: "I"}
+_KIND_DTYPE = {KIND_STR: "<u4", KIND_INT: "<i4", KIND_BOOL: "u1", KIND_JSON: "<u4"}
+RAW_FIELD = "__json__"
+
+NONE_U32 = 0xFFFFFFFF
+NONE_I32 = -(1 << 31)
+NONE_U8 = 0xFF
+
+_FILE_HEADER = struct.Struct("<8sII")
+# magic, n_nodes, n_fields, n_strings, file (id), schema_off, strings_off, records_off, record_size, pool_off, block_len
+_BLOCK_HEADER = struct.Struct("<4s10I")
+# index_off, n_files, meta_off, meta_len, magic
+_TRAILER = struct.Struct("<4Q8s")
+_LITTLE = sys.byteorder == "little"
+
+# ---------------------------
+# Escrita
+# ---------------------------
+
+_NONE_TYPE = type(None)
+_json_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+def _infer_kind(col: Sequence[Any]) -> int:
+    """Tipo de uma coluna pelos tipos dos valores (None é aceito por str/int/bool)."""
+    types = {type(v) for v in col}
+    types.discard(_NONE_TYPE)
+    if not types or types == {str}:
+        return KIND_STR
+    if types == {bool}:
+        return KIND_BOOL
+    if types == {int}:
+        ints = [v for v in col if v is not None]
+        return KIND_INT if NONE_I32 < min(ints) and max(ints) < (1 << 31) else KIND_JSON
+    if types == {list} and None not in col and all(type(x) is str for v in col for x in v):
+        return KIND_STRLIST
+    return KIND_JSON
+
+def _record_struct(kinds: Iterable[int]) -> struct.Struct:
+    return struct.Struct("<" + "".join(_KIND_FMT[k] for k in kinds))
+
+def _pad(n: int, to: int) -> int:
+    return -n % to
+
+class _StringTable(dict):
+    """str -> id na ordem de inserção."""
+    def __missing__(self, s: str) -> int:
+        i = self[s] = len(self)
+        return i
+
+def encode_block(file: str, nodes: Sequence[Dict[str, Any]]) -> bytes:
+    """Codifica os nós de um arquivo (forma de nodes_json) num bloco autocontido."""
+    keys = tuple(nodes[0]) if nodes else ()
+    if all(tuple(n) == keys for n in nodes):
+        cols = list(zip(*(n.values() for n in nodes))) if keys else []
+    else:
+        keys = (RAW_FIELD,)
+        cols = [list(nodes)]
+    kinds = [_infer_kind(c) for c in cols] if keys != (RAW_FIELD,) else [KIND_JSON]
+
+    strings = _StringTable()
+    file_sid = strings[file]
+    schema = array("I")
+    for k, kind in zip(keys, kinds):
+        schema.extend((strings[k], kind))
+
+    # codifica coluna a coluna e depois intercala as colunas nos registros
+    pool = array("I")
+    encoded: List[Iterable[int]] = []
+    for col, kind in zip(cols, kinds):
+        if kind == KIND_STR:
+            encoded.append([NONE_U32 if v is None else strings[v] for v in col])
+        elif kind == KIND_INT:
+            encoded.append([NONE_I32 if v is None else v for v in col])
+        elif kind == KIND_BOOL:
+            encoded.append([NONE_U8 if v is None else int(v) for v in col])
+        elif kind == KIND_STRLIST:
+            lengths = [len(v) for v in col]
+            starts = list(accumulate(lengths[:-1], initial=len(pool)))
+            pool.extend([strings[x] for v in col for x in v])
+            encoded.append(starts)
+            encoded.append(lengths)
+        else:
+            encoded.append([strings[_json_encode(v)] for v in col])
+
+    rec = _record_struct(kinds)
+    records = bytearray(rec.size * len(nodes))
+    pack_into = rec.pack_into
+    for j, row in enumerate(zip(*encoded)):
+        pack_into(records, j * rec.size, *row)
+
+    raw = [s.encode("utf-8") for s in strings]
+    offsets = array("I", [0])
+    total = 0
+    for b in raw:
+        total += len(b)
+        offsets.append(total)
+    blob = b"".join(raw)
+
+    schema_off = _BLOCK_HEADER.size
+    strings_off = schema_off + len(schema) * 4
+    blob_end = strings_off + len(offsets) * 4 + len(blob)
+    records_off = blob_end + _pad(blob_end, 4)
+    rec_end = records_off + len(records)
+    pool_off = rec_end + _pad(rec_end, 4)
+    block_len = pool_off + len(pool) * 4
+
+    if not _LITTLE:
+        for arr in (schema, offsets, pool):
+            arr.byteswap()
+    parts = [
+        _BLOCK_HEADER.pack(BLOCK_MAGIC, len(nodes), len(keys), len(strings), file_sid,
+                           schema_off, strings_off, records_off, rec.size, pool_off, block_len),
+        schema.tobytes(), offsets.tobytes(), blob, b"\0" * _pad(blob_end, 4),
+        bytes(records), b"\0" * _pad(rec_end, 4), pool.tobytes(),
+    ]
+    return b"".join(parts)
+
+class BinaryWriter:
+    """Grava blocos em sequência; o índice e o meta vão no fim, em `close`."""
+    def __init__(self, out_path: str | Path, strategy: str | None = None):
+        self.path = Path(out_path)
+        self.meta: Dict[str, Any] = {"strategy": strategy} if strategy is not None else {}
+        self._fp = self.path.open("wb")
+        self._fp.write(_FILE_HEADER.pack(MAGIC, VERSION, 0))
+        self._index = array("Q")
+        self._files: List[str] = []
+
+    def add_block(self, block: bytes | memoryview, file: str) -> None:
+        """Acrescenta um bloco já codificado (ex.: vindo de um worker)."""
+        pos = self._fp.tell()
+        pad = _pad(pos, 8)
+        if pad:
+            self._fp.write(b"\0" * pad)
+            pos += pad
+        self._fp.write(block)
+        self._index.extend((pos, len(block)))
+        self._files.append(file)
+
+    def add_file(self, file: str, nodes: List[Dict[str, Any]]) -> None:
+        self.add_block(encode_block(file, nodes), file)
+
+    def close(self) -> Path:
+        if self._fp.closed:
+            return self.path
+        pos = self._fp.tell()
+        self._fp.write(b"\0" * _pad(pos, 8))
+        index_off = pos + _pad(pos, 8)
+        index = array("Q", self._index)
+        if not _LITTLE:
+            index.byteswap()
+        self._fp.write(index.tobytes())
+        meta = json.dumps({"header": self.meta, "files": self._files}, ensure_ascii=False).encode("utf-8")
+        meta_off = self._fp.tell()
+        self._fp.write(meta)
+        self._fp.write(_TRAILER.pack(index_off, len(self._files), meta_off, len(meta), END_MAGIC))
+        self._fp.close()
+        return self.path
+
+    def __enter__(self) -> "BinaryWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+# ---------------------------
+# Leitura (mmap, sem cópia)
+# ---------------------------
+
+def _u32(view: memoryview) -> memoryview | array:
+    if _LITTLE:
+        return view.cast("I")
+    arr = array("I", bytes(view))
+    arr.byteswap()
+    return arr
+
+class FileBlock:
+    """
+    Visão de um bloco: os registros, offsets e o pool são lidos direto do buffer (mmap);
+    strings são decodificadas sob demanda e memoizadas. `owner` mantém vivo quem fornece o buffer
+    (ex.: o segmento de memória compartilhada de um worker).
+    """
+    def __init__(self, buf: memoryview, owner: Any = None):
+        (magic, n_nodes, n_fields, n_strings, file_sid, schema_off, strings_off,
+         records_off, record_size, pool_off, block_len) = _BLOCK_HEADER.unpack_from(buf, 0)
+        if magic != BLOCK_MAGIC:
+            raise ValueError("Corrupted block: bad magic")
+        self._buf = buf
+        self._owner = owner
+        self._n = n_nodes
+        self._str_offsets = _u32(buf[strings_off:strings_off + 4 * (n_strings + 1)])
+        self._blob_off = strings_off + 4 * (n_strings + 1)
+        self._strings: Dict[int, str] = {}
+        schema = _u32(buf[schema_off:schema_off + 8 * n_fields])
+        self.fields: List[Tuple[str, int]] = [(self.string(schema[2 * i]), schema[2 * i + 1]) for i in range(n_fields)]
+        self._record = _record_struct(k for _, k in self.fields)
+        if self._record.size != record_size:
+            raise ValueError("Corrupted block: record size does not match the schema")
+        self._records_off = records_off
+        self._pool = _u32(buf[pool_off:block_len])
+        self.file = self.string(file_sid)
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def raw(self) -> memoryview:
+        """Os bytes do bloco, para regravar em outro .astb sem decodificar."""
+        return self._buf
+
+    def string(self, sid: int) -> str:
+        s = self._strings.get(sid)
+        if s is None:
+            a = self._blob_off + self._str_offsets[sid]
+            b = self._blob_off + self._str_offsets[sid + 1]
+            s = self._strings[sid] = str(self._buf[a:b], "utf-8")
+        return s
+
+    def _decode(self, raw: Tuple[int, ...]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        i = 0
+        for name, kind in self.fields:
+            v = raw[i]
+            i += 1
+            if kind == KIND_STR:
+                out[name] = None if v == NONE_U32 else self.string(v)
+            elif kind == KIND_INT:
+                out[name] = None if v == NONE_I32 else v
+            elif kind == KIND_BOOL:
+                out[name] = None if v == NONE_U8 else bool(v)
+            elif kind == KIND_STRLIST:
+                n = raw[i]
+                i += 1
+                out[name] = [self.string(sid) for sid in self._pool[v:v + n]]
+            else:
+                out[name] = json.loads(self.string(v))
+        if len(self.fields) == 1 and self.fields[0][0] == RAW_FIELD:
+            return out[RAW_FIELD]
+        return out
+
+    def node(self, j: int) -> Dict[str, Any]:
+        if not 0 <= j < self._n:
+            raise IndexError(j)
+        return self._decode(self._record.unpack_from(self._buf, self._records_off + j * self._record.size))
+
+    def nodes(self) -> Iterator[Dict[str, Any]]:
+        if not self._record.size:   # projeção vazia: registros de largura zero (iter_unpack recusa)
+            for _ in range(self._n):
+                yield {}
+            return
+        for raw in self._record.iter_unpack(self._buf[self._records_off:self._records_off + self._n * self._record.size]):
+            yield self._decode(raw)
+
+    def to_json_block(self) -> Dict[str, Any]:
+        """O bloco no formato de export_json: {"file", "node_count", "nodes"}."""
+        nodes = list(self.nodes())
+        return {"file": self.file, "node_count": len(nodes), "nodes": nodes}
+
+    def column(self, name: str) -> "np.ndarray":
+        """
+        Coluna numérica (int/bool, ou ids de string) como array numpy sobre o próprio buffer.
+        None aparece como o sentinela do tipo (NONE_I32, NONE_U8, NONE_U32).
+        """
+        import numpy as np
+
+        kinds = dict(self.fields)
+        if kinds.get(name) not in _KIND_DTYPE:
+            raise KeyError(f"{name!r} is not a fixed-size column of this block")
+        dtype = np.dtype([
+            (n, _KIND_DTYPE[k]) if k in _KIND_DTYPE else (n, "<u4", (2,))
+            for n, k in self.fields
+        ])
+        recs = np.frombuffer(self._buf, dtype=dtype, count=self._n, offset=self._records_off)
+        return recs[name]
+
+class BlockNodes(Sequence):
+    """nodes_json preguiçoso sobre um FileBlock: cada nó só vira dict quando é acessado."""
+    def __init__(self, block: FileBlock):
+        self.block = block
+
+    def __len__(self) -> int:
+        return len(self.block)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.block.node(j) for j in range(*i.indices(len(self.block)))]
+        return self.block.node(i + len(self.block) if i < 0 else i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.block.nodes()
+
+class BinaryReader:
+    """Abre um .astb por mmap; `reader[i]` ou `reader.block(path)` dão acesso aleatório por arquivo."""
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._fp = self.path.open("rb")
+        self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+        magic, version, _ = _FILE_HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a {SUFFIX} file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported {SUFFIX} version: {version}")
+        index_off, n_files, meta_off, meta_len, end = _TRAILER.unpack_from(self._buf, len(self._buf) - _TRAILER.size)
+        if end != END_MAGIC:
+            raise ValueError(f"{self.path} is truncated (missing trailer)")
+        index = self._buf[index_off:index_off + 16 * n_files]
+        self._index = index.cast("Q") if _LITTLE else array("Q", bytes(index))
+        if not _LITTLE:
+            self._index.byteswap()
+        meta = json.loads(str(self._buf[meta_off:meta_off + meta_len], "utf-8"))
+        self.header: Dict[str, Any] = meta["header"]
+        self.files: List[str] = meta["files"]
+        self._by_file = {f: i for i, f in enumerate(self.files)}
+
+    @property
+    def strategy(self) -> Optional[str]:
+        return self.header.get("strategy")
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __getitem__(self, i: int) -> FileBlock:
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        i %= len(self)
+        off, length = self._index[2 * i], self._index[2 * i + 1]
+        return FileBlock(self._buf[off:off + length])
+
+    def raw_block(self, i: int) -> memoryview:
+        """Bytes do bloco i, como gravados (para copiar para outro .astb sem decodificar)."""
+        off, length = self._index[2 * i], self._index[2 * i + 1]
+        return self._buf[off:off + length]
+
+    def block(self, file: str) -> FileBlock:
+        return self[self._by_file[file]]
+
+    def __iter__(self) -> Iterator[FileBlock]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self) -> None:
+        # com visões (FileBlock, colunas) ainda vivas o mmap só fecha quando elas forem coletadas
+        try:
+            self._index = array("Q")
+            self._buf.release()
+            self._mm.close()
+        except BufferError:
+            pass
+        self._fp.close()
+
+    def __enter__(self) -> "BinaryReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+# ---------------------------
+# Conversores de/para o JSON do service
+# ---------------------------
+
+def write_export_json(fp: TextIO, header: Dict[str, Any], blocks: Iterable[Dict[str, Any]]) -> None:
+    """Mesma saída de json.dumps({**header, "results": [...]}, ensure_ascii=False, indent=2), bloco a bloco."""
+    fp.write("{\n")
+    for k, v in header.items():
+        text = json.dumps(v, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        fp.write(f"  {json.dumps(k, ensure_ascii=False)}: {text},\n")
+    fp.write('  "results": ')
+    first = True
+    for b in blocks:
+        fp.write("[\n" if first else ",\n")
+        first = False
+        fp.write("    " + json.dumps(b, ensure_ascii=False, indent=2).replace("\n", "\n    "))
+    fp.write("[]" if first else "\n  ]")
+    fp.write("\n}")
+
+def json_to_binary(in_path: str | Path, out_path: str | Path) -> Path:
+    """Converte um export JSON/JSONL (também .gz) para .astb, um arquivo por vez."""
+    from embeddings.stream import iter_file_blocks
+
+    meta: Dict[str, Any] = {}
+    with BinaryWriter(out_path) as w:
+        for block in iter_file_blocks(in_path, meta):
+            w.add_file(block["file"], block["nodes"])
+        w.meta = meta
+    return Path(out_path)
+
+def binary_to_json(in_path: str | Path, out_path: str | Path) -> Path:
+    """Converte .astb de volta ao JSON de export_json (byte a byte igual) ou, com .jsonl, ao de export_jsonl."""
+    out = Path(out_path)
+    jsonl = out.suffix == ".jsonl" or out.suffixes[-2:] == [".jsonl", ".gz"]
+    with BinaryReader(in_path) as r, open_text(out, "w") as fp:
+        blocks = (b.to_json_block() for b in r)
+        if jsonl:
+            fp.write(json.dumps(r.header, ensure_ascii=False) + "\n")
+            for b in blocks:
+                fp.write(json.dumps(b, ensure_ascii=False) + "\n")
+        else:
+            write_export_json(fp, r.header, blocks)
+    return out
+
+def iter_binary_nodes(in_path: str | Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(índice do arquivo, nó), como embeddings.stream.iter_nodes, lendo um .astb."""
+    with BinaryReader(in_path) as r:
+        for block_no, block in enumerate(r):
+            for node in block.nodes():
+                yield block_no, node
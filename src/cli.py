@@ -0,0 +1,413 @@
+"""
+Command-line entry point for the analyzer.
+
+Usage (from src/):
+    python cli.py analyze PATH [-o ast.json] [--format json|jsonl|astb] [--gzip]
+                  [--strategy recursive_pre] [--workers N] [--parallel process|thread]
+                  [--transfer shm|pickle] [--memo-size N] [--detach] [--prefetch N] [--prefetch-mb 64]
+                  [--fields name,qname,...] [--include GLOB] [--exclude GLOB]
+                  [--no-gitignore] [--no-default-excludes]
+                  [--tokens ast_tokens.json] [--progress | --no-progress]
+                  [--mem-profile [--mem-top 10] [--mem-every 1]]   (writes ast.mem.json)
+    python cli.py convert ast.json ast.astb      (or back: convert ast.astb ast.json)
+
+Sharded runs (one `run-shard` per machine, then `merge`; `run-local` uses processes instead):
+    python cli.py shard PATH -o manifest.json --shards N [--strategy ...] [--include/--exclude GLOB]
+    python cli.py run-shard manifest.json --shard K -o shard-K.jsonl|.astb|.sqlite [--root PATH] [--workers N]
+    python cli.py merge -o ast.json [--manifest manifest.json] shard-*.jsonl
+    python cli.py run-local manifest.json --out-dir shards/ [--processes N] [--shard-format jsonl] [-o ast.json]
+
+At the end of a run a throughput summary (files/s, nodes/s, MB/s, peak RSS, cache hit
+rates) is printed to stderr.
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, TextIO
+
+import memprof
+from astcore.memo import PassMemo
+from service import NODE_FIELDS, PARALLEL, STRATEGIES, TRANSFERS, AnalysisResult, FileAnalysis, analyze_path, export_binary, export_json, export_jsonl
+
+FORMATS = ("json", "jsonl", "astb")
+_PROGRESS_EVERY = 0.2   # segundos entre atualizações da linha de progresso
+
+@dataclass
+class Throughput:
+    """Acumula arquivos/nós/bytes via `on_file` e imprime progresso e o resumo final."""
+    progress: bool = False
+    stream: TextIO = sys.stderr
+    files: int = 0
+    nodes: int = 0
+    errors: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    _last_print: float = 0.0
+
+    def on_file(self, fa: FileAnalysis) -> None:
+        self.files += 1
+        if fa.nodes_json and "error" in fa.nodes_json[0]:
+            self.errors += 1
+        else:
+            self.nodes += len(fa.nodes_json)
+        try:
+            self.bytes += fa.file.stat().st_size
+        except OSError:
+            pass
+        if self.progress:
+            now = time.perf_counter()
+            if now - self._last_print >= _PROGRESS_EVERY:
+                self._last_print = now
+                self._print_progress(now, fa.file)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def _print_progress(self, now: float, current: Path) -> None:
+        dt = max(now - self.started, 1e-9)
+        line = (f"\r{self.files:8d} files {self.nodes:10d} nodes "
+                f"{self.files / dt:8.1f} files/s {self.bytes / dt / 1e6:6.2f} MB/s  {current.name[:40]}")
+        self.stream.write(line.ljust(100)[:100])
+        self.stream.flush()
+
+    def finish_progress(self) -> None:
+        if self.progress and self._last_print:
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def summary(self, stats: Dict[str, Any]) -> List[str]:
+        dt = max(self.elapsed(), 1e-9)
+        lines = [
+            f"files      {self.files} ({self.errors} with syntax errors)",
+            f"nodes      {self.nodes}",
+            f"input      {self.bytes / 1e6:.2f} MB",
+            f"elapsed    {dt:.2f} s  (workers: {stats.get('workers', 1)}"
+            + (f", {stats['parallel']}" if "parallel" in stats else "")
+            + (f", transfer: {stats['transfer']})" if "transfer" in stats else ")"),
+            f"throughput {self.files / dt:.1f} files/s, {self.nodes / dt:.0f} nodes/s, {self.bytes / dt / 1e6:.2f} MB/s",
+        ]
+        rss = peak_rss_mb()
+        lines.append(f"peak RSS   {rss:.1f} MB" if rss is not None else "peak RSS   n/a")
+        d = stats.get("discovery")
+        if d:
+            lines.append(f"discovery  {d['dirs_scanned']} dirs scanned, {d['dirs_pruned']} pruned "
+                         f"({d['build_dirs_pruned']} build/dist), {d['files_yielded']}/{d['files_seen']} .py files kept")
+        io = stats.get("io")
+        if io and io["files"]:
+            busy = max(io["io_wait"] + io["compute"], 1e-9)
+            lines.append(f"io         {io['bytes'] / 1e6:.2f} MB read, waiting {io['io_wait']:.2f} s vs computing "
+                         f"{io['compute']:.2f} s ({io['io_wait'] / busy:.1%} blocked on reads)")
+        for name in ("memo", "split_identifier", "unparse"):
+            c = stats.get(name)
+            if c:
+                lines.append(f"cache      {name:16} hit rate {c['hit_rate']:.1%} "
+                             f"({c['hits']} hits / {c['misses']} misses, size {c['size']})")
+        return lines
+
+def peak_rss_mb() -> float | None:
+    """
+    Pico de RSS deste processo e do maior worker (ru_maxrss está em KiB no Linux). Sem o módulo
+    resource (Windows), o RSS atual via memprof; None se nem isso der para ler.
+    """
+    try:
+        import resource   # só Unix
+    except ImportError:
+        rss = memprof.current_rss()
+        return rss / 1e6 if rss is not None else None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1 if sys.platform == "darwin" else 1024   # macOS reporta bytes
+    return max(own, children) * scale / 1e6
+
+def _output_path(args: argparse.Namespace) -> Path:
+    out = Path(args.output) if args.output else Path(f"ast.{args.format or 'json'}")
+    if args.gzip and out.suffix != ".gz":
+        out = out.with_name(out.name + ".gz")
+    return out
+
+def _output_format(args: argparse.Namespace, out: Path) -> str:
+    if args.format:
+        return args.format
+    suffixes = out.suffixes[:-1] if out.suffix == ".gz" else out.suffixes
+    suffix = suffixes[-1] if suffixes else ""
+    return suffix[1:] if suffix[1:] in FORMATS else "json"
+
+def _split_fields(raw: str | None) -> List[str] | None:
+    if not raw:
+        return None
+    return [f.strip() for f in raw.split(",") if f.strip()]
+
+def cmd_analyze(args: argparse.Namespace) -> int:
+    out = _output_path(args)
+    fmt = _output_format(args, out)
+    if fmt == "astb" and out.suffix == ".gz":
+        print("error: the astb format is read by mmap and cannot be gzipped", file=sys.stderr)
+        return 2
+    fields = _split_fields(args.fields)
+    unknown = [f for f in fields or () if f not in NODE_FIELDS]
+    if unknown:
+        print(f"error: unknown node fields {unknown}; valid: {', '.join(NODE_FIELDS)}", file=sys.stderr)
+        return 2
+    memo = PassMemo(args.memo_size) if args.memo_size > 0 else None
+    progress = sys.stderr.isatty() if args.progress is None else args.progress
+    meter = Throughput(progress=progress)
+    profiler = None
+    if args.mem_profile:
+        if args.workers > 1:   # tracemalloc só enxerga este processo
+            print("warning: --mem-profile measures this process only; running with --workers 1", file=sys.stderr)
+            args.workers = 1
+        profiler = memprof.MemoryProfiler(top=args.mem_top, snapshot_every=args.mem_every).start()
+
+    result: AnalysisResult = analyze_path(
+        args.path,
+        strategy=args.strategy,
+        plugins=args.plugins,
+        memo=memo,
+        on_file=meter.on_file,
+        include=args.include,
+        exclude=args.exclude,
+        gitignore=args.gitignore,
+        default_excludes=args.default_excludes,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        transfer=args.transfer,
+        detach=args.detach,
+        prefetch=args.prefetch,
+        prefetch_bytes=int(args.prefetch_mb * (1 << 20)),
+        parallel=args.parallel,
+    )
+    meter.finish_progress()
+    analyzed = meter.elapsed()
+
+    exporter = {"json": export_json, "jsonl": export_jsonl, "astb": export_binary}[fmt]
+    with memprof.stage("export"):
+        exporter(result, out, fields=fields)
+    written = [out]
+    if args.tokens:
+        from embeddings.tokens import export_tokens_from_result
+        with memprof.stage("tokens"):
+            written.append(export_tokens_from_result(result, args.tokens))
+    if profiler is not None:
+        profiler.stop()
+        written.append(profiler.write(memprof.report_path(out)))
+
+    if not args.quiet:
+        for line in meter.summary(result.stats):
+            print(line, file=sys.stderr)
+        print(f"analysis   {analyzed:.2f} s, export {meter.elapsed() - analyzed:.2f} s", file=sys.stderr)
+        for line in profiler.summary() if profiler is not None else ():
+            print(line, file=sys.stderr)
+        for p in written:
+            print(f"wrote      {p}", file=sys.stderr)
+    return 0
+
+def cmd_convert(args: argparse.Namespace) -> int:
+    from binfmt import SUFFIX, binary_to_json, json_to_binary
+
+    src, dst = Path(args.input), Path(args.output)
+    if src.suffix == SUFFIX:
+        binary_to_json(src, dst)
+    elif dst.suffix == SUFFIX:
+        json_to_binary(src, dst)
+    else:
+        print(f"error: one side of the conversion must be a {SUFFIX} file", file=sys.stderr)
+        return 2
+    if not args.quiet:
+        print(f"wrote      {dst} ({dst.stat().st_size / 1e6:.2f} MB, input {src.stat().st_size / 1e6:.2f} MB)", file=sys.stderr)
+    return 0
+
+def cmd_shard(args: argparse.Namespace) -> int:
+    from sharding import build_manifest
+
+    started = time.perf_counter()
+    manifest = build_manifest(
+        args.path,
+        args.shards,
+        strategy=args.strategy,
+        include=args.include,
+        exclude=args.exclude,
+        gitignore=args.gitignore,
+        default_excludes=args.default_excludes,
+    )
+    out = manifest.save(args.output)
+    if not args.quiet:
+        sizes = [0] * manifest.n_shards
+        counts = [0] * manifest.n_shards
+        for e in manifest.files:
+            sizes[e.shard] += e.size
+            counts[e.shard] += 1
+        for k in range(manifest.n_shards):
+            print(f"shard {k:<4d} {counts[k]:6d} files {sizes[k] / 1e6:8.2f} MB", file=sys.stderr)
+        print(f"manifest   {manifest.id}: {len(manifest.files)} files in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+        print(f"wrote      {out}", file=sys.stderr)
+    return 0
+
+def cmd_run_shard(args: argparse.Namespace) -> int:
+    from sharding import Manifest, run_shard
+
+    manifest = Manifest.load(args.manifest)
+    memo = PassMemo(args.memo_size) if args.memo_size > 0 else None
+    meter = Throughput(progress=sys.stderr.isatty() if args.progress is None else args.progress)
+    report = run_shard(
+        manifest,
+        args.shard,
+        args.output,
+        root=args.root,
+        plugins=args.plugins,
+        memo=memo,
+        on_file=meter.on_file,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        transfer=args.transfer,
+    )
+    meter.finish_progress()
+    if not args.quiet:
+        for line in meter.summary(report.stats):
+            print(line, file=sys.stderr)
+        if report.missing or report.changed:
+            print(f"manifest   {len(report.missing)} missing, {len(report.changed)} changed files", file=sys.stderr)
+        print(f"wrote      {report.output} (shard {report.shard}, {report.files} files)", file=sys.stderr)
+    return 0
+
+def _print_merge(report: Any) -> None:
+    print(f"merged     {report.files} files, {report.duplicates} duplicates dropped", file=sys.stderr)
+    for name in ("conflicts", "stale", "unexpected", "missing"):
+        items = getattr(report, name)
+        if items:
+            print(f"{name:10} {len(items)}: {', '.join(items[:5])}{' ...' if len(items) > 5 else ''}", file=sys.stderr)
+    if report.shards_missing:
+        print(f"no output  for shards {report.shards_missing}", file=sys.stderr)
+    print(f"wrote      {report.output}", file=sys.stderr)
+
+def cmd_merge(args: argparse.Namespace) -> int:
+    from sharding import Manifest, merge_shards
+
+    manifest = Manifest.load(args.manifest) if args.manifest else None
+    report = merge_shards(args.inputs, args.output, manifest=manifest)
+    if not args.quiet:
+        _print_merge(report)
+    incomplete = report.missing or report.conflicts
+    return 1 if incomplete and args.strict else 0
+
+def cmd_run_local(args: argparse.Namespace) -> int:
+    from sharding import Manifest, merge_shards, run_local
+
+    started = time.perf_counter()
+    extra = ["--workers", str(args.workers)] if args.workers > 1 else []
+    outputs = run_local(args.manifest, args.out_dir, processes=args.processes, fmt=args.shard_format, extra_args=extra)
+    if not args.quiet:
+        print(f"shards     {len(outputs)} in {time.perf_counter() - started:.2f} s", file=sys.stderr)
+    if args.output:
+        report = merge_shards(outputs, args.output, manifest=Manifest.load(args.manifest))
+        if not args.quiet:
+            _print_merge(report)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Python AST analyzer.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("analyze", help="analyze a file or directory and export the nodes")
+    p.add_argument("path", type=Path, help="file or directory to analyze")
+    p.add_argument("-o", "--output", help="output file (default: ast.json / ast.jsonl)")
+    p.add_argument("--format", choices=FORMATS, help="output format (default: from the output suffix, else json)")
+    p.add_argument("--gzip", action="store_true", help="gzip the output (adds .gz to the name)")
+    p.add_argument("--fields", help="comma-separated node fields to keep in the output")
+    p.add_argument("--strategy", choices=STRATEGIES, default="recursive_pre")
+    p.add_argument("--plugins", action="append", help="pass plugin module (repeatable; default: pass_plugins.builtin)")
+    p.add_argument("--workers", type=int, default=1, help="worker processes (default: 1, in-process)")
+    p.add_argument("--chunk-size", type=int, default=16, help="files per worker task")
+    p.add_argument("--parallel", choices=PARALLEL, default="process",
+                   help="workers are processes (default) or threads (free-threaded builds; serial under the GIL)")
+    p.add_argument("--transfer", choices=TRANSFERS, default="shm",
+                   help="how workers send results back: binary blocks in shared memory (default) or pickle")
+    p.add_argument("--memo-size", type=int, default=4096, help="PassMemo entries per process (0 disables)")
+    p.add_argument("--prefetch", type=int, default=0, metavar="N",
+                   help="read the next N files in background threads while analyzing (default: 0, off)")
+    p.add_argument("--prefetch-mb", type=float, default=64, help="bytes read ahead per process, in MiB (default: 64)")
+    p.add_argument("--detach", action="store_true",
+                   help="keep only the extracted facts per file (drop AST, source lines; JSON built on export)")
+    p.add_argument("--include", action="append", default=[], metavar="GLOB",
+                   help="only analyze paths (relative to PATH) matching this glob; repeatable")
+    p.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                   help="skip paths (relative to PATH) matching this glob; repeatable")
+    p.add_argument("--no-gitignore", dest="gitignore", action="store_false",
+                   help="do not apply .gitignore rules found under PATH")
+    p.add_argument("--no-default-excludes", dest="default_excludes", action="store_false",
+                   help="also walk .git, virtualenvs, node_modules, build/dist, caches")
+    p.add_argument("--tokens", metavar="FILE", help="also write the Tokens JSON to FILE")
+    p.add_argument("--mem-profile", action="store_true",
+                   help="trace memory per stage (read/parse/comments/walk/jsonable/export/tokens) with tracemalloc "
+                        "and write <output>.mem.json; slow, in-process only")
+    p.add_argument("--mem-top", type=int, default=10, metavar="N", help="allocation sites kept per stage (default: 10)")
+    p.add_argument("--mem-every", type=int, default=1, metavar="N",
+                   help="take allocation-site snapshots every N files (default: 1); byte counts cover every file")
+    p.add_argument("--progress", dest="progress", action="store_true", default=None,
+                   help="show a progress line (default: when stderr is a terminal)")
+    p.add_argument("--no-progress", dest="progress", action="store_false")
+    p.add_argument("-q", "--quiet", action="store_true", help="do not print the summary")
+    p.set_defaults(func=cmd_analyze)
+
+    c = sub.add_parser("convert", help="convert between the JSON/JSONL exports and the binary .astb format")
+    c.add_argument("input", help="ast.json / ast.jsonl[.gz] / ast.astb")
+    c.add_argument("output", help="target; the direction comes from which side is .astb")
+    c.add_argument("-q", "--quiet", action="store_true")
+    c.set_defaults(func=cmd_convert)
+
+    m = sub.add_parser("shard", help="hash the files under PATH and split them into shards (writes a manifest)")
+    m.add_argument("path", type=Path, help="file or directory to analyze")
+    m.add_argument("-o", "--output", default="manifest.json", help="manifest file (default: manifest.json)")
+    m.add_argument("--shards", type=int, required=True, help="number of shards (machines)")
+    m.add_argument("--strategy", choices=STRATEGIES, default="recursive_pre")
+    m.add_argument("--include", action="append", default=[], metavar="GLOB")
+    m.add_argument("--exclude", action="append", default=[], metavar="GLOB")
+    m.add_argument("--no-gitignore", dest="gitignore", action="store_false")
+    m.add_argument("--no-default-excludes", dest="default_excludes", action="store_false")
+    m.add_argument("-q", "--quiet", action="store_true")
+    m.set_defaults(func=cmd_shard)
+
+    r = sub.add_parser("run-shard", help="analyze one shard of a manifest")
+    r.add_argument("manifest", help="manifest written by `shard`")
+    r.add_argument("--shard", type=int, required=True)
+    r.add_argument("-o", "--output", required=True, help="shard output: .jsonl[.gz], .astb or .sqlite")
+    r.add_argument("--root", type=Path, help="where the tree lives on this machine (default: the manifest root)")
+    r.add_argument("--plugins", action="append")
+    r.add_argument("--workers", type=int, default=1)
+    r.add_argument("--chunk-size", type=int, default=16)
+    r.add_argument("--transfer", choices=TRANSFERS, default="shm")
+    r.add_argument("--memo-size", type=int, default=4096)
+    r.add_argument("--progress", dest="progress", action="store_true", default=None)
+    r.add_argument("--no-progress", dest="progress", action="store_false")
+    r.add_argument("-q", "--quiet", action="store_true")
+    r.set_defaults(func=cmd_run_shard)
+
+    g = sub.add_parser("merge", help="merge shard outputs, dropping duplicates by content hash")
+    g.add_argument("inputs", nargs="+", help="shard outputs (.jsonl[.gz] / .astb / .sqlite)")
+    g.add_argument("-o", "--output", required=True, help="merged output: .json, .jsonl[.gz], .astb or .sqlite")
+    g.add_argument("--manifest", help="check hashes against the manifest and report missing files")
+    g.add_argument("--strict", action="store_true", help="exit 1 if files are missing or conflict")
+    g.add_argument("-q", "--quiet", action="store_true")
+    g.set_defaults(func=cmd_merge)
+
+    l = sub.add_parser("run-local", help="run every shard as a separate local process, then merge")
+    l.add_argument("manifest")
+    l.add_argument("--out-dir", default="shards", help="directory for the shard outputs (default: shards)")
+    l.add_argument("--shard-format", choices=("jsonl", "astb", "sqlite"), default="jsonl")
+    l.add_argument("--processes", type=int, help="shards running at once (default: CPU count)")
+    l.add_argument("--workers", type=int, default=1, help="worker processes inside each shard")
+    l.add_argument("-o", "--output", help="also merge the shard outputs into this file")
+    l.add_argument("-q", "--quiet", action="store_true")
+    l.set_defaults(func=cmd_run_local)
+    return parser
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, "plugins", False) is None:
+        args.plugins = ["pass_plugins.builtin"]
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Descoberta dos .py a analisar: os.scandir com poda de diretórios inteiros
+(excludes padrão, globs de include/exclude e regras de .gitignore) antes de qualquer stat.
+"""
+from __future__ import annotations
+import os
+import re
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from logger import logger
+
+# diretórios que nunca têm código do projeto (VCS, ambientes, caches), em qualquer profundidade
+DEFAULT_EXCLUDE_DIRS = frozenset({
+    ".git", ".hg", ".svn", ".tox", ".nox", ".venv", "venv", ".eggs", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", "node_modules", "site-packages",
+})
+# saída de build: só na raiz da varredura e se não for um pacote (ex.: mypkg/build/__init__.py fica)
+BUILD_OUTPUT_DIRS = frozenset({"build", "dist"})
+DEFAULT_EXCLUDE_GLOBS = ("*.egg-info",)
+VENV_MARKER = "pyvenv.cfg"   # raiz de virtualenv com qualquer nome
+
+_GLOB_CHARS = re.compile(r"[*?\[]")
+
+@dataclass
+class DiscoveryStats:
+    dirs_scanned: int = 0
+    dirs_pruned: int = 0
+    build_dirs_pruned: int = 0   # build/dist da raiz (já contados em dirs_pruned)
+    files_seen: int = 0
+    files_yielded: int = 0
+
+# ---------------------------
+# .gitignore
+# ---------------------------
+
+def _translate_gitignore(pat: str) -> str:
+    """Glob do gitignore -> regex sobre o caminho relativo (separador '/')."""
+    out: List[str] = []
+    i, n = 0, len(pat)
+    while i < n:
+        if pat.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pat.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pat[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pat[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pat[i] == "[":
+            j = pat.find("]", i + 2)
+            if j == -1:
+                out.append(re.escape("["))
+                i += 1
+                continue
+            body = pat[i + 1:j]
+            if body[0] in "!^":
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = j + 1
+        elif pat[i] == "\\" and i + 1 < n:
+            out.append(re.escape(pat[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pat[i]))
+            i += 1
+    return "".join(out)
+
+@dataclass
+class GitIgnore:
+    """Regras de um .gitignore, relativas ao diretório onde o arquivo está."""
+    base: str                                   # caminho relativo à raiz da varredura ("" = raiz)
+    rules: List[Tuple[re.Pattern, bool, bool]] = field(default_factory=list)   # (regex, negada, só diretório)
+
+    @classmethod
+    def parse(cls, text: str, base: str = "") -> "GitIgnore":
+        gi = cls(base=base)
+        for raw in text.splitlines():
+            line = raw.rstrip()
+            if raw.endswith("\\ "):   # espaço final escapado
+                line += " "
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith("\\"):   # \# e \! literais
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            body = _translate_gitignore(line.lstrip("/"))
+            if not anchored:
+                body = "(?:.*/)?" + body
+            gi.rules.append((re.compile(body + r"\Z", re.DOTALL), negated, dir_only))
+        return gi
+
+    def match(self, rel: str, is_dir: bool) -> Optional[bool]:
+        """True = ignorado, False = reincluído por '!', None = nenhuma regra casou."""
+        if self.base:
+            if not rel.startswith(self.base + "/"):
+                return None
+            rel = rel[len(self.base) + 1:]
+        result = None
+        for rx, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if rx.match(rel):
+                result = not negated
+        return result
+
+def _ignored(specs: Sequence[GitIgnore], rel: str, is_dir: bool) -> bool:
+    # o .gitignore mais interno (último da pilha) tem a palavra final
+    ignored = False
+    for spec in specs:
+        m = spec.match(rel, is_dir)
+        if m is not None:
+            ignored = m
+    return ignored
+
+# ---------------------------
+# globs de include/exclude
+# ---------------------------
+
+def _dir_excluded(rel_dir: str, exclude: Sequence[str]) -> bool:
+    # "vendor/*" e "*/tests/*" casam com "vendor/" e "a/tests/": o diretório inteiro sai
+    return any(fnmatch(rel_dir, pat) or fnmatch(rel_dir + "/", pat) for pat in exclude)
+
+def _literal_prefix(pat: str) -> List[str]:
+    parts = pat.split("/")
+    prefix = []
+    for part in parts[:-1]:
+        if _GLOB_CHARS.search(part):
+            break
+        prefix.append(part)
+    return prefix
+
+def _dir_may_include(rel_dir: str, include: Sequence[str]) -> bool:
+    """False se nenhum include pode casar com algo dentro de rel_dir (o prefixo literal diverge)."""
+    dir_parts = rel_dir.split("/")
+    for pat in include:
+        prefix = _literal_prefix(pat)
+        k = min(len(prefix), len(dir_parts))
+        if prefix[:k] == dir_parts[:k]:
+            return True
+    return False
+
+# ---------------------------
+# Varredura
+# ---------------------------
+
+def _is_package(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, "__init__.py"))
+
+def iter_py_files(
+    root: Path,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    *,
+    gitignore: bool = True,
+    default_excludes: bool = True,
+    stats: DiscoveryStats | None = None,
+) -> Iterator[Path]:
+    """
+    .py files under root, in the same order as Path.rglob (files of a directory, then its
+    subdirectories depth-first, in scandir order). Subtrees are pruned before they are listed:
+    DEFAULT_EXCLUDE_DIRS, BUILD_OUTPUT_DIRS directly under root that are not packages (no
+    __init__.py), virtualenvs (a pyvenv.cfg inside), directories matched by an
+    `exclude` glob or a .gitignore rule, and directories no `include` glob can reach.
+    Globs are fnmatch patterns over paths relative to root; exclude wins over include.
+    Only .gitignore files at or below root are read.
+    """
+    if root.is_file():
+        yield root
+        return
+    stats = stats if stats is not None else DiscoveryStats()
+    exclude = tuple(exclude) + (DEFAULT_EXCLUDE_GLOBS if default_excludes else ())
+    yield from _walk(str(root), "", list(include), exclude, gitignore, default_excludes, [], stats)
+
+def _walk(
+    top: str,
+    rel_top: str,
+    include: List[str],
+    exclude: Sequence[str],
+    gitignore: bool,
+    default_excludes: bool,
+    specs: List[GitIgnore],
+    stats: DiscoveryStats,
+) -> Iterator[Path]:
+    try:
+        with os.scandir(top) as it:
+            entries = list(it)
+    except OSError:   # sem permissão, removido no meio da varredura...
+        return
+    stats.dirs_scanned += 1
+
+    names = {e.name for e in entries}
+    if default_excludes and rel_top and VENV_MARKER in names:
+        stats.dirs_pruned += 1
+        return
+    if gitignore and ".gitignore" in names:
+        try:
+            with open(os.path.join(top, ".gitignore"), encoding="utf-8", errors="replace") as fp:
+                specs = specs + [GitIgnore.parse(fp.read(), base=rel_top)]
+        except OSError:
+            pass
+
+    subdirs = []
+    for e in entries:
+        rel = f"{rel_top}/{e.name}" if rel_top else e.name
+        if e.is_dir(follow_symlinks=False):
+            subdirs.append((e, rel))
+        elif e.name.endswith(".py"):
+            stats.files_seen += 1
+            if include and not any(fnmatch(rel, pat) for pat in include):
+                continue
+            if exclude and any(fnmatch(rel, pat) for pat in exclude):
+                continue
+            if specs and _ignored(specs, rel, is_dir=False):
+                continue
+            if e.is_file():
+                stats.files_yielded += 1
+                yield Path(e.path)
+
+    for e, rel in subdirs:
+        if (
+            (default_excludes and e.name in DEFAULT_EXCLUDE_DIRS)
+            or (exclude and _dir_excluded(rel, exclude))
+            or (include and not _dir_may_include(rel, include))
+            or (specs and _ignored(specs, rel, is_dir=True))
+        ):
+            stats.dirs_pruned += 1
+            continue
+        if default_excludes and not rel_top and e.name in BUILD_OUTPUT_DIRS and not _is_package(e.path):
+            stats.dirs_pruned += 1
+            stats.build_dirs_pruned += 1
+            logger.debug(f"discovery: skipping build output {e.path}")
+            continue
+        yield from _walk(e.path, rel, include, exclude, gitignore, default_excludes, specs, stats)
@@ -1 +1 @@
-from .tokens import Tokens, export_tokens_as_json, collect_tokens_from_payload, collect_tokens_from_file
\ No newline at end of file
+from .tokens import Tokens, export_tokens_as_json, collect_tokens_from_payload, collect_tokens_from_file, iter_tokens_from_file, iter_tokens_from_result, export_tokens_from_result
\ No newline at end of file
@@ -1,9 +1,21 @@
 # src/embeddings/dataset.py
+# pandas/numpy são importados sob demanda: quem só precisa de is_usecase_candidate não paga o import.
+from __future__ import annotations
 from pathlib import Path
-from typing import List
-import pandas as pd
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
+import sys
 
-from embeddings.tokens import collect_tokens_from_file, Tokens
+from embeddings.tokens import iter_tokens_from_file, Tokens
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from embeddings.vocab import TokenCorpus, Vocabulary
+
+# colunas de baixa cardinalidade: viram category em vez de object
+CATEGORICAL_COLUMNS = ("node_type", "class_kind", "method_kind", "visibility", "package", "module", "rel_path")
+DEFAULT_CHUNK_SIZE = 65536
 
 def is_usecase_candidate(t: Tokens) -> bool:
     # refine depois se quiser
@@ -14,25 +26,170 @@ def is_usecase_candidate(t: Tokens) -> bool:
         return False
     return True
 
-def build_tokens_dataframe(ast_json_path: str | Path) -> pd.DataFrame:
-    tokens_list: List[Tokens] = collect_tokens_from_file(ast_json_path)
-
-    rows = []
-    for t in tokens_list:
-        if not is_usecase_candidate(t):
-            continue
-
-        rows.append({
-            "name": t.name,
-            "node_type": t.type,
-            "class_kind": t.class_kind,
-            "method_kind": t.method_kind,
-            "visibility": t.visibility,
-            "package": t.package,
-            "module": t.module,
-            "rel_path": t.rel_path,
-            "tokens_list": t.flat,
-            "tokens_str": " ".join(t.flat),
-        })
-
-    return pd.DataFrame(rows)
+def _candidate_chunks(tokens: Iterable[Tokens], chunk_size: int) -> Iterator[List[Tokens]]:
+    it = (t for t in tokens if is_usecase_candidate(t))
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _chunk_columns(chunk: List[Tokens]) -> Dict[str, list]:
+    """Monta as colunas de um chunk direto dos atributos (sem dicts por linha)."""
+    return {
+        "name": [sys.intern(t.name) for t in chunk],
+        "node_type": [t.type for t in chunk],
+        "class_kind": [t.class_kind for t in chunk],
+        "method_kind": [t.method_kind for t in chunk],
+        "visibility": [t.visibility for t in chunk],
+        "package": [t.package for t in chunk],
+        "module": [t.module for t in chunk],
+        "rel_path": [t.rel_path for t in chunk],
+    }
+
+def _union_categoricals(parts: List[pd.Categorical]) -> pd.Categorical:
+    """
+    Junta categóricas de chunks sobre um conjunto global de categorias (str). union_categoricals
+    recusa chunks cujas categorias têm dtypes diferentes (ex.: coluna toda None em um chunk).
+    """
+    import numpy as np
+    import pandas as pd
+
+    cats = pd.Index(sorted({str(c) for p in parts for c in p.categories}), dtype=object)
+    # código antigo -> novo; o -1 no fim faz o código -1 (None) continuar -1
+    codes = [np.append(cats.get_indexer(p.categories.astype(str)), -1)[p.codes] for p in parts]
+    return pd.Categorical.from_codes(np.concatenate(codes).astype(np.int32), categories=cats)
+
+def tokens_dataset(
+    tokens: Iterable[Tokens],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    vocab: Vocabulary | None = None,
+) -> Tuple[pd.DataFrame, TokenCorpus]:
+    """
+    DataFrame das definições candidatas, montado coluna a coluna em chunks, com dtype category
+    nas colunas repetitivas, e os tokens de cada linha como TokenCorpus (CSR de ids int32)
+    alinhado por linha, em vez de listas/strings por linha.
+    """
+    import numpy as np
+    import pandas as pd
+    from embeddings.vocab import TokenCorpus, Vocabulary, encode_corpus
+
+    vocab = vocab if vocab is not None else Vocabulary()
+    names: List[pd.Series] = []
+    parts: Dict[str, list] = {c: [] for c in CATEGORICAL_COLUMNS}
+    offsets: List[np.ndarray] = [np.zeros(1, dtype=np.int64)]
+    ids: List[np.ndarray] = []
+    base = 0
+    for chunk in _candidate_chunks(tokens, chunk_size):
+        cols = _chunk_columns(chunk)
+        names.append(pd.Series(cols["name"], dtype=object))
+        for c in CATEGORICAL_COLUMNS:
+            parts[c].append(pd.Categorical(cols[c]))
+        corpus = encode_corpus(chunk, vocab)
+        offsets.append(corpus.offsets[1:] + base)
+        ids.append(corpus.ids)
+        base += len(corpus.ids)
+
+    corpus = TokenCorpus(
+        offsets=np.concatenate(offsets),
+        ids=np.concatenate(ids) if ids else np.zeros(0, dtype=np.int32),
+        vocab=vocab,
+    )
+    if not names:
+        return pd.DataFrame(columns=["name", *CATEGORICAL_COLUMNS]), corpus
+    data = {"name": pd.concat(names, ignore_index=True)}
+    for c in CATEGORICAL_COLUMNS:
+        data[c] = pd.Series(_union_categoricals(parts[c]))
+    return pd.DataFrame(data), corpus
+
+def build_tokens_dataframe(
+    ast_json_path: str | Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    vocab: Vocabulary | None = None,
+) -> Tuple[pd.DataFrame, TokenCorpus]:
+    """tokens_dataset sobre o export do service: (DataFrame, TokenCorpus com os tokens de cada linha)."""
+    return tokens_dataset(iter_tokens_from_file(ast_json_path), chunk_size=chunk_size, vocab=vocab)
+
+# ---------------------------
+# Colunas em .npz (um arquivo por chunk, com append)
+# ---------------------------
+
+def _encode_categorical(values: list) -> Tuple[np.ndarray, np.ndarray]:
+    import numpy as np
+    import pandas as pd
+
+    cat = pd.Categorical(values)
+    return cat.codes.astype(np.int32), np.asarray(cat.categories, dtype=str)
+
+def write_tokens_columns(
+    tokens: Iterable[Tokens],
+    out_dir: str | Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Path:
+    """
+    Grava as definições candidatas em out_dir/part-NNNNN.npz, um arquivo por chunk.
+    Categóricas viram <col>_codes (int32, -1 = None) + <col>_cats; os tokens viram CSR
+    (tokens_offsets + tokens_ids) sobre out_dir/vocab.json, compartilhado entre chunks.
+    Chamadas repetidas no mesmo diretório acrescentam novos chunks.
+    """
+    import numpy as np
+    from embeddings.vocab import Vocabulary, encode_corpus
+
+    d = Path(out_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    vocab_path = d / "vocab.json"
+    vocab = Vocabulary.load(vocab_path) if vocab_path.exists() else Vocabulary()
+    part_no = len(list(d.glob("part-*.npz")))
+
+    for chunk in _candidate_chunks(tokens, chunk_size):
+        cols = _chunk_columns(chunk)
+        arrays: Dict[str, np.ndarray] = {"name": np.asarray(cols["name"], dtype=str)}
+        for c in CATEGORICAL_COLUMNS:
+            arrays[f"{c}_codes"], arrays[f"{c}_cats"] = _encode_categorical(cols[c])
+        corpus = encode_corpus(chunk, vocab)
+        arrays["tokens_offsets"] = corpus.offsets
+        arrays["tokens_ids"] = corpus.ids
+        np.savez(d / f"part-{part_no:05d}.npz", **arrays)
+        part_no += 1
+        # o vocabulário é regravado por chunk para o diretório ficar sempre consistente
+        vocab.save(vocab_path)
+    if not vocab_path.exists():
+        vocab.save(vocab_path)
+    return d
+
+def read_tokens_columns(in_dir: str | Path) -> Tuple[pd.DataFrame, TokenCorpus]:
+    """
+    Lê os chunks de write_tokens_columns: devolve o DataFrame (sem colunas de tokens)
+    e o TokenCorpus alinhado por linha.
+    """
+    import numpy as np
+    import pandas as pd
+    from embeddings.vocab import TokenCorpus, Vocabulary
+
+    d = Path(in_dir)
+    names: List[np.ndarray] = []
+    cats: Dict[str, list] = {c: [] for c in CATEGORICAL_COLUMNS}
+    offsets: List[np.ndarray] = []
+    ids: List[np.ndarray] = []
+    base = 0
+    for part in sorted(d.glob("part-*.npz")):
+        with np.load(part, allow_pickle=False) as z:
+            names.append(z["name"])
+            for c in CATEGORICAL_COLUMNS:
+                cats[c].append(pd.Categorical.from_codes(z[f"{c}_codes"], categories=z[f"{c}_cats"]))
+            offsets.append(z["tokens_offsets"][1:] + base)
+            ids.append(z["tokens_ids"])
+            base += len(z["tokens_ids"])
+
+    vocab = Vocabulary.load(d / "vocab.json")
+    corpus = TokenCorpus(
+        offsets=np.concatenate([np.zeros(1, dtype=np.int64)] + offsets),
+        ids=np.concatenate(ids) if ids else np.zeros(0, dtype=np.int32),
+        vocab=vocab,
+    )
+    if not names:
+        return pd.DataFrame(columns=["name", *CATEGORICAL_COLUMNS]), corpus
+    data = {"name": pd.Series(np.concatenate(names), dtype=object)}
+    for c in CATEGORICAL_COLUMNS:
+        data[c] = pd.Series(_union_categoricals(cats[c]))
+    return pd.DataFrame(data), corpus
@@ -0,0 +1,288 @@
+# src/embeddings/features.py
+"""
+Matriz esparsa de features (TF-IDF ou feature hashing) sobre o corpus de Tokens.
+Toda a agregação (contagem, idf, normalização) é feita em lote com NumPy.
+"""
+from __future__ import annotations
+import json
+import zlib
+from array import array
+from itertools import chain
+from dataclasses import dataclass, asdict, astuple
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Literal, Tuple
+
+import numpy as np
+
+from embeddings.tokens import TOKEN_FIELDS, Tokens
+from embeddings.vocab import Vocabulary
+
+FeatureMode = Literal["hash", "tfidf"]
+
+@dataclass(frozen=True)
+class FieldWeights:
+    """Peso de cada campo de Tokens na contagem de termos (mesma ordem de TOKEN_FIELDS)."""
+    type: float = 1.0
+    name: float = 1.0
+    params: float = 1.0
+    docstring: float = 1.0
+    comments: float = 1.0
+    tags: float = 1.0
+    bases: float = 1.0
+    decorators: float = 1.0
+    path: float = 1.0
+
+    def as_array(self) -> np.ndarray:
+        return np.asarray(astuple(self), dtype=np.float32)
+
+@dataclass(frozen=True)
+class SparseMatrix:
+    """Matriz CSR mínima: as colunas da linha i são indices[indptr[i]:indptr[i+1]]."""
+    indptr: np.ndarray    # int64, len = n_rows + 1
+    indices: np.ndarray   # int32
+    data: np.ndarray      # float32
+    shape: Tuple[int, int]
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+    def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        a, b = self.indptr[i], self.indptr[i + 1]
+        return self.indices[a:b], self.data[a:b]
+
+    def row_ids(self) -> np.ndarray:
+        """Índice da linha de cada elemento não nulo."""
+        return np.repeat(np.arange(self.shape[0], dtype=np.int64), np.diff(self.indptr))
+
+    def to_scipy(self):
+        """Converte para scipy.sparse.csr_matrix (requer scipy)."""
+        from scipy.sparse import csr_matrix
+        return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+    def save(self, out_dir: str | Path, prefix: str = "X") -> Path:
+        d = Path(out_dir)
+        d.mkdir(parents=True, exist_ok=True)
+        np.save(d / f"{prefix}_indptr.npy", self.indptr)
+        np.save(d / f"{prefix}_indices.npy", self.indices)
+        np.save(d / f"{prefix}_data.npy", self.data)
+        np.save(d / f"{prefix}_shape.npy", np.asarray(self.shape, dtype=np.int64))
+        return d
+
+    @classmethod
+    def load(cls, in_dir: str | Path, prefix: str = "X", mmap: bool = True) -> "SparseMatrix":
+        d = Path(in_dir)
+        mode = "r" if mmap else None
+        shape = np.load(d / f"{prefix}_shape.npy")
+        return cls(
+            indptr=np.load(d / f"{prefix}_indptr.npy", mmap_mode=mode),
+            indices=np.load(d / f"{prefix}_indices.npy", mmap_mode=mode),
+            data=np.load(d / f"{prefix}_data.npy", mmap_mode=mode),
+            shape=(int(shape[0]), int(shape[1])),
+        )
+
+def token_label(t: Tokens) -> str:
+    """Rótulo de uma definição: package.module.qname (partes ausentes são omitidas; sem qname, o nome)."""
+    return ".".join(p for p in (t.package, t.module, t.qname or t.name) if p)
+
+def _aggregate(lengths: np.ndarray, cols: np.ndarray, weights: np.ndarray,
+               sublinear: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Soma pesos por (documento, coluna) e devolve (indptr, indices, data) com colunas ordenadas por linha.
+    Com `sublinear`, cada célula vale peso médio dos campos * (1 + log(ocorrências)): o log vai na
+    contagem bruta (>= 1), então pesos de campo < 1 nunca dão termos negativos.
+    """
+    n_docs = len(lengths)
+    rows = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+    keys = rows * (int(cols.max()) + 1 if len(cols) else 1) + cols
+    order = np.argsort(keys, kind="stable")
+    keys, w = keys[order], weights[order]
+    start = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    data = np.add.reduceat(w, start) if len(w) else w
+    if sublinear and len(w):
+        counts = np.diff(np.r_[start, len(w)])
+        data = data / counts * (1.0 + np.log(counts))
+    u_rows, u_cols = rows[order][start], cols[order][start]
+    nz = data != 0   # campos com peso 0 não geram colunas
+    data, u_rows, u_cols = data[nz], u_rows[nz], u_cols[nz]
+    indptr = np.zeros(n_docs + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u_rows, minlength=n_docs), out=indptr[1:])
+    return indptr, u_cols.astype(np.int32), data.astype(np.float32)
+
+class _HashColumns(dict):
+    """Cache token -> crc32(token) % n_features (lookup em C via __getitem__); não é um vocabulário."""
+    def __init__(self, n_features: int):
+        super().__init__()
+        self.n_features = n_features
+
+    def __missing__(self, token: str) -> int:
+        col = self[token] = zlib.crc32(token.encode("utf-8")) % self.n_features
+        return col
+
+class FeatureBuilder:
+    """
+    Constrói a matriz de features de forma incremental, um bloco por arquivo.
+    Em modo "hash" as colunas são crc32(token) % n_features; em modo "tfidf" são ids do vocabulário.
+    `update`/`remove` trocam só o bloco do arquivo alterado; `build` aplica idf e normaliza (L2).
+    """
+    def __init__(
+        self,
+        mode: FeatureMode = "hash",
+        n_features: int = 1 << 18,
+        weights: FieldWeights = FieldWeights(),
+        sublinear_tf: bool = False,
+        vocab: Vocabulary | None = None,
+    ):
+        if mode not in ("hash", "tfidf"):
+            raise ValueError(f"Invalid mode: {mode}. Options: ('hash', 'tfidf')")
+        self.mode = mode
+        self.n_features = n_features
+        self.weights = weights
+        self.sublinear_tf = sublinear_tf
+        if mode == "hash" and vocab is not None:
+            raise ValueError("vocab is only used in 'tfidf' mode")
+        # só o tfidf tem vocabulário; no hash a coluna sai direto do token
+        self.vocab: Vocabulary | None = Vocabulary() if mode == "tfidf" and vocab is None else vocab
+        self._hashed = _HashColumns(n_features) if mode == "hash" else None
+        self._field_weights = weights.as_array()
+        self._blocks: Dict[Hashable, Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]] = {}
+        self._df = np.zeros(n_features if mode == "hash" else 0, dtype=np.int64)
+        self.idf = np.zeros(0, dtype=np.float32)
+
+    @property
+    def n_cols(self) -> int:
+        return self.n_features if self.mode == "hash" else len(self.vocab)
+
+    def _lookup(self, grow: bool):
+        """token -> coluna; -1 para token fora do vocabulário (só tfidf com grow=False)."""
+        if self._hashed is not None:
+            return self._hashed.__getitem__
+        return self.vocab._index.__getitem__ if grow else self.vocab.get
+
+    def _encode(self, tokens: Iterable[Tokens], grow: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        lookup = self._lookup(grow)
+        ids = array("i")
+        field_lengths = array("q")
+        labels: List[str] = []
+        for t in tokens:
+            groups = [toks for _name, toks in t.fields()]
+            field_lengths.extend(map(len, groups))
+            ids.extend(map(lookup, chain.from_iterable(groups)))
+            labels.append(token_label(t))
+        n_fields = len(TOKEN_FIELDS)
+        ids_a = np.frombuffer(ids, dtype=np.int32) if ids else np.zeros(0, dtype=np.int32)
+        fl = (np.frombuffer(field_lengths, dtype=np.int64) if field_lengths else np.zeros(0, dtype=np.int64)).reshape(-1, n_fields)
+        fields_a = np.repeat(np.tile(np.arange(n_fields, dtype=np.int8), len(fl)), fl.ravel())
+        lengths_a = fl.sum(axis=1)
+        if not grow and self._hashed is None:
+            # tokens fora do vocabulário (lookup = -1) são descartados
+            known = ids_a >= 0
+            rows = np.repeat(np.arange(len(lengths_a)), lengths_a)
+            ids_a, fields_a = ids_a[known], fields_a[known]
+            lengths_a = np.bincount(rows[known], minlength=len(lengths_a)).astype(np.int64)
+        indptr, indices, data = _aggregate(lengths_a, ids_a, self._field_weights[fields_a], self.sublinear_tf)
+        return indptr, indices, data, labels
+
+    def _resize_df(self) -> None:
+        if len(self._df) < self.n_cols:
+            self._df = np.concatenate([self._df, np.zeros(self.n_cols - len(self._df), dtype=np.int64)])
+
+    def _add_df(self, indices: np.ndarray, sign: int) -> None:
+        self._resize_df()
+        self._df += sign * np.bincount(indices, minlength=len(self._df))
+
+    def update(self, key: Hashable, tokens: Iterable[Tokens]) -> None:
+        """Adiciona (ou substitui, mantendo a posição) o bloco de linhas de `key`, tipicamente o caminho do arquivo."""
+        block = self._encode(tokens, grow=True)
+        old = self._blocks.get(key)
+        if old is not None:
+            self._add_df(old[1], -1)
+        self._add_df(block[1], +1)
+        self._blocks[key] = block
+
+    def remove(self, key: Hashable) -> None:
+        block = self._blocks.pop(key, None)
+        if block is not None:
+            self._add_df(block[1], -1)
+
+    @property
+    def labels(self) -> List[str]:
+        return [lab for block in self._blocks.values() for lab in block[3]]
+
+    def _weigh(self, indptr: np.ndarray, indices: np.ndarray, tf: np.ndarray) -> SparseMatrix:
+        n_rows = len(indptr) - 1
+        data = tf.copy()   # sublinear_tf já aplicado em _aggregate
+        data *= self.idf[indices]
+        rows = np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(indptr))
+        norms = np.sqrt(np.bincount(rows, weights=data.astype(np.float64) ** 2, minlength=n_rows))
+        norms[norms == 0] = 1.0
+        data /= norms[rows]
+        return SparseMatrix(indptr=indptr, indices=indices, data=data.astype(np.float32), shape=(n_rows, len(self.idf)))
+
+    def build(self) -> SparseMatrix:
+        """Concatena os blocos, recalcula o idf e devolve a matriz TF-IDF com linhas normalizadas."""
+        blocks = list(self._blocks.values())
+        n_docs = sum(len(b[0]) - 1 for b in blocks)
+        self._resize_df()
+        self.idf = (np.log((1.0 + n_docs) / (1.0 + self._df)) + 1.0).astype(np.float32)
+        if not blocks:
+            return SparseMatrix(np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32), (0, len(self.idf)))
+        shifts = np.cumsum([0] + [b[0][-1] for b in blocks[:-1]])
+        indptr = np.concatenate([np.zeros(1, dtype=np.int64)] + [b[0][1:] + s for b, s in zip(blocks, shifts)])
+        indices = np.concatenate([b[1] for b in blocks])
+        tf = np.concatenate([b[2] for b in blocks])
+        return self._weigh(indptr, indices, tf)
+
+    def transform(self, tokens: Iterable[Tokens]) -> SparseMatrix:
+        """Vetoriza Tokens com o idf do último `build`, sem alterar vocabulário nem blocos."""
+        indptr, indices, tf, _labels = self._encode(tokens, grow=False)
+        return self._weigh(*self._known_columns(indptr, indices, tf))
+
+    def transform_terms(self, terms: Iterable[str]) -> SparseMatrix:
+        """
+        Vetoriza uma lista solta de termos (ex.: texto de consulta) como um documento de uma linha, peso 1.
+        No modo "hash" todo termo conta, visto ou não; no "tfidf" os de fora do vocabulário são descartados.
+        """
+        cols = np.fromiter((i for i in map(self._lookup(grow=False), terms) if i >= 0), dtype=np.int32)
+        indptr, indices, tf = _aggregate(np.asarray([len(cols)], dtype=np.int64), cols, np.ones(len(cols), dtype=np.float32), self.sublinear_tf)
+        return self._weigh(*self._known_columns(indptr, indices, tf))
+
+    def _known_columns(self, indptr: np.ndarray, indices: np.ndarray, tf: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Descarta colunas criadas depois do último `build` (sem idf)."""
+        keep = indices < len(self.idf)
+        if keep.all():
+            return indptr, indices, tf
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        new_indptr = np.zeros_like(indptr)
+        np.cumsum(np.bincount(rows[keep], minlength=len(indptr) - 1), out=new_indptr[1:])
+        return new_indptr, indices[keep], tf[keep]
+
+    def save_model(self, out_dir: str | Path) -> Path:
+        """Salva o necessário para `transform` (configuração, idf e, no tfidf, o vocabulário); os blocos não são salvos."""
+        d = Path(out_dir)
+        d.mkdir(parents=True, exist_ok=True)
+        config = {
+            "mode": self.mode,
+            "n_features": self.n_features,
+            "weights": asdict(self.weights),
+            "sublinear_tf": self.sublinear_tf,
+        }
+        (d / "features.json").write_text(json.dumps(config, indent=2), encoding="utf-8")
+        if self.vocab is not None:
+            self.vocab.save(d / "vocab.json")
+        np.save(d / "idf.npy", self.idf)
+        return d
+
+    @classmethod
+    def load_model(cls, in_dir: str | Path) -> "FeatureBuilder":
+        d = Path(in_dir)
+        config = json.loads((d / "features.json").read_text(encoding="utf-8"))
+        fb = cls(
+            mode=config["mode"],
+            n_features=config["n_features"],
+            weights=FieldWeights(**config["weights"]),
+            sublinear_tf=config["sublinear_tf"],
+            vocab=Vocabulary.load(d / "vocab.json") if config["mode"] == "tfidf" else None,
+        )
+        fb.idf = np.load(d / "idf.npy")
+        return fb
@@ -0,0 +1,177 @@
+# src/embeddings/inverted_index.py
+"""
+Índice invertido token -> definições e índices de facetas (class_kind, method_kind, visibility,
+package, module, node_type, decorator), com consultas booleanas por interseção/união de listas ordenadas.
+"""
+from __future__ import annotations
+import json
+from abc import ABC, abstractmethod
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from embeddings.features import token_label
+from embeddings.tokens import TOKEN_FIELDS, Tokens, iter_tokens_from_file_analysis
+from utils import dotted_names
+
+if TYPE_CHECKING:
+    from service import FileAnalysis
+
+# "decorator": nome pontuado exato e última parte (Term("decorator", "functools.lru_cache") ou
+# Term("decorator", "lru_cache")), como o Selector dos passes; o campo "decorators" é o de tokens
+FACETS = ("node_type", "class_kind", "method_kind", "visibility", "package", "module", "decorator")
+
+Key = Tuple[str, str]
+
+class Query(ABC):
+    """Expressão booleana sobre o índice; combine com `&` (AND) e `|` (OR)."""
+    @abstractmethod
+    def evaluate(self, index: "InvertedIndex") -> np.ndarray:
+        """ids ordenados das definições que satisfazem a expressão."""
+
+    def __and__(self, other: "Query") -> "Query":
+        return And(self, other)
+
+    def __or__(self, other: "Query") -> "Query":
+        return Or(self, other)
+
+class Term(Query):
+    """Token de um campo de Tokens (ex.: Term("docstring", "cache")) ou valor de faceta (Term("package", "pkg"))."""
+    def __init__(self, field: str, value: str):
+        if field not in TOKEN_FIELDS and field not in FACETS:
+            raise ValueError(f"Unknown field: {field}. Options: {TOKEN_FIELDS + FACETS}")
+        self.field = field
+        self.value = value.lower() if field in TOKEN_FIELDS else value
+
+    def evaluate(self, index: "InvertedIndex") -> np.ndarray:
+        return index.postings(self.field, self.value)
+
+    def __repr__(self) -> str:
+        return f"Term({self.field!r}, {self.value!r})"
+
+class And(Query):
+    def __init__(self, *queries: Query):
+        self.queries = queries
+
+    def evaluate(self, index: "InvertedIndex") -> np.ndarray:
+        return intersect(*(q.evaluate(index) for q in self.queries))
+
+class Or(Query):
+    def __init__(self, *queries: Query):
+        self.queries = queries
+
+    def evaluate(self, index: "InvertedIndex") -> np.ndarray:
+        return union(*(q.evaluate(index) for q in self.queries))
+
+def intersect(*postings: np.ndarray) -> np.ndarray:
+    """Interseção de listas ordenadas, começando pela mais curta."""
+    if not postings:
+        return np.zeros(0, dtype=np.uint32)
+    ordered = sorted(postings, key=len)
+    out = ordered[0]
+    for p in ordered[1:]:
+        if not len(out):
+            break
+        out = np.intersect1d(out, p, assume_unique=True)
+    return out
+
+def union(*postings: np.ndarray) -> np.ndarray:
+    """União de listas ordenadas (resultado ordenado e sem repetição)."""
+    if not postings:
+        return np.zeros(0, dtype=np.uint32)
+    return np.unique(np.concatenate(postings))
+
+class InvertedIndex:
+    """
+    Listas de definições (ids em ordem de inserção, logo já ordenadas) por (campo, valor).
+    Cresce incrementalmente com `add`/`add_file`; `save` grava um bloco único de uint32 + offsets.
+    """
+    def __init__(self):
+        self.labels: List[str] = []
+        self._lists: Dict[Key, array] = {}
+        # parte congelada (carregada do disco)
+        self._frozen_keys: Dict[Key, int] = {}
+        self._frozen_offsets = np.zeros(1, dtype=np.int64)
+        self._frozen_postings = np.zeros(0, dtype=np.uint32)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _post(self, key: Key, doc_id: int) -> None:
+        lst = self._lists.get(key)
+        if lst is None:
+            lst = self._lists[key] = array("I")
+        if not lst or lst[-1] != doc_id:   # um token repetido na mesma definição entra uma vez
+            lst.append(doc_id)
+
+    def add(self, t: Tokens) -> int:
+        doc_id = len(self.labels)
+        self.labels.append(token_label(t))
+        for field, toks in t.fields():
+            for tok in toks:
+                self._post((field, tok), doc_id)
+        facets = (t.type, t.class_kind, t.method_kind, t.visibility, t.package, t.module)
+        for facet, value in zip(FACETS, facets):
+            if value:
+                self._post((facet, value), doc_id)
+        for dotted in t.decorator_names:
+            for name in dotted_names(dotted):
+                self._post(("decorator", name), doc_id)
+        return doc_id
+
+    def add_all(self, tokens: Iterable[Tokens]) -> None:
+        for t in tokens:
+            self.add(t)
+
+    def add_file(self, fa: "FileAnalysis") -> None:
+        """Indexa as definições de um arquivo; serve como `on_file` de service.analyze_path."""
+        self.add_all(iter_tokens_from_file_analysis(fa))
+
+    def postings(self, field: str, value: str) -> np.ndarray:
+        key = (field, value)
+        parts = []
+        i = self._frozen_keys.get(key)
+        if i is not None:
+            parts.append(self._frozen_postings[self._frozen_offsets[i]:self._frozen_offsets[i + 1]])
+        lst = self._lists.get(key)
+        if lst is not None:
+            parts.append(np.frombuffer(lst, dtype=np.uint32))
+        if not parts:
+            return np.zeros(0, dtype=np.uint32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def search(self, query: Query) -> List[str]:
+        """Rótulos (package.module.qname) das definições que satisfazem a consulta."""
+        return [self.labels[i] for i in query.evaluate(self).tolist()]
+
+    def keys(self) -> List[Key]:
+        return list(dict.fromkeys([*self._frozen_keys, *self._lists]))
+
+    def save(self, out_dir: str | Path) -> Path:
+        """Grava terms.json (chaves), offsets.npy/postings.npy (listas concatenadas) e labels.json."""
+        d = Path(out_dir)
+        d.mkdir(parents=True, exist_ok=True)
+        keys = self.keys()
+        lists = [self.postings(*k) for k in keys]
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in lists], out=offsets[1:])
+        postings = np.concatenate(lists).astype(np.uint32) if lists else np.zeros(0, dtype=np.uint32)
+        np.save(d / "offsets.npy", offsets)
+        np.save(d / "postings.npy", postings)
+        (d / "terms.json").write_text(json.dumps(keys, ensure_ascii=False), encoding="utf-8")
+        (d / "labels.json").write_text(json.dumps(self.labels, ensure_ascii=False), encoding="utf-8")
+        return d
+
+    @classmethod
+    def load(cls, in_dir: str | Path, mmap: bool = True) -> "InvertedIndex":
+        d = Path(in_dir)
+        mode = "r" if mmap else None
+        idx = cls()
+        keys = json.loads((d / "terms.json").read_text(encoding="utf-8"))
+        idx._frozen_keys = {(f, v): i for i, (f, v) in enumerate(keys)}
+        idx._frozen_offsets = np.load(d / "offsets.npy", mmap_mode=mode)
+        idx._frozen_postings = np.load(d / "postings.npy", mmap_mode=mode)
+        idx.labels = json.loads((d / "labels.json").read_text(encoding="utf-8"))
+        return idx
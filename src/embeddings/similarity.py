@@ -0,0 +1,251 @@
+# src/embeddings/similarity.py
+"""
+Índice de similaridade entre definições: cosseno top-k sobre a matriz TF-IDF normalizada
+e, opcionalmente, MinHash/LSH para detectar quase-duplicatas. Persistido em .npy (mmap na carga).
+"""
+from __future__ import annotations
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings.features import FeatureBuilder, SparseMatrix
+from embeddings.tokens import Tokens
+from utils import split_identifier
+
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_PRIME = (1 << 31) - 1
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+def _query_terms(text: str) -> List[str]:
+    """Termos de uma consulta livre: palavras em minúsculas e suas partes camelCase/snake_case."""
+    terms: list[str] = []
+    for w in _WORD.findall(text):
+        terms.append(w.lower())
+        terms += split_identifier(w)
+    return list(dict.fromkeys(terms))
+
+def _transpose(X: SparseMatrix) -> SparseMatrix:
+    """Transposta em CSR (listas de linhas por coluna), usada para pontuar só as linhas que compartilham termos."""
+    order = np.argsort(X.indices, kind="stable")
+    indptr = np.zeros(X.shape[1] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(X.indices, minlength=X.shape[1]), out=indptr[1:])
+    return SparseMatrix(
+        indptr=indptr,
+        indices=X.row_ids()[order].astype(np.int32),
+        data=np.asarray(X.data)[order],
+        shape=(X.shape[1], X.shape[0]),
+    )
+
+class MinHashLSH:
+    """
+    Assinaturas MinHash das colunas de cada linha, calculadas em blocos de linhas,
+    e LSH por bandas: duas linhas são candidatas se coincidem em alguma banda inteira.
+    """
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+        self._mix = rng.integers(1, 1 << 63, size=num_perm // bands, dtype=np.uint64) | np.uint64(1)
+        self.band_keys: Optional[np.ndarray] = None    # (bands, n_rows) uint64, ordenado por banda
+        self.band_rows: Optional[np.ndarray] = None    # (bands, n_rows) int32, linha de cada chave
+
+    def signatures(self, X: SparseMatrix, block_rows: int = 2048) -> np.ndarray:
+        n = X.shape[0]
+        sigs = np.full((n, self.num_perm), _EMPTY, dtype=np.uint32)
+        for a in range(0, n, block_rows):
+            b = min(a + block_rows, n)
+            s, e = int(X.indptr[a]), int(X.indptr[b])
+            if s == e:
+                continue
+            cols = np.asarray(X.indices[s:e], dtype=np.int64)
+            vals = (self._a[:, None] * cols[None, :] + self._b[:, None]) % _PRIME
+            lengths = np.diff(X.indptr[a:b + 1])
+            nonempty = lengths > 0
+            starts = (np.asarray(X.indptr[a:b]) - s)[nonempty]
+            sigs[a:b][nonempty] = np.minimum.reduceat(vals, starts, axis=1).T.astype(np.uint32)
+        return sigs
+
+    def _band_keys(self, sigs: np.ndarray) -> np.ndarray:
+        r = self.num_perm // self.bands
+        bands = sigs.reshape(len(sigs), self.bands, r).astype(np.uint64)
+        return (bands * self._mix).sum(axis=2).T    # overflow em uint64 é intencional (hash)
+
+    def index(self, sigs: np.ndarray) -> None:
+        keys = self._band_keys(sigs)
+        order = np.argsort(keys, axis=1, kind="stable")
+        self.band_keys = np.take_along_axis(keys, order, axis=1)
+        self.band_rows = order.astype(np.int32)
+
+    def candidates(self, sig: np.ndarray) -> np.ndarray:
+        keys = self._band_keys(sig[None, :])[:, 0]
+        out = []
+        for band, key in enumerate(keys):
+            row_keys = self.band_keys[band]
+            lo = np.searchsorted(row_keys, key, side="left")
+            hi = np.searchsorted(row_keys, key, side="right")
+            out.append(self.band_rows[band][lo:hi])
+        return np.unique(np.concatenate(out)) if out else np.zeros(0, dtype=np.int32)
+
+class SimilarityIndex:
+    """
+    Consulta as definições mais parecidas com uma definição do índice, dada pelo rótulo
+    (package.module.qname) ou só pelo qname (Classe.metodo), ou com um texto livre (text=True).
+    """
+    def __init__(
+        self,
+        matrix: SparseMatrix,
+        labels: List[str],
+        builder: FeatureBuilder,
+        lsh: Optional[MinHashLSH] = None,
+        signatures: Optional[np.ndarray] = None,
+        transposed: Optional[SparseMatrix] = None,
+    ):
+        if matrix.shape[0] != len(labels):
+            raise ValueError(f"matrix has {matrix.shape[0]} rows but {len(labels)} labels were given")
+        self.matrix = matrix
+        self.labels = labels
+        self.builder = builder
+        self.lsh = lsh
+        self.signatures = signatures
+        self._t = transposed if transposed is not None else _transpose(matrix)
+        self._rows_by_label: Dict[str, int] = {}
+        for i, lab in enumerate(labels):
+            self._rows_by_label.setdefault(lab, i)   # redefinição (ex.: getter/setter): vale a primeira
+        self._rows_by_suffix: Optional[Dict[str, List[int]]] = None
+
+    @classmethod
+    def build(
+        cls,
+        tokens: Iterable[Tokens],
+        builder: Optional[FeatureBuilder] = None,
+        lsh: Optional[MinHashLSH] = None,
+    ) -> "SimilarityIndex":
+        builder = builder if builder is not None else FeatureBuilder()
+        builder.update("__corpus__", tokens)
+        X = builder.build()
+        sigs = None
+        if lsh is not None:
+            sigs = lsh.signatures(X)
+            lsh.index(sigs)
+        return cls(X, builder.labels, builder, lsh=lsh, signatures=sigs)
+
+    def resolve(self, qname: str) -> int:
+        """
+        Linha de uma definição: rótulo completo, ou qualquer sufixo pontuado dele que seja único
+        ("Classe.metodo", "modulo.funcao"). KeyError se não existe ou é ambíguo.
+        """
+        row = self._rows_by_label.get(qname)
+        if row is not None:
+            return row
+        if self._rows_by_suffix is None:
+            suffixes: Dict[str, List[int]] = {}
+            for lab, i in self._rows_by_label.items():
+                parts = lab.split(".")
+                for j in range(1, len(parts)):
+                    suffixes.setdefault(".".join(parts[j:]), []).append(i)
+            self._rows_by_suffix = suffixes
+        rows = self._rows_by_suffix.get(qname, [])
+        if len(rows) == 1:
+            return rows[0]
+        if not rows:
+            raise KeyError(f"no definition {qname!r} in the index (use text=True for free-text queries)")
+        shown = ", ".join(self.labels[i] for i in rows[:5])
+        raise KeyError(f"{qname!r} is ambiguous ({len(rows)} definitions: {shown}{', ...' if len(rows) > 5 else ''})")
+
+    def _query_row(self, q: str, text: bool) -> Tuple[Tuple[np.ndarray, np.ndarray], Optional[int]]:
+        if text:
+            return self.builder.transform_terms(_query_terms(q)).row(0), None
+        row = self.resolve(q)
+        return self.matrix.row(row), row
+
+    def scores(self, indices: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Cosseno de um vetor (colunas, pesos já normalizados) contra todas as linhas."""
+        T = self._t
+        starts, ends = T.indptr[indices], T.indptr[indices + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(self.matrix.shape[0], dtype=np.float32)
+        # posições de todas as listas de linhas das colunas consultadas, sem laço Python
+        first = np.cumsum(lengths) - lengths
+        take = np.repeat(starts - first, lengths) + np.arange(total)
+        contrib = np.asarray(T.data)[take] * np.repeat(weights, lengths)
+        return np.bincount(np.asarray(T.indices)[take], weights=contrib, minlength=self.matrix.shape[0])
+
+    def query(self, q: str, k: int = 10, text: bool = False) -> List[Tuple[str, float]]:
+        """
+        Top-k por cosseno com a definição `q` (qname ou rótulo, ver resolve; ela mesma é excluída).
+        Com text=True, `q` é texto livre.
+        """
+        (indices, weights), self_row = self._query_row(q, text)
+        scores = self.scores(np.asarray(indices, dtype=np.int64), np.asarray(weights))
+        if self_row is not None:
+            scores[self_row] = -np.inf
+        k = min(k, len(scores) - (self_row is not None))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.labels[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def near_duplicates(self, q: str, threshold: float = 0.8, text: bool = False) -> List[Tuple[str, float]]:
+        """Linhas cuja similaridade de Jaccard estimada (MinHash) com `q` é >= threshold (q como em query)."""
+        if self.lsh is None or self.signatures is None:
+            raise RuntimeError("Index was built without MinHashLSH")
+        (indices, _weights), self_row = self._query_row(q, text)
+        if self_row is not None:
+            sig = self.signatures[self_row]
+        else:
+            one = SparseMatrix(np.asarray([0, len(indices)], dtype=np.int64), np.asarray(indices), np.ones(len(indices), dtype=np.float32), (1, self.matrix.shape[1]))
+            sig = self.lsh.signatures(one)[0]
+        cands = self.lsh.candidates(sig)
+        cands = cands[cands != self_row] if self_row is not None else cands
+        if not len(cands):
+            return []
+        jac = (self.signatures[cands] == sig).mean(axis=1)
+        keep = jac >= threshold
+        cands, jac = cands[keep], jac[keep]
+        order = np.argsort(-jac, kind="stable")
+        return [(self.labels[i], float(jac[j])) for j, i in zip(order, cands[order])]
+
+    def save(self, out_dir: str | Path) -> Path:
+        d = Path(out_dir)
+        d.mkdir(parents=True, exist_ok=True)
+        self.matrix.save(d, prefix="X")
+        self._t.save(d, prefix="T")
+        self.builder.save_model(d)
+        (d / "labels.json").write_text(json.dumps(self.labels, ensure_ascii=False), encoding="utf-8")
+        if self.lsh is not None and self.signatures is not None:
+            lsh = {"num_perm": self.lsh.num_perm, "bands": self.lsh.bands, "seed": self.lsh.seed}
+            (d / "lsh.json").write_text(json.dumps(lsh), encoding="utf-8")
+            np.save(d / "signatures.npy", self.signatures)
+            np.save(d / "band_keys.npy", self.lsh.band_keys)
+            np.save(d / "band_rows.npy", self.lsh.band_rows)
+        return d
+
+    @classmethod
+    def load(cls, in_dir: str | Path, mmap: bool = True) -> "SimilarityIndex":
+        d = Path(in_dir)
+        mode = "r" if mmap else None
+        lsh, sigs = None, None
+        if (d / "lsh.json").exists():
+            lsh = MinHashLSH(**json.loads((d / "lsh.json").read_text(encoding="utf-8")))
+            sigs = np.load(d / "signatures.npy", mmap_mode=mode)
+            lsh.band_keys = np.load(d / "band_keys.npy", mmap_mode=mode)
+            lsh.band_rows = np.load(d / "band_rows.npy", mmap_mode=mode)
+        return cls(
+            SparseMatrix.load(d, prefix="X", mmap=mmap),
+            json.loads((d / "labels.json").read_text(encoding="utf-8")),
+            FeatureBuilder.load_model(d),
+            lsh=lsh,
+            signatures=sigs,
+            transposed=SparseMatrix.load(d, prefix="T", mmap=mmap),
+        )
@@ -0,0 +1,169 @@
+"""
+Leitura incremental dos exports do service (ast.json / ast.jsonl), nó a nó.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, TextIO, Tuple
+
+from utils import open_text
+
+_DECODER = json.JSONDecoder()
+_WS = " \t\n\r"
+_CHUNK = 1 << 16
+
+class _JsonStream:
+    """Buffer deslizante sobre um arquivo texto com raw_decode para valores completos."""
+    def __init__(self, fp: TextIO, chunk_size: int = _CHUNK):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.fp.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        # descarta o que já foi consumido para manter a memória constante
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Pula espaços e retorna o próximo caractere ("" no fim do arquivo)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"JSON inválido: esperado {ch!r}, encontrado {got!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # um número no fim do buffer pode estar truncado: só aceita se algo vier depois
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def items(self) -> Iterator[None]:
+        """Itera sobre os elementos de um array; o chamador consome cada elemento."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield None
+            ch = self.peek()
+            self.pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou ']', encontrado {ch!r}")
+
+    def keys(self) -> Iterator[str]:
+        """Itera sobre as chaves de um objeto; o chamador consome cada valor."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            ch = self.peek()
+            self.pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise ValueError(f"JSON inválido: esperado ',' ou '}}', encontrado {ch!r}")
+
+def _iter_json_nodes(fp: TextIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    s = _JsonStream(fp)
+    for key in s.keys():
+        if key != "results":
+            s.value()
+            continue
+        for block_no, _ in enumerate(s.items()):
+            for bkey in s.keys():
+                if bkey != "nodes":
+                    s.value()
+                    continue
+                for _ in s.items():
+                    yield block_no, s.value()
+
+def _iter_jsonl_nodes(fp: TextIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    block_no = -1
+    for line in fp:
+        if not line.strip():
+            continue
+        block = json.loads(line)
+        if "nodes" not in block:   # cabeçalho ({"strategy": ...})
+            continue
+        block_no += 1
+        for node in block["nodes"]:
+            yield block_no, node
+
+def _is_jsonl(in_p: Path) -> bool:
+    return in_p.suffix == ".jsonl" or in_p.suffixes[-2:] == [".jsonl", ".gz"]
+
+def iter_file_blocks(in_path: str | Path, meta: Dict[str, Any] | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    Itera os blocos por arquivo ({"file", "node_count", "nodes"}) de um export JSON/JSONL,
+    um bloco por vez na memória. As chaves de topo (ex.: "strategy") vão para `meta`.
+    """
+    in_p = Path(in_path)
+    meta = meta if meta is not None else {}
+    with open_text(in_p) as fp:
+        if _is_jsonl(in_p):
+            for line in fp:
+                if not line.strip():
+                    continue
+                block = json.loads(line)
+                if "nodes" not in block:
+                    meta.update(block)
+                    continue
+                yield block
+            return
+        s = _JsonStream(fp)
+        for key in s.keys():
+            if key != "results":
+                meta[key] = s.value()
+                continue
+            for _ in s.items():
+                yield s.value()
+
+def iter_nodes(in_path: str | Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Itera (índice do arquivo, nó) sobre um export do service sem carregar o payload inteiro.
+    Aceita o JSON de export_json e o JSONL de export_jsonl (uma linha por arquivo),
+    também comprimidos (.json.gz / .jsonl.gz), e o binário .astb de export_binary.
+    """
+    in_p = Path(in_path)
+    if in_p.suffix == ".astb":
+        from binfmt import iter_binary_nodes
+        yield from iter_binary_nodes(in_p)
+        return
+    with open_text(in_p) as fp:
+        if _is_jsonl(in_p):
+            yield from _iter_jsonl_nodes(fp)
+        else:
+            yield from _iter_json_nodes(fp)
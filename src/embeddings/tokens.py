@@ -1,17 +1,25 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Sequence, TextIO, Tuple
 import json
 import os
 import re
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, fields as dc_fields
 from logger import logger
-from utils import split_identifier  
+from utils import open_text, split_identifier
+from embeddings.stream import iter_nodes
+
+if TYPE_CHECKING:
+    from astcore.model import TNode
+    from service import AnalysisResult, FileAnalysis
 
 _WORD = re.compile(r"[A-Za-z0-9_]+")
 
-@dataclass
+TOKEN_FIELDS = ("type", "name", "params", "docstring", "comments", "tags", "bases", "decorators", "path")
+
+@dataclass(slots=True)
 class Tokens:
     name: str
     type: str
@@ -28,37 +36,66 @@ class Tokens:
     package: str | None
     module: str | None
     rel_path: str | None
+    # fora do ast_tokens.json (metadata export=False): só para os índices
+    decorator_names: List[str] = field(default_factory=list, metadata={"export": False})   # pontuados, sem argumentos
+    qname: str | None = field(default=None, metadata={"export": False})                    # Classe.metodo
+    # cache de `flat`: os campos não devem ser alterados depois do primeiro acesso
+    _flat: List[str] | None = field(default=None, init=False, repr=False, compare=False)
 
     @property
     def flat(self) -> List[str]:
-        tokens: list[str] = []
-        if self.type:
-            tokens.append(f"ast_{self.type.lower()}")
+        """Todos os tokens em sequência; calculado uma vez e compartilhado (não altere a lista)."""
+        if self._flat is None:
+            tokens: list[str] = []
+            for _field, toks in self.fields():
+                tokens += toks
+            self._flat = tokens
+        return self._flat
 
-        tokens += split_identifier(self.name)
-        tokens += self.params
-        tokens += self.docstring
-        tokens += self.leading_comments
+    def to_dict(self) -> Dict[str, Any]:
+        """Campos públicos como dict (formato de ast_tokens.json)."""
+        return {f.name: getattr(self, f.name) for f in _PUBLIC_FIELDS}
 
+    def fields(self) -> List[Tuple[str, Sequence[str]]]:
+        """Tokens agrupados por campo (ver TOKEN_FIELDS), na mesma ordem de `flat`."""
+        type_tag = [f"ast_{self.type.lower()}"] if self.type else []
+
+        tags: list[str] = []
         if self.class_kind:
-            tokens.append(f"class_{self.class_kind}")
+            tags.append(f"class_{self.class_kind}")
         if self.method_kind:
-            tokens.append(f"method_{self.method_kind}")
+            tags.append(f"method_{self.method_kind}")
         if self.visibility:
-            tokens.append(f"vis_{self.visibility}")
+            tags.append(f"vis_{self.visibility}")
         if self.is_dataclass:
-            tokens.append("tag_dataclass")
+            tags.append("tag_dataclass")
         if self.is_final:
-            tokens.append("tag_final")
+            tags.append("tag_final")
+
+        path = _path_tokens(self.package, self.module, self.rel_path)
 
-        tokens += self.base_classes
-        tokens += self.decorators
+        return [
+            ("type", type_tag),
+            ("name", split_identifier(self.name)),
+            ("params", self.params),
+            ("docstring", self.docstring),
+            ("comments", self.leading_comments),
+            ("tags", tags),
+            ("bases", self.base_classes),
+            ("decorators", self.decorators),
+            ("path", path),
+        ]
 
-        for part in filter(None, [self.package, self.module, self.rel_path]):
-            tokens += _split_path_to_tokens(str(part))
 
-        return tokens
+_PUBLIC_FIELDS = tuple(f for f in dc_fields(Tokens) if not f.name.startswith("_") and f.metadata.get("export", True))
 
+@lru_cache(maxsize=16384)
+def _path_tokens(package: str | None, module: str | None, rel_path: str | None) -> Tuple[str, ...]:
+    """Tokens de package/module/rel_path; iguais para todas as definições de um arquivo, então são cacheados."""
+    out: list[str] = []
+    for part in filter(None, [package, module, rel_path]):
+        out += _split_path_to_tokens(str(part))
+    return tuple(out)
 
 def _tokenize_text(text: str | None) -> list[str]:
     if not text:
@@ -113,11 +150,8 @@ def _build_tokens_for_node_dict(node: Dict[str, Any]) -> Tokens | None:
         for tok in split_identifier(str(b))
     ]
 
-    decorators = [
-        tok
-        for d in (node.get("decorators") or [])
-        for tok in split_identifier(str(d))
-    ]
+    decorator_names = [str(d) for d in (node.get("decorators") or [])]
+    decorators = [tok for d in decorator_names for tok in split_identifier(d)]
 
     class_kind  = node.get("class_kind")
     method_kind = node.get("method_kind")
@@ -145,34 +179,95 @@ def _build_tokens_for_node_dict(node: Dict[str, Any]) -> Tokens | None:
         package=package,
         module=module,
         rel_path=rel_path,
+        decorator_names=decorator_names,
+        qname=node.get("qname"),
     )
 
+def _iter_tokens_from_nodes(nodes: Iterable[Tuple[int, Dict[str, Any]]]) -> Iterator[Tokens]:
+    """
+    Constrói Tokens a partir de pares (índice do arquivo, nó), descartando cedo os nós sem nome.
+    Dentro de cada arquivo a ordem é invertida (mesma ordem de collect_tokens_from_payload).
+    """
+    pending: list[Tokens] = []
+    current: int | None = None
+    for block_no, node in nodes:
+        if block_no != current:
+            yield from reversed(pending)
+            pending = []
+            current = block_no
+        if not node.get("name"):
+            continue
+        t = _build_tokens_for_node_dict(node)
+        if t is not None:
+            pending.append(t)
+    yield from reversed(pending)
+
+def _tnode_fields(t: "TNode") -> Dict[str, Any]:
+    """Visão de um TNode com as chaves que _build_tokens_for_node_dict lê do nó exportado."""
+    return {
+        "name": t.name,
+        "qname": t.qname,
+        "py_node": {"type": t.node_type},
+        "params": t.params,
+        "docstring": t.docstring,
+        "leading_comment_block": t.leading_comment_block,
+        "base_classes": t.base_classes,
+        "decorators": t.decorators,
+        "class_kind": t.class_kind,
+        "method_kind": t.method_kind,
+        "visibility": t.visibility,
+        "is_dataclass": t.is_dataclass,
+        "is_final": t.is_final,
+        "package": t.package,
+        "module": t.module,
+        "rel_path": t.rel_path,
+    }
+
+def iter_tokens_from_file_analysis(fa: "FileAnalysis") -> Iterator[Tokens]:
+    """Tokens de um único arquivo analisado, na mesma ordem do export."""
+    if not fa.tnodes:   # resultado vindo de um worker sem TNodes (ex.: transfer="shm"): usa os nós exportados
+        return _iter_tokens_from_nodes((0, n) for n in fa.nodes_json)
+    return _iter_tokens_from_nodes((0, _tnode_fields(t)) for t in fa.tnodes if t.name)
+
+def iter_tokens_from_result(result: "AnalysisResult") -> Iterator[Tokens]:
+    """
+    Constrói Tokens direto dos TNodes de um AnalysisResult, sem passar por JSON.
+    Produz a mesma sequência que collect_tokens_from_file sobre o export desse resultado.
+    """
+    for fa in result.files:
+        yield from iter_tokens_from_file_analysis(fa)
+
 def collect_tokens_from_payload(payload: Dict[str, Any]) -> List[Tokens]:
-    all_tokens: list[Tokens] = []
-    for file_block in payload.get("results", []):
-        for node in file_block.get("nodes", []):
-            t = _build_tokens_for_node_dict(node)
-            if t is not None:
-                all_tokens.append(t)
-    return all_tokens
-# aqui
-def collect_tokens_from_payload(payload: Dict[str, Any]) -> List[Tokens]:
-    all_tokens: list[Tokens] = []
-    for file_block in payload.get("results", []):
-        for node in reversed(file_block.get("nodes", [])):
-            t = _build_tokens_for_node_dict(node)
-            if t is not None:
-                all_tokens.append(t)
-    return all_tokens
+    nodes = (
+        (block_no, node)
+        for block_no, file_block in enumerate(payload.get("results", []))
+        for node in file_block.get("nodes", [])
+    )
+    return list(_iter_tokens_from_nodes(nodes))
+
+def iter_tokens_from_file(in_path: str | Path) -> Iterator[Tokens]:
+    """
+    Lê o export do service (ast.json ou ast.jsonl) em streaming e produz Tokens sob demanda.
+    """
+    return _iter_tokens_from_nodes(iter_nodes(in_path))
 
 def collect_tokens_from_file(in_path: str | Path) -> List[Tokens]:
     """
     Lê o JSON exportado pelo service e devolve uma lista de instâncias de Tokens.
     """
-    in_p = Path(in_path)
-    data = json.loads(in_p.read_text(encoding="utf-8"))
-    return collect_tokens_from_payload(data)
+    return list(iter_tokens_from_file(in_path))
 
+def _write_json_array(fp: TextIO, items: Iterable[Dict[str, Any]]) -> None:
+    """
+    Escreve uma lista JSON item a item, com a mesma saída de json.dumps(list, ensure_ascii=False, indent=2).
+    """
+    first = True
+    for item in items:
+        fp.write("[\n" if first else ",\n")
+        first = False
+        text = json.dumps(item, ensure_ascii=False, indent=2)
+        fp.write("  " + text.replace("\n", "\n  "))
+    fp.write("[]" if first else "\n]")
 
 def export_tokens_as_json(
     in_path: str | Path,
@@ -181,9 +276,9 @@ def export_tokens_as_json(
     """
     Gera um JSON só com os Tokens (cada entrada é um dict do dataclass Tokens).
     Útil se você quiser inspecionar / salvar dataset intermediário.
+    Lê e escreve de forma incremental: a memória não cresce com o tamanho da entrada.
     """
     in_p = Path(in_path)
-    tokens_list = collect_tokens_from_file(in_p)
 
     if out_path is None:
         logger.info(f"Nenhum caminho de saída fornecido, salvando em {in_p.stem}_tokens.json")
@@ -191,10 +286,18 @@ def export_tokens_as_json(
     else:
         out_p = Path(out_path)
 
-    serializable = [asdict(t) for t in tokens_list]
-    out_p.write_text(
-        json.dumps(serializable, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
-    return out_p
+    return _write_tokens_json(out_p, iter_tokens_from_file(in_p))
 
+def export_tokens_from_result(
+    result: "AnalysisResult",
+    out_path: str | Path,
+) -> Path:
+    """
+    Gera o mesmo JSON de Tokens que export_tokens_as_json, mas direto do AnalysisResult em memória.
+    """
+    return _write_tokens_json(Path(out_path), iter_tokens_from_result(result))
+
+def _write_tokens_json(out_p: Path, tokens: Iterable[Tokens]) -> Path:
+    with open_text(out_p, "w") as fp:
+        _write_json_array(fp, (t.to_dict() for t in tokens))
+    return out_p
@@ -0,0 +1,126 @@
+# src/embeddings/vocab.py
+"""
+Vocabulário de tokens -> ids int32 e corpus em formato CSR (offsets + ids) sobre NumPy.
+"""
+from __future__ import annotations
+import json
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from embeddings.tokens import Tokens
+
+class _TokenIndex(dict):
+    """dict token -> id que atribui o próximo id a tokens novos (lookup em C via __getitem__)."""
+    def __init__(self, tokens: List[str]):
+        super().__init__((tok, i) for i, tok in enumerate(tokens))
+        self.tokens = tokens
+
+    def __missing__(self, token: str) -> int:
+        i = len(self.tokens)
+        self[token] = i
+        self.tokens.append(token)
+        return i
+
+class Vocabulary:
+    """Mapeia tokens para ids densos (0..n-1), na ordem em que aparecem."""
+    def __init__(self, tokens: Iterable[str] = ()):
+        self._index = _TokenIndex([])
+        for tok in tokens:
+            self._index[tok]
+
+    def __len__(self) -> int:
+        return len(self._index.tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._index
+
+    def add(self, token: str) -> int:
+        return self._index[token]
+
+    def get(self, token: str, default: int = -1) -> int:
+        return dict.get(self._index, token, default)
+
+    def token(self, token_id: int) -> str:
+        return self._index.tokens[token_id]
+
+    @property
+    def tokens(self) -> List[str]:
+        return self._index.tokens
+
+    def encode(self, tokens: Iterable[str]) -> np.ndarray:
+        """Codifica tokens em ids int32, adicionando ao vocabulário os que forem novos."""
+        return np.fromiter(map(self._index.__getitem__, tokens), dtype=np.int32)
+
+    def save(self, path: str | Path) -> Path:
+        out = Path(path)
+        out.write_text(json.dumps(self._index.tokens, ensure_ascii=False), encoding="utf-8")
+        return out
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Vocabulary":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+@dataclass(frozen=True)
+class TokenCorpus:
+    """
+    Corpus em CSR: os tokens do documento i são ids[offsets[i]:offsets[i+1]].
+    """
+    offsets: np.ndarray   # int64, len = n_docs + 1
+    ids: np.ndarray       # int32
+    vocab: Vocabulary
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def doc(self, i: int) -> np.ndarray:
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def decode(self, i: int) -> List[str]:
+        toks = self.vocab.tokens
+        return [toks[j] for j in self.doc(i).tolist()]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(len(self)):
+            yield self.doc(i)
+
+    def save(self, out_dir: str | Path) -> Path:
+        """Salva offsets.npy, ids.npy e vocab.json em out_dir."""
+        d = Path(out_dir)
+        d.mkdir(parents=True, exist_ok=True)
+        np.save(d / "offsets.npy", self.offsets)
+        np.save(d / "ids.npy", self.ids)
+        self.vocab.save(d / "vocab.json")
+        return d
+
+    @classmethod
+    def load(cls, in_dir: str | Path, mmap: bool = True) -> "TokenCorpus":
+        """Carrega um corpus salvo; com mmap=True os arrays são mapeados, sem cópia."""
+        d = Path(in_dir)
+        mode = "r" if mmap else None
+        return cls(
+            offsets=np.load(d / "offsets.npy", mmap_mode=mode),
+            ids=np.load(d / "ids.npy", mmap_mode=mode),
+            vocab=Vocabulary.load(d / "vocab.json"),
+        )
+
+def encode_corpus(tokens: Iterable[Tokens], vocab: Vocabulary | None = None) -> TokenCorpus:
+    """
+    Codifica uma sequência de Tokens (um documento por definição) em um TokenCorpus.
+    Reaproveita `vocab` se fornecido, estendendo-o com tokens novos.
+    """
+    vocab = vocab if vocab is not None else Vocabulary()
+    lookup = vocab._index.__getitem__
+    ids = array("i")
+    offsets = array("q", [0])
+    for t in tokens:
+        ids.extend(map(lookup, t.flat))
+        offsets.append(len(ids))
+    return TokenCorpus(
+        offsets=np.frombuffer(offsets, dtype=np.int64).copy(),
+        ids=np.frombuffer(ids, dtype=np.int32).copy(),
+        vocab=vocab,
+    )
@@ -1,22 +1,98 @@
+import atexit
 import logging
+import os
+import queue
+import threading
 from logging import StreamHandler, FileHandler, Formatter
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 FORMATTER = Formatter(" %(levelname)s | %(module)s:%(funcName)s:line%(lineno)d - %(message)s")
 
+# Configuração por ambiente:
+#   GRAPH_AST_LOG_LEVEL  nível (DEBUG, INFO, WARNING, ... ou número); padrão INFO
+#   GRAPH_AST_LOG_FILE   arquivo de log; vazio desliga o arquivo; padrão app.log
+#   GRAPH_AST_LOG_ASYNC  "0" escreve no mesmo thread; padrão: handlers atrás de uma fila
+ENV_LEVEL = "GRAPH_AST_LOG_LEVEL"
+ENV_FILE = "GRAPH_AST_LOG_FILE"
+ENV_ASYNC = "GRAPH_AST_LOG_ASYNC"
+
+LEVEL_NAMES = ("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG", "NOTSET")
+
+def parse_level(raw: str) -> int | None:
+    """Nome de nível (qualquer caixa, inclusive níveis de logging.addLevelName) ou número; None se inválido."""
+    raw = raw.strip()
+    if raw.isdigit():
+        return int(raw)
+    level = logging.getLevelName(raw.upper())
+    return level if isinstance(level, int) else None
+
+def level_from_env(default: int = logging.INFO) -> int:
+    raw = os.environ.get(ENV_LEVEL, "").strip()
+    if not raw:
+        return default
+    level = parse_level(raw)
+    return level if level is not None else default
+
+class AsyncHandler(QueueHandler):
+    """
+    QueueHandler whose QueueListener (the thread that really writes) starts on the first
+    record, so the analysis thread only pays for a queue put. Restarts itself after fork.
+    """
+    def __init__(self, handlers: list[logging.Handler]):
+        super().__init__(queue.SimpleQueue())
+        self.targets = handlers
+        self._listener: QueueListener | None = None
+        self._pid: int | None = None
+        self._owner_pid = os.getpid()
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            if pid != self._owner_pid:
+                # processo filho: a fila e o thread do pai não servem aqui,
+                # e o arquivo de log do pai não deve ser truncado de novo
+                self.queue = queue.SimpleQueue()
+                for h in self.targets:
+                    if isinstance(h, FileHandler):
+                        h.mode = "a"
+            self._listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self._listener.start()
+            self._pid = pid
+            atexit.register(self.stop)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self) -> None:
+        """Flush pending records and stop the writer thread."""
+        with self._start_lock:
+            listener, self._listener = self._listener, None
+            if listener is not None and self._pid == os.getpid():
+                listener.stop()
+            self._pid = None
+
 class Logger:
     def __init__(
         self,
         level: int = logging.DEBUG,
         log_file: str | None = None,
         handlers: list[logging.Handler] | None = None,
-        formatter: Formatter = FORMATTER
+        formatter: Formatter = FORMATTER,
+        use_queue: bool = False,
     ):
         self.level = level
         self.log_file = log_file
         self.logger = logging.getLogger(__name__)
         self.logger.propagate = False   # evita log duplicado no root logger
         self.formatter = formatter
+        self.use_queue = use_queue
 
         default_handlers: list[logging.Handler] = [self._create_console_handler()]
 
@@ -38,24 +114,53 @@ class Logger:
             path.parent.mkdir(parents=True, exist_ok=True)
 
         # mode="w" => sobrescreve o arquivo a cada execução
-        handler = FileHandler(path, mode="w", encoding="utf-8")
+        # delay=True => o arquivo só é aberto na primeira mensagem, não no import
+        handler = FileHandler(path, mode="w", encoding="utf-8", delay=True)
         handler.setLevel(self.level)
         handler.setFormatter(self.formatter)
         return handler
-    
+
     def add_handler(self, handler: logging.Handler) -> None:
         self.logger.addHandler(handler)
 
     def _setup_logger(self) -> None:
         if self.logger.handlers:
+            for handler in list(self.logger.handlers):
+                if isinstance(handler, AsyncHandler):
+                    handler.stop()
             self.logger.handlers.clear()
 
-        for handler in self.handlers:
-            self.add_handler(handler)
+        if self.use_queue:
+            self.add_handler(AsyncHandler(self.handlers))
+        else:
+            for handler in self.handlers:
+                self.add_handler(handler)
 
         self.logger.setLevel(self.level)
 
     def get_logger(self) -> logging.Logger:
         return self.logger
 
-logger = Logger(log_file="app.log").get_logger()
+def configure_logging(
+    level: int | str | None = None,
+    log_file: str | None = "app.log",
+    use_queue: bool = True,
+) -> logging.Logger:
+    """
+    (Re)configure the shared logger in place; modules that imported `logger` see the change.
+    `level=None` reads GRAPH_AST_LOG_LEVEL; `log_file=None` disables the file handler.
+    An unknown level name raises ValueError (the env variable falls back to INFO instead).
+    """
+    if level is None:
+        level = level_from_env()
+    elif isinstance(level, str):
+        parsed = parse_level(level)
+        if parsed is None:
+            raise ValueError(f"Invalid log level: {level!r}. Options: {LEVEL_NAMES} or a number")
+        level = parsed
+    return Logger(level=level, log_file=log_file, use_queue=use_queue).get_logger()
+
+logger = configure_logging(
+    log_file=os.environ.get(ENV_FILE, "app.log") or None,
+    use_queue=os.environ.get(ENV_ASYNC, "1") != "0",
+)
@@ -0,0 +1,187 @@
+"""
+Contabilidade de memória por estágio do pipeline (opt-in): snapshots do tracemalloc e leituras
+de RSS nas fronteiras de cada estágio (read, parse, comments, walk, jsonable, export, tokens),
+por arquivo e no agregado, com os principais sites de alocação de cada estágio.
+
+O service chama `stage(...)`/`file_scope(...)` sempre; sem um profiler ativo elas devolvem um
+contexto vazio. O profiler é do processo (como o próprio tracemalloc): use com workers=1.
+"""
+from __future__ import annotations
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+_NULL = nullcontext()
+_ACTIVE: Optional["MemoryProfiler"] = None
+MEM_SUFFIX = ".mem.json"
+
+def current_rss() -> Optional[int]:
+    """RSS atual em bytes (Linux, /proc/self/statm); None onde não há como ler sem dependências."""
+    try:
+        with open("/proc/self/statm", "rb") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def report_path(export_path: str | Path) -> Path:
+    """ast.json / ast.jsonl.gz / ast.astb -> ast.mem.json, no mesmo diretório."""
+    p = Path(export_path)
+    name = p.name
+    for suffix in (".gz", ".json", ".jsonl", ".astb"):
+        if name.endswith(suffix) and len(name) > len(suffix):
+            name = name[: -len(suffix)]
+    return p.with_name(name + MEM_SUFFIX)
+
+@dataclass
+class StageTotals:
+    calls: int = 0
+    seconds: float = 0.0
+    retained: int = 0          # soma do que cada chamada alocou e deixou vivo
+    peak: int = 0              # maior pico de uma chamada
+    rss_delta: int = 0
+    sites: Dict[str, List[int]] = field(default_factory=dict)   # "arquivo:linha" -> [bytes, blocos]
+
+class MemoryProfiler:
+    """
+    Liga o tracemalloc e mede cada estágio. No começo de cada estágio os traces são zerados
+    (clear_traces), então "retained" é o que o estágio alocou e ainda está vivo no fim dele e "peak"
+    é o pico dessas alocações; liberar blocos de estágios anteriores não entra na conta (o RSS dá
+    a visão global). Assim o snapshot só tem as alocações do estágio e sai barato; mesmo assim,
+    `snapshot_every` tira os snapshots (sites) só a cada N arquivos. Os bytes são sempre medidos.
+    """
+    def __init__(self, top: int = 10, frames: int = 1, snapshot_every: int = 1):
+        self.top = top
+        self.frames = frames
+        self.snapshot_every = max(1, snapshot_every)
+        self.stages: Dict[str, StageTotals] = {}
+        self.files: List[Dict[str, Any]] = []
+        self._file: Optional[Dict[str, Any]] = None
+        self._file_no = 0
+        self._started_tracing = False
+        self._rss_start: Optional[int] = None
+        self._rss_peak: Optional[int] = None
+        self._skip = {tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>",
+                      "<frozen importlib._bootstrap_external>", "<unknown>"}
+
+    def start(self) -> "MemoryProfiler":
+        global _ACTIVE
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._rss_start = self._rss_peak = current_rss()
+        _ACTIVE = self
+        return self
+
+    def stop(self) -> None:
+        global _ACTIVE
+        if _ACTIVE is self:
+            _ACTIVE = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self) -> "MemoryProfiler":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _snapshots_on(self) -> bool:
+        return self.top > 0 and (self._file is None or (self._file_no - 1) % self.snapshot_every == 0)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tracemalloc.clear_traces()   # daqui em diante só o que o estágio aloca
+        rss0 = current_rss()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            retained, peak = tracemalloc.get_traced_memory()
+            snap = tracemalloc.take_snapshot() if self._snapshots_on() else None
+            rss1 = current_rss()
+            if rss1 is not None:
+                self._rss_peak = max(self._rss_peak or 0, rss1)
+            totals = self.stages.setdefault(name, StageTotals())
+            totals.calls += 1
+            totals.seconds += dt
+            totals.retained += retained
+            totals.peak = max(totals.peak, peak)
+            if rss0 is not None and rss1 is not None:
+                totals.rss_delta += rss1 - rss0
+            if snap is not None:
+                for st in snap.statistics("lineno"):
+                    frame = st.traceback[0]
+                    if frame.filename in self._skip:
+                        continue
+                    site = totals.sites.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+                    site[0] += st.size
+                    site[1] += st.count
+            if self._file is not None:
+                self._file["stages"][name] = {"retained": retained, "peak": peak}
+                self._file["retained"] += retained
+                self._file["peak"] = max(self._file["peak"], peak)
+
+    @contextmanager
+    def file_scope(self, path: str | Path) -> Iterator[None]:
+        """Agrupa os estágios de um arquivo: retained = soma dos estágios, peak = o maior deles."""
+        self._file_no += 1
+        self._file = {"file": str(path), "retained": 0, "peak": 0, "stages": {}}
+        try:
+            yield
+        finally:
+            self.files.append(self._file)
+            self._file = None
+
+    def report(self) -> Dict[str, Any]:
+        stages = {}
+        for name, s in self.stages.items():
+            top = sorted(s.sites.items(), key=lambda kv: kv[1][0], reverse=True)[: self.top]
+            stages[name] = {
+                "calls": s.calls,
+                "seconds": round(s.seconds, 6),
+                "retained": s.retained,
+                "peak": s.peak,
+                "rss_delta": s.rss_delta,
+                "top_sites": [{"site": site, "bytes": b, "blocks": n} for site, (b, n) in top],
+            }
+        files = sorted(self.files, key=lambda f: f["peak"], reverse=True)
+        return {
+            "tracemalloc": {"frames": self.frames, "snapshot_every": self.snapshot_every},
+            "rss": {"start": self._rss_start, "end": current_rss(), "peak": self._rss_peak},
+            "stages": stages,
+            "files": files,   # maior pico primeiro
+        }
+
+    def write(self, out_path: str | Path) -> Path:
+        out = Path(out_path)
+        out.write_text(json.dumps(self.report(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return out
+
+    def summary(self) -> List[str]:
+        lines = []
+        for name, s in self.stages.items():
+            lines.append(f"mem {name:9} retained {s.retained / 1e6:8.2f} MB, peak {s.peak / 1e6:8.2f} MB "
+                         f"({s.calls} calls, {s.seconds:.2f} s)")
+        if self.files:
+            worst = max(self.files, key=lambda f: f["peak"])
+            lines.append(f"mem worst    {worst['peak'] / 1e6:.2f} MB peak in {worst['file']}")
+        return lines
+
+def stage(name: str):
+    """Contexto do estágio `name` no profiler ativo; sem profiler, um contexto vazio."""
+    prof = _ACTIVE
+    return prof.stage(name) if prof is not None else _NULL
+
+def file_scope(path: str | Path):
+    prof = _ACTIVE
+    return prof.file_scope(path) if prof is not None else _NULL
+
+def active() -> Optional[MemoryProfiler]:
+    return _ACTIVE
@@ -1,3 +1,4 @@
+from __future__ import annotations
 import ast
 from astcore.pass_registry import register_pass
 from astcore.model import TNode, Ctx
@@ -10,10 +11,17 @@ from logger import logger
     name="class_kind",
     phase=Phase.ENRICH,
     order=40,
+    requires=("names_visibility",),   # usa t.decorators
     node_types=(ast.ClassDef,),
-    provides=("class_kind", "base_classes", "metaclass", "is_dataclass", "is_final", "is_enum", "abstract_methods")
+    provides=("class_kind", "base_classes", "metaclass", "is_dataclass", "is_final", "is_enum", "abstract_methods"),
+    pure=True,
+    batch=True,
 )
-def pass_class_kind(t: TNode, n: ast.AST, ctx: Ctx) -> None:
+def pass_class_kind(items: list[tuple[TNode, ast.AST]], ctx: Ctx) -> None:
+    for t, n in items:
+        _class_kind(t, n)
+
+def _class_kind(t: TNode, n: ast.ClassDef) -> None:
     t.base_classes = [unparse_safe(b) or "<unknown>" for b in n.bases]
 
     for kw in (n.keywords or []):
@@ -45,6 +45,7 @@ def _collect_raises(n: ast.AST) -> list[str]:
     requires=("names_visibility",),          # já traz t.is_method, t.args, decorators
     node_types=(ast.FunctionDef, ast.AsyncFunctionDef),
     provides=("params","return_annotation","is_generator","raises"),
+    pure=True,
 )
 def pass_io_signature(t: TNode, n: ast.AST, ctx: Ctx) -> None:
     fn: ast.FunctionDef | ast.AsyncFunctionDef = n 
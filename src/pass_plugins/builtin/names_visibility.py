@@ -16,10 +16,8 @@ def pass_names_visibility(t: TNode, n: ast.AST, ctx: Ctx) -> None:
     if isinstance(n, ast.ClassDef):
         t.is_class = True
         t.name = n.name
-        if ctx.class_stack:
-            t.qname = ".".join(ctx.class_stack + [n.name])
-        else:
-            t.qname = n.name
+        # no ENRICH o walker já empilhou o próprio nó: a pilha termina em n.name
+        t.qname = ".".join(ctx.class_stack) or n.name
         t.decorators = [decorator_to_str(d) for d in n.decorator_list]
         t.visibility = classify_visibility(n.name)
     elif isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)):
@@ -29,8 +27,4 @@ def pass_names_visibility(t: TNode, n: ast.AST, ctx: Ctx) -> None:
         t.is_method = bool(ctx.class_stack)
         args = n.args.posonlyargs + n.args.args
         t.args = [a.arg for a in args]
-        stack = ctx.class_stack + ctx.func_stack
-        if stack:
-            t.qname = ".".join(stack + [n.name])
-        else:
-            t.qname = n.name
+        t.qname = ".".join(ctx.class_stack + ctx.func_stack) or n.name
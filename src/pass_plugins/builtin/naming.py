@@ -1,3 +1,4 @@
+from __future__ import annotations
 import ast
 from astcore.pass_registry import register_pass
 from astcore.model import TNode, Ctx
@@ -10,11 +11,19 @@ from logger import logger
     phase=Phase.ENRICH,
     order=20,
     requires=("names_visibility",),           
-    node_types=(ast.AST,),
-    provides=("orig_name", "name_tokens", "naming_style")
+    node_types=(ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef),   # só eles recebem t.name
+    provides=("orig_name", "name_tokens", "naming_style"),
+    batch=True,
 )
-def pass_naming_conventions(t: TNode, n: ast.AST, ctx: Ctx) -> None:
-    if t.name:
+def pass_naming_conventions(items: list[tuple[TNode, ast.AST]], ctx: Ctx) -> None:
+    # um split/estilo por nome distinto do arquivo (métodos como __init__/run se repetem muito)
+    seen: dict[str, tuple[list[str], str | None]] = {}
+    for t, _ in items:
+        if not t.name:
+            continue
+        done = seen.get(t.name)
+        if done is None:
+            done = seen[t.name] = (split_identifier(t.name), detect_naming_style(t.name))
         t.orig_name = t.name
-        t.name_tokens = split_identifier(t.name)
-        t.naming_style = detect_naming_style(t.name)
\ No newline at end of file
+        t.name_tokens = list(done[0])
+        t.naming_style = done[1]
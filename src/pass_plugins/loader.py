@@ -4,6 +4,7 @@ Loader for pass plugins.
 import importlib
 from types import ModuleType
 from typing import Iterable, Protocol, runtime_checkable
+from astcore.errors import PluginError
 from logger import logger
 
 @runtime_checkable
@@ -12,17 +13,29 @@ class PluginInterface(Protocol):
     def initialize() -> None:
         ...
 
+# plugins já inicializados neste processo (o import e o registro dos passes acontecem uma vez)
+_LOADED: set[str] = set()
+
 def import_module(name: str) -> ModuleType | PluginInterface:
     return importlib.import_module(name)
 
 def load_pass_plugins(plugins: Iterable[str]) -> None:
     """ 
     Load and initialize pass plugins.
+    Plugins are imported on first use only; repeated calls are no-ops.
     """
     for plugin_name in plugins:
-        plugin = import_module(plugin_name)
-        init = getattr(plugin, "initialize", None)
+        if plugin_name in _LOADED:
+            continue
+        try:
+            plugin = import_module(plugin_name)
+            init = getattr(plugin, "initialize", None)
+            if callable(init):
+                init()
+        except PluginError as e:   # passes inválidos (registro/dependências): loga uma vez aqui
+            logger.error(f"Plugin {plugin_name}: {e}")
+            raise
         if callable(init):
-            init() 
+            _LOADED.add(plugin_name)
         else:
             raise RuntimeError(f"Plugin {plugin_name} does not have an 'initialize' function.")
\ No newline at end of file
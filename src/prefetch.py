@@ -0,0 +1,131 @@
+"""
+Prefetch de leitura: um pool pequeno de threads lê os bytes dos próximos arquivos (até `depth`
+arquivos e `max_bytes` bytes à frente) enquanto o arquivo atual é parseado e percorrido.
+A leitura solta o GIL, então a latência de disco/rede fica escondida atrás do trabalho de CPU.
+"""
+from __future__ import annotations
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, Tuple
+
+DEFAULT_THREADS = 4
+DEFAULT_MAX_BYTES = 64 << 20
+
+@dataclass
+class IOStats:
+    """Tempo esperando leitura (io_wait) x tempo do consumidor entre arquivos (compute), em segundos."""
+    files: int = 0
+    bytes: int = 0
+    io_wait: float = 0.0
+    compute: float = 0.0
+
+def decode_source(data: bytes) -> str:
+    """Mesmo texto que Path.read_text: tenta utf-8, utf-8-sig e latin-1, com newlines universais."""
+    for enc in ("utf-8", "utf-8-sig", "latin-1"):
+        try:
+            text = data.decode(enc)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        text = data.decode(errors="ignore")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+class Prefetcher:
+    """
+    Itera (path, bytes | OSError) na ordem de `paths`. Com depth=0 lê de forma síncrona (o tempo
+    de leitura inteiro conta como io_wait); com depth>0 mantém até `depth` leituras adiantadas.
+    O orçamento `max_bytes` é reservado na submissão, pelo tamanho do arquivo (stat), e devolvido
+    na entrega: ele limita os bytes em voo + lidos e não consumidos, não só os já lidos (sempre há
+    pelo menos uma leitura em voo, então um arquivo maior que o orçamento não trava).
+    Erros de leitura são entregues no lugar dos bytes, para o consumidor decidir.
+    """
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        *,
+        depth: int = 0,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        threads: int = DEFAULT_THREADS,
+        stats: IOStats | None = None,
+    ):
+        self._paths = iter(paths)
+        self.depth = max(0, depth)
+        self.max_bytes = max_bytes
+        self.threads = max(1, min(threads, self.depth or 1))
+        self.stats = stats if stats is not None else IOStats()
+        self.reserved = 0   # bytes reservados pelas leituras submetidas e ainda não entregues
+
+    @staticmethod
+    def _read(p: Path) -> bytes | OSError:
+        try:
+            return p.read_bytes()
+        except OSError as e:
+            return e
+
+    @staticmethod
+    def _size(p: Path) -> int:
+        # estimativa da reserva; se o stat falha a leitura também falha e entrega o erro
+        try:
+            return p.stat().st_size
+        except OSError:
+            return 0
+
+    def __iter__(self) -> Iterator[Tuple[Path, bytes | OSError]]:
+        if not self.depth:
+            yield from self._iter_sync()
+            return
+        pending: Deque[Tuple[Path, Future, int]] = deque()
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="prefetch") as pool:
+            nxt: Tuple[Path, int] | None = None   # próximo arquivo, já com tamanho, esperando orçamento
+            exhausted = False
+
+            def refill() -> None:
+                nonlocal nxt, exhausted
+                while not exhausted and len(pending) < self.depth:
+                    if nxt is None:
+                        p = next(self._paths, None)
+                        if p is None:
+                            exhausted = True
+                            return
+                        nxt = (p, self._size(p))
+                    p, size = nxt
+                    if pending and self.reserved + size > self.max_bytes:
+                        return
+                    self.reserved += size
+                    pending.append((p, pool.submit(self._read, p), size))
+                    nxt = None
+
+            try:
+                refill()
+                while pending:
+                    p, fut, size = pending.popleft()
+                    t0 = time.perf_counter()
+                    data = fut.result()
+                    self.stats.io_wait += time.perf_counter() - t0
+                    self.reserved -= size
+                    refill()
+                    yield from self._deliver(p, data)
+            finally:
+                for _, fut, _ in pending:   # consumidor parou no meio: não lê o resto
+                    fut.cancel()
+
+    def _iter_sync(self) -> Iterator[Tuple[Path, bytes | OSError]]:
+        for p in self._paths:
+            t0 = time.perf_counter()
+            data = self._read(p)
+            self.stats.io_wait += time.perf_counter() - t0
+            yield from self._deliver(p, data)
+
+    def _deliver(self, p: Path, data: bytes | OSError) -> Iterator[Tuple[Path, bytes | OSError]]:
+        self.stats.files += 1
+        if not isinstance(data, OSError):
+            self.stats.bytes += len(data)
+        t0 = time.perf_counter()
+        yield p, data
+        self.stats.compute += time.perf_counter() - t0
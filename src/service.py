@@ -1,130 +1,478 @@
 from __future__ import annotations
 import ast
 import json
-from dataclasses import dataclass, asdict
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field, fields as dc_fields
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, List, Dict, Optional
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Optional, Sequence
 
-from astcore.model import Ctx, TNode
+from astcore.memo import PassMemo
+from astcore.model import Ctx, DetachedNode, TNode, detached_node
 from astcore.walker import walk_module
+from discovery import DiscoveryStats, iter_py_files
+from logger import logger
+import memprof
 from pass_plugins.loader import load_pass_plugins
-from utils import collect_comments, comments_by_line
+from prefetch import DEFAULT_MAX_BYTES, IOStats, Prefetcher, decode_source
+from utils import cache_stats, clear_caches, collect_comments, comments_by_line, open_text
 
 STRATEGIES = ("recursive_pre", "recursive_post", "iterative_pre", "bfs")
+TRANSFERS = ("pickle", "shm")
+PARALLEL = ("process", "thread")
 
 @dataclass(frozen=True)
 class FileAnalysis:
     file: Path
     ctx: Ctx
     tnodes: List[TNode]
-    nodes_json: List[Dict]
+    nodes_json: Sequence[Dict]   # lista, ou LazyNodes/BlockNodes (gerados sob demanda)
 
 @dataclass(frozen=True)
 class AnalysisResult:
     strategy: str
     files: List[FileAnalysis]
+    # contadores da execução: workers, PassMemo e caches de utils (somados entre processos)
+    stats: Dict[str, Any] = field(default_factory=dict)
 
 # ---------------------------
 # Utils
 # ---------------------------
 
 def _read_text(p: Path) -> str:
-    encodings = ("utf-8", "utf-8-sig", "latin-1")
-    for enc in encodings:
-        try:
-            return p.read_text(encoding=enc)
-        except UnicodeDecodeError:
-            continue
-    return p.read_bytes().decode(errors="ignore")
+    return decode_source(p.read_bytes())
+
+_TNODE_FIELDS = tuple(f.name for f in dc_fields(TNode) if f.name != "py_node")
+NODE_FIELDS = ("py_node", *_TNODE_FIELDS)   # chaves de cada nó exportado (para --fields)
+
+def _plain(v: Any) -> Any:
+    # cópia de listas/dicts como asdict faz, mas sem o deepcopy dos escalares (e da AST em py_node)
+    if type(v) is list:
+        return [_plain(x) for x in v]
+    if type(v) is dict:
+        return {k: _plain(x) for k, x in v.items()}
+    return v
 
 def _tnode_to_jsonable(t: TNode) -> Dict:
-    d = asdict(t)
     py = t.py_node
-    d["py_node"] = {
-        "type": type(py).__name__,
-        "fields": list(py._fields) if hasattr(py, "_fields") else [],
-    }
+    if isinstance(py, DetachedNode):
+        d: Dict[str, Any] = {"py_node": {"type": py.type, "fields": list(py.fields)}}
+    else:
+        d = {"py_node": {
+            "type": type(py).__name__,
+            "fields": list(py._fields) if hasattr(py, "_fields") else [],
+        }}
+    for name in _TNODE_FIELDS:
+        v = getattr(t, name)
+        d[name] = _plain(v) if type(v) in (list, dict) else v
     return d
 
-def _iter_py_files(path: Path) -> Iterable[Path]:
-    if path.is_file():
-        yield path
-    else:
-        yield from (p for p in path.rglob("*.py") if p.is_file())
-
-def _analyze_source(source: str, strategy: str, file_path: Path | None = None, root_path: Path | None = None) -> tuple[Ctx, List[TNode], List[Dict]]:
-    tree = ast.parse(source)
-    comms = collect_comments(source)
-    ctx = Ctx(lines=source.splitlines(), comments_by_line=comments_by_line(comms),root_path=root_path, file_path=file_path)
-    tnodes = walk_module(tree, ctx, strategy=strategy)
-    nodes_json = [_tnode_to_jsonable(t) for t in tnodes]
+class LazyNodes(Sequence):
+    """nodes_json de um resultado detached: cada dict é gerado dos TNodes quando pedido, nada fica guardado."""
+    __slots__ = ("tnodes",)
+
+    def __init__(self, tnodes: List[TNode]):
+        self.tnodes = tnodes
+
+    def __len__(self) -> int:
+        return len(self.tnodes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [_tnode_to_jsonable(t) for t in self.tnodes[i]]
+        return _tnode_to_jsonable(self.tnodes[i])
+
+    def __iter__(self) -> Iterator[Dict]:
+        return map(_tnode_to_jsonable, self.tnodes)
+
+def _analyze_source(source: str, strategy: str, file_path: Path | None = None, root_path: Path | None = None, memo: PassMemo | None = None, detach: bool = False) -> tuple[Ctx, List[TNode], Sequence[Dict]]:
+    # memprof.stage: contexto vazio, a não ser com um MemoryProfiler ativo (--mem-profile)
+    with memprof.stage("parse"):
+        tree = ast.parse(source)
+    with memprof.stage("comments"):
+        comms = collect_comments(source)
+        ctx = Ctx(lines=source.splitlines(), comments_by_line=comments_by_line(comms),root_path=root_path, file_path=file_path)
+    with memprof.stage("walk"):
+        tnodes = walk_module(tree, ctx, strategy=strategy, memo=memo)
+    if detach:
+        return _detach_ctx(ctx), _detach_tnodes(tnodes), LazyNodes(tnodes)
+    with memprof.stage("jsonable"):
+        nodes_json = [_tnode_to_jsonable(t) for t in tnodes]
     return ctx, tnodes, nodes_json
 
+def _detach_ctx(ctx: Ctx) -> Ctx:
+    return Ctx(root_path=ctx.root_path, file_path=ctx.file_path)
+
+def _detach_tnodes(tnodes: List[TNode]) -> List[TNode]:
+    for t in tnodes:
+        if not isinstance(t.py_node, DetachedNode):
+            t.py_node = detached_node(t.py_node)
+    return tnodes
+
+def detach(fa: FileAnalysis) -> FileAnalysis:
+    """
+    Drops what only the passes needed: each py_node becomes a shared DetachedNode stub (the AST is
+    freed), ctx keeps only root/file paths, and nodes_json becomes a LazyNodes view generated from
+    the TNodes on access. Exports are unchanged; consumers that walk the AST (symbol_graph) must
+    run before detaching, e.g. from `on_file` of a non-detached analyze_path.
+    Mutates the TNodes in place and returns a new FileAnalysis.
+    """
+    if not fa.tnodes:   # erro de sintaxe ou resultado vindo em blocos: não há o que soltar
+        return fa
+    return FileAnalysis(file=fa.file, ctx=_detach_ctx(fa.ctx), tnodes=_detach_tnodes(fa.tnodes), nodes_json=LazyNodes(fa.tnodes))
+
 # ---------------------------
 # Public API
 # ---------------------------
 
 def analyze_file(
-    file_path: Path, *, strategy: str = "recursive_pre", root_path: Path | None = None) -> FileAnalysis:
+    file_path: Path, *, strategy: str = "recursive_pre", root_path: Path | None = None, memo: PassMemo | None = None,
+    detach: bool = False, source: str | None = None) -> FileAnalysis:
+    """
+    `detach=True` returns a detached result (see `detach`) without building nodes_json eagerly.
+    `source` is the already decoded text (e.g. read by the prefetcher); by default the file is read.
+    """
     if strategy not in STRATEGIES:
         raise ValueError(f"Invalid strategy: {strategy}. Options: {STRATEGIES}")
-    src = _read_text(file_path)
-    ctx, tnodes, nodes_json = _analyze_source(src, strategy=strategy, file_path=file_path, root_path=root_path)
+    if source is None:
+        with memprof.stage("read"):
+            source = _read_text(file_path)
+    ctx, tnodes, nodes_json = _analyze_source(source, strategy=strategy, file_path=file_path, root_path=root_path, memo=memo, detach=detach)
     return FileAnalysis(file=file_path, ctx=ctx, tnodes=tnodes, nodes_json=nodes_json)
 
+def _analyze_or_error(f: Path, strategy: str, root: Path, memo: PassMemo | None, detach: bool = False,
+                      data: bytes | OSError | None = None) -> FileAnalysis:
+    if isinstance(data, OSError):   # erro de leitura no prefetch: mesmo efeito de ler aqui
+        raise data
+    with memprof.file_scope(f):
+        return _analyze_decoded(f, strategy, root, memo, detach, data)
+
+def _analyze_decoded(f: Path, strategy: str, root: Path, memo: PassMemo | None, detach: bool, data: bytes | None) -> FileAnalysis:
+    source = None
+    if data is not None:
+        with memprof.stage("read"):
+            source = decode_source(data)
+    try:
+        return analyze_file(f, strategy=strategy, root_path=root, memo=memo, detach=detach, source=source)
+    except SyntaxError as e:
+        return FileAnalysis(
+            file=f,
+            ctx=Ctx(lines=[], comments_by_line={}),
+            tnodes=[],
+            nodes_json=[{
+                "error": f"SyntaxError: {e.msg} at line {e.lineno} col {e.offset}"
+            }],
+        )
+
+# ---------------------------
+# Workers (ProcessPoolExecutor)
+# ---------------------------
+
+_worker_memo: PassMemo | None = None
+_worker_io = IOStats()
+
+def _init_worker(plugins: Optional[List[str]], memo_size: int) -> None:
+    global _worker_memo, _worker_io
+    clear_caches()   # o fork herda os contadores do pai; cada worker conta só o que fez
+    _worker_io = IOStats()
+    if plugins:
+        load_pass_plugins(plugins)
+    _worker_memo = PassMemo(memo_size) if memo_size else None
+
+def _analyze_chunk(files: List[Path], strategy: str, root: Path, transfer: str = "pickle", detach: bool = False,
+                   prefetch: int = 0, prefetch_bytes: int = DEFAULT_MAX_BYTES) -> tuple[Any, int, Dict[str, Any]]:
+    """
+    Analisa um lote no worker; devolve também o pid e os contadores acumulados do processo.
+    Com transfer="shm" devolve só (nome do segmento, índice): os nós vão em blocos binfmt.
+    Com detach (pickle) a AST e as linhas nem chegam a ser serializadas.
+    """
+    detach = detach and transfer != "shm"
+    reads = Prefetcher(files, depth=prefetch, max_bytes=prefetch_bytes, stats=_worker_io)
+    out = [_analyze_or_error(f, strategy, root, _worker_memo, detach, data) for f, data in reads]
+    if transfer == "shm":
+        from transfer import write_blocks
+        return write_blocks([(str(fa.file), fa.nodes_json) for fa in out]), os.getpid(), _process_stats(_worker_memo, _worker_io)
+    return out, os.getpid(), _process_stats(_worker_memo, _worker_io)
+
+def _receive_chunk(payload: Any, transfer: str, root: Path) -> List[FileAnalysis]:
+    if transfer != "shm":
+        return payload
+    from binfmt import BlockNodes
+    from transfer import SharedSegment
+
+    name, entries = payload
+    blocks = SharedSegment(name).blocks(entries)
+    return [
+        FileAnalysis(file=Path(file), ctx=Ctx(root_path=root, file_path=Path(file)), tnodes=[], nodes_json=BlockNodes(block))
+        for (file, _, _), block in zip(entries, blocks)
+    ]
+
+def _discard_segments(pending: List[Any], unreceived: Any) -> None:
+    """
+    Saída antecipada do loop (on_file levantou, erro de um lote, KeyboardInterrupt): os workers
+    não registram os segmentos no resource tracker, então quem não for anexado aqui fica em
+    /dev/shm. Cancela o que não começou e remove o segmento de todo lote que ainda terminar.
+    """
+    from transfer import discard
+
+    for fut in pending:
+        fut.cancel()
+    payloads = [unreceived] if unreceived is not None else []
+    for fut in pending:
+        if fut.cancelled():
+            continue
+        try:
+            payloads.append(fut.result())
+        except Exception:   # lote com erro não criou segmento
+            continue
+    for (name, _), _, _ in payloads:
+        discard(name)
+
+def _process_stats(memo: PassMemo | None, io: IOStats | None = None) -> Dict[str, Any]:
+    stats: Dict[str, Any] = dict(cache_stats())
+    if memo is not None:
+        stats["memo"] = memo.stats()
+    if io is not None:
+        stats["io"] = asdict(io)
+    return stats
+
+def _merge_stats(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Soma os contadores de cada cache (e de io) entre processos e recalcula hit_rate."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snap in snapshots:
+        for name, counters in snap.items():
+            acc = merged.setdefault(name, {})
+            for k, v in counters.items():
+                if k == "hit_rate":
+                    continue
+                acc[k] = v if k == "maxsize" else acc.get(k, 0) + v
+    for acc in merged.values():
+        if "hits" not in acc:
+            continue
+        total = acc.get("hits", 0) + acc.get("misses", 0)
+        acc["hit_rate"] = acc.get("hits", 0) / total if total else 0.0
+    return merged
+
+def gil_enabled() -> bool:
+    """False só num CPython free-threaded (3.13t) rodando sem GIL."""
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+def _add_io(acc: IOStats, other: IOStats) -> None:
+    for k, v in asdict(other).items():
+        setattr(acc, k, getattr(acc, k) + v)
+
+def _iter_threaded(
+    paths: Iterable[Path], strategy: str, root: Path, memo: PassMemo | None, detach: bool,
+    workers: int, chunk_size: int, prefetch: int, prefetch_bytes: int, io: IOStats,
+) -> Iterator[FileAnalysis]:
+    """
+    Lotes analisados num pool de threads, entregues na ordem. O REGISTRY, o PassMemo e os caches
+    de utils são compartilhados (com locks); Ctx, TNodes e o `scratch` dos passes são por arquivo.
+    """
+    def run(chunk: List[Path]) -> tuple[List[FileAnalysis], IOStats]:
+        chunk_io = IOStats()
+        reads = Prefetcher(chunk, depth=prefetch, max_bytes=prefetch_bytes, stats=chunk_io)
+        return [_analyze_or_error(f, strategy, root, memo, detach, data) for f, data in reads], chunk_io
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analyze") as pool:
+        jobs = (pool.submit(run, chunk) for chunk in _chunks(paths, chunk_size))
+        pending = deque(islice(jobs, workers * 2))
+        while pending:
+            out, chunk_io = pending.popleft().result()
+            pending.extend(islice(jobs, 1))
+            _add_io(io, chunk_io)
+            yield from out
+
+def _chunks(it: Iterable[Path], size: int) -> Iterator[List[Path]]:
+    it = iter(it)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
 def analyze_path(
     path: Path | str,
     *,
     strategy: str = "recursive_pre",
     plugins: Optional[Iterable[str]] = ("pass_plugins.builtin",),
+    memo: PassMemo | None = None,
+    on_file: Callable[[FileAnalysis], None] | None = None,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    gitignore: bool = True,
+    default_excludes: bool = True,
+    workers: int = 1,
+    chunk_size: int = 16,
+    transfer: str = "pickle",
+    files: Sequence[Path | str] | None = None,
+    detach: bool = False,
+    prefetch: int = 0,
+    prefetch_bytes: int = DEFAULT_MAX_BYTES,
+    parallel: str = "process",
+    gil_fallback: bool = True,
 ) -> AnalysisResult:
     """
     Loads plugins, iterates over .py file(s) in the path, and returns Ctx/TNodes/JSON per file.
+    Pass a shared `PassMemo` to reuse pure pass results across identical definitions;
+    its `stats()` reports hits/misses.
+    `on_file` is called with each FileAnalysis as soon as it is ready (e.g. to feed an index).
+    `include`/`exclude` are globs over paths relative to `path`; with `gitignore` and
+    `default_excludes` (.git, virtualenvs, node_modules, build output...) whole subtrees
+    are pruned during discovery (see discovery.iter_py_files).
+    With `workers > 1` files are analyzed in a process pool, `chunk_size` files per task;
+    each worker keeps its own PassMemo with the same maxsize as `memo`. Files keep their order.
+    `transfer="shm"` makes workers send each batch as binfmt blocks in shared memory instead of
+    pickled objects: the parent gets FileAnalysis with lazy `nodes_json` (decoded on access),
+    no TNodes and an empty Ctx, which is all the exporters and token builders need.
+    `files` skips discovery and analyzes exactly those files (e.g. one shard of a manifest);
+    they should live under `path`, which stays the root for path_info.
+    `detach=True` keeps only the extracted facts per file (see `detach`): no AST, source lines or
+    comment maps, and nodes_json is generated on access. With transfer="shm" results are already
+    blocks without TNodes, so it changes nothing there.
+    `prefetch=N` reads the next N files in a small thread pool (at most `prefetch_bytes` read
+    ahead) while the current one is analyzed; in pool mode each worker prefetches within its
+    chunk. stats["io"] reports io_wait (blocked on reads) against compute (analysis) seconds.
+    `parallel="thread"` analyzes the chunks in a thread pool of `workers` threads sharing `memo`
+    (no pickling, no transfer); it only pays off on a free-threaded build, so while the GIL is
+    enabled it runs serially unless `gil_fallback=False`. stats["parallel"] says what ran.
     """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Invalid strategy: {strategy}. Options: {STRATEGIES}")
+    if transfer not in TRANSFERS:
+        raise ValueError(f"Invalid transfer: {transfer}. Options: {TRANSFERS}")
+    if parallel not in PARALLEL:
+        raise ValueError(f"Invalid parallel mode: {parallel}. Options: {PARALLEL}")
+    plugin_list = list(plugins) if plugins else None
     # Load passes/plugins only once
-    if plugins:
-        load_pass_plugins(list(plugins))
+    if plugin_list:
+        load_pass_plugins(plugin_list)
 
     root = Path(path).resolve()
     if not root.exists():
         raise FileNotFoundError(f"Path não encontrado: {root}")
 
-    files: List[FileAnalysis] = []
-    for f in _iter_py_files(root):
+    discovery = DiscoveryStats()
+    if files is not None:
+        paths: Iterable[Path] = (Path(f).resolve() for f in files)
+    else:
+        paths = iter_py_files(
+            root, include, exclude, gitignore=gitignore, default_excludes=default_excludes, stats=discovery,
+        )
+    analyses: List[FileAnalysis] = []
+    fell_back = workers > 1 and parallel == "thread" and gil_fallback and gil_enabled()
+    if fell_back:
+        logger.info("parallel='thread' needs a free-threaded build; the GIL is enabled, running serially")
+        workers = 1
+    if workers > 1 and parallel == "thread":
+        io = IOStats()
+        for fa in _iter_threaded(paths, strategy, root, memo, detach, workers, chunk_size, prefetch, prefetch_bytes, io):
+            analyses.append(fa)
+            if on_file is not None:
+                on_file(fa)
+        stats = {"workers": workers, "parallel": "thread", "discovery": asdict(discovery), **_merge_stats([_process_stats(memo, io)])}
+        return AnalysisResult(strategy=strategy, files=analyses, stats=stats)
+    if workers <= 1:
+        io = IOStats()
+        for f, data in Prefetcher(paths, depth=prefetch, max_bytes=prefetch_bytes, stats=io):
+            fa = _analyze_or_error(f, strategy, root, memo, detach, data)
+            analyses.append(fa)
+            if on_file is not None:
+                on_file(fa)
+        stats = {"workers": 1, "discovery": asdict(discovery), **_merge_stats([_process_stats(memo, io)])}
+        if fell_back:
+            stats["parallel"] = "serial (GIL enabled)"
+        return AnalysisResult(strategy=strategy, files=analyses, stats=stats)
+
+    memo_size = memo.maxsize if memo is not None else 0
+    per_pid: Dict[int, Dict[str, Any]] = {}   # último snapshot de cada worker (contadores são cumulativos)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(plugin_list, memo_size)) as pool:
+        jobs = (pool.submit(_analyze_chunk, chunk, strategy, root, transfer, detach, prefetch, prefetch_bytes) for chunk in _chunks(paths, chunk_size))
+        # mantém no máximo 2 lotes por worker em voo: a descoberta não corre muito à frente
+        pending = list(islice(jobs, workers * 2))
+        unreceived = None   # payload já recebido mas ainda não anexado
         try:
-            files.append(analyze_file(f, strategy=strategy, root_path=root))
-        except SyntaxError as e:
-            files.append(
-                FileAnalysis(
-                    file=f,
-                    ctx=Ctx(lines=[], comments_by_line={}),
-                    tnodes=[],
-                    nodes_json=[{
-                        "error": f"SyntaxError: {e.msg} at line {e.lineno} col {e.offset}"
-                    }],
-                )
-            )
-    return AnalysisResult(strategy=strategy, files=files)
+            while pending:
+                payload, pid, snap = unreceived = pending.pop(0).result()
+                per_pid[pid] = snap
+                pending.extend(islice(jobs, 1))
+                received, unreceived = _receive_chunk(payload, transfer, root), None
+                for fa in received:
+                    analyses.append(fa)
+                    if on_file is not None:
+                        on_file(fa)
+        finally:
+            if transfer == "shm" and (pending or unreceived is not None):
+                _discard_segments(pending, unreceived)
+    stats = {"workers": workers, "parallel": "process", "transfer": transfer, "discovery": asdict(discovery), **_merge_stats(per_pid.values())}
+    return AnalysisResult(strategy=strategy, files=analyses, stats=stats)
+
+def _project(nodes: List[Dict], fields: Sequence[str] | None) -> List[Dict]:
+    """Keeps only `fields` of each node (error entries are kept whole)."""
+    if not fields:
+        return nodes if isinstance(nodes, list) else list(nodes)
+    return [n if "error" in n else {k: n[k] for k in fields if k in n} for n in nodes]
+
+def _file_block(fr: FileAnalysis, fields: Sequence[str] | None) -> Dict:
+    return {
+        "file": str(fr.file),
+        "node_count": len(fr.nodes_json),
+        "nodes": _project(fr.nodes_json, fields),
+    }
 
 def export_json(
     result: AnalysisResult,
     out_path: Path | str,
+    fields: Sequence[str] | None = None,
 ) -> Path:
     """
-    Exports the AnalysisResult to a JSON file at out_path.
+    Exports the AnalysisResult to a JSON file at out_path (gzip-compressed if it ends in .gz).
+    `fields` keeps only those keys of each node.
     Returns the Path to the output file.
     """
     payload = {
         "strategy": result.strategy,
-        "results": [
-            {
-                "file": str(fr.file),
-                "node_count": len(fr.nodes_json),
-                "nodes": fr.nodes_json,
-            }
-            for fr in result.files
-        ],
+        "results": [_file_block(fr, fields) for fr in result.files],
     }
     out = Path(out_path)
-    out.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    with open_text(out, "w") as fp:
+        fp.write(json.dumps(payload, ensure_ascii=False, indent=2))
+    return out
+
+def export_jsonl(
+    result: AnalysisResult,
+    out_path: Path | str,
+    fields: Sequence[str] | None = None,
+) -> Path:
+    """
+    Exports the AnalysisResult as JSON Lines: a header line with the strategy,
+    then one line per file with the same shape as the entries of export_json's "results".
+    Files are written one at a time, so readers can stream it (see embeddings.stream).
+    """
+    out = Path(out_path)
+    with open_text(out, "w") as fp:
+        fp.write(json.dumps({"strategy": result.strategy}, ensure_ascii=False) + "\n")
+        for fr in result.files:
+            fp.write(json.dumps(_file_block(fr, fields), ensure_ascii=False) + "\n")
+    return out
+
+def export_binary(
+    result: AnalysisResult,
+    out_path: Path | str,
+    fields: Sequence[str] | None = None,
+) -> Path:
+    """
+    Exports the AnalysisResult in the compact binary format (see binfmt): one block per file
+    with its own string table and fixed-size node records, readable by mmap with
+    random access by file. binfmt.binary_to_json converts it back to export_json's output.
+    """
+    from binfmt import BinaryWriter, BlockNodes
+
+    out = Path(out_path)
+    with BinaryWriter(out, strategy=result.strategy) as w:
+        for fr in result.files:
+            if not fields and isinstance(fr.nodes_json, BlockNodes):
+                w.add_block(fr.nodes_json.block.raw, str(fr.file))   # já codificado pelo worker
+            else:
+                w.add_file(str(fr.file), _project(fr.nodes_json, fields))
     return out
@@ -0,0 +1,498 @@
+"""
+Análise distribuída em shards: um manifest (arquivos + sha256 + shard de cada um) é gerado uma vez,
+cada máquina roda só o seu shard e grava um arquivo de saída (JSONL, .astb ou SQLite), e o merge junta
+as saídas, descartando duplicatas pelo hash do conteúdo.
+
+Os shards são fatias contíguas da ordem de descoberta, balanceadas por bytes: juntar as saídas na
+ordem dos shards reproduz a ordem (e, com a mesma raiz, o conteúdo) de uma execução numa máquina só.
+`run_local` sobe um processo `cli.py run-shard` por shard, fazendo o papel das máquinas.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from binfmt import SUFFIX as ASTB_SUFFIX, BinaryReader, BinaryWriter, BlockNodes, FileBlock, write_export_json
+from discovery import iter_py_files
+from logger import logger
+from service import STRATEGIES, analyze_path
+from utils import open_text
+
+MANIFEST_VERSION = 1
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+SHARD_FORMATS = ("jsonl", "astb", "sqlite")
+
+def _sha256(p: Path) -> str:
+    return hashlib.sha256(p.read_bytes()).hexdigest()
+
+# ---------------------------
+# Manifest
+# ---------------------------
+
+@dataclass
+class ManifestEntry:
+    path: str     # relativo à raiz, separador '/'
+    size: int
+    sha256: str
+    shard: int
+
+@dataclass
+class Manifest:
+    root: str
+    n_shards: int
+    strategy: str = "recursive_pre"
+    files: List[ManifestEntry] = field(default_factory=list)
+    discovery: Dict[str, Any] = field(default_factory=dict)   # opções usadas na descoberta (só registro)
+
+    @property
+    def id(self) -> str:
+        """Identifica o conjunto (arquivo, conteúdo, shard) + estratégia; as saídas dos shards o carregam."""
+        h = hashlib.sha256(f"{self.strategy}\0{self.n_shards}\n".encode())
+        for e in self.files:
+            h.update(f"{e.path}\0{e.sha256}\0{e.shard}\n".encode("utf-8", "surrogateescape"))
+        return h.hexdigest()[:16]
+
+    def shard_files(self, shard: int) -> List[ManifestEntry]:
+        if not 0 <= shard < self.n_shards:
+            raise ValueError(f"Invalid shard: {shard}. Manifest has {self.n_shards} shards")
+        return [e for e in self.files if e.shard == shard]
+
+    def by_path(self) -> Dict[str, ManifestEntry]:
+        return {e.path: e for e in self.files}
+
+    def save(self, out_path: Path | str) -> Path:
+        out = Path(out_path)
+        payload = {"version": MANIFEST_VERSION, "id": self.id, **asdict(self)}
+        with open_text(out, "w") as fp:
+            fp.write(json.dumps(payload, ensure_ascii=False, indent=2))
+        return out
+
+    @classmethod
+    def load(cls, path: Path | str) -> "Manifest":
+        with open_text(Path(path)) as fp:
+            data = json.load(fp)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version: {data.get('version')}")
+        m = cls(
+            root=data["root"],
+            n_shards=data["n_shards"],
+            strategy=data.get("strategy", "recursive_pre"),
+            files=[ManifestEntry(**e) for e in data["files"]],
+            discovery=data.get("discovery", {}),
+        )
+        if data.get("id") not in (None, m.id):
+            raise ValueError(f"Manifest {path} was edited: id {data['id']} does not match its files ({m.id})")
+        return m
+
+def _assign_shards(sizes: Sequence[int], n_shards: int) -> List[int]:
+    """Fatias contíguas com ~total/n bytes cada; cada arquivo vai para o shard do seu ponto médio."""
+    total = sum(sizes)
+    if not total:
+        return [min(i * n_shards // max(len(sizes), 1), n_shards - 1) for i in range(len(sizes))]
+    out, acc = [], 0
+    for size in sizes:
+        out.append(min(int((acc + size / 2) * n_shards / total), n_shards - 1))
+        acc += size
+    return out
+
+def build_manifest(
+    path: Path | str,
+    n_shards: int,
+    *,
+    strategy: str = "recursive_pre",
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    gitignore: bool = True,
+    default_excludes: bool = True,
+) -> Manifest:
+    """
+    Discovers the .py files under `path` (discovery.iter_py_files), hashes their contents and
+    splits them into `n_shards` contiguous, byte-balanced shards. Same tree + options -> same manifest.
+    """
+    if n_shards < 1:
+        raise ValueError("n_shards must be >= 1")
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Invalid strategy: {strategy}. Options: {STRATEGIES}")
+    root = Path(path).resolve()
+    if not root.exists():
+        raise FileNotFoundError(f"Path não encontrado: {root}")
+    base = root.parent if root.is_file() else root
+    found = list(iter_py_files(root, include, exclude, gitignore=gitignore, default_excludes=default_excludes))
+    sizes = [f.stat().st_size for f in found]
+    shards = _assign_shards(sizes, n_shards)
+    files = [
+        ManifestEntry(path=f.relative_to(base).as_posix(), size=size, sha256=_sha256(f), shard=shard)
+        for f, size, shard in zip(found, sizes, shards)
+    ]
+    discovery = {"include": list(include), "exclude": list(exclude), "gitignore": gitignore, "default_excludes": default_excludes}
+    return Manifest(root=str(root), n_shards=n_shards, strategy=strategy, files=files, discovery=discovery)
+
+# ---------------------------
+# Saídas dos shards (JSONL / .astb / SQLite)
+# ---------------------------
+
+@dataclass
+class ShardRecord:
+    """Um arquivo analisado: caminho relativo + hash (chave do merge) e o bloco, em JSON ou binfmt."""
+    path: str
+    sha256: str
+    file: str
+    block: Dict[str, Any] | None = None   # {"file", "node_count", "nodes"}
+    raw: memoryview | bytes | None = None  # bloco binfmt já codificado
+
+    def json_block(self) -> Dict[str, Any]:
+        if self.block is None:
+            self.block = FileBlock(memoryview(self.raw)).to_json_block()
+        return self.block
+
+def output_format(path: Path | str) -> str:
+    """json / jsonl / astb / sqlite pelo sufixo (ignorando .gz)."""
+    p = Path(path)
+    suffixes = p.suffixes[:-1] if p.suffix == ".gz" else p.suffixes
+    suffix = suffixes[-1] if suffixes else ""
+    if suffix == ASTB_SUFFIX:
+        return "astb"
+    if suffix in SQLITE_SUFFIXES:
+        return "sqlite"
+    return "jsonl" if suffix == ".jsonl" else "json"
+
+def write_records(out_path: Path | str, header: Dict[str, Any], records: Iterable[ShardRecord], *, keys: bool = True) -> int:
+    """
+    Grava os registros no formato do sufixo de out_path. Com `keys` cada arquivo leva "path" e
+    "sha256" (saída de shard); sem, JSON/JSONL ficam iguais aos de export_json/export_jsonl.
+    Devolve quantos arquivos foram gravados.
+    """
+    out = Path(out_path)
+    fmt = output_format(out)
+    n = 0
+    if fmt == "astb":
+        if out.suffix == ".gz":
+            raise ValueError(f"The {ASTB_SUFFIX} format is read by mmap and cannot be gzipped")
+        paths, hashes = [], []
+        with BinaryWriter(out) as w:
+            for rec in records:
+                if rec.raw is not None:
+                    w.add_block(rec.raw, rec.file)
+                else:
+                    w.add_file(rec.file, rec.json_block()["nodes"])
+                paths.append(rec.path)
+                hashes.append(rec.sha256)
+                n += 1
+            w.meta = {**header, "paths": paths, "sha256": hashes} if keys else dict(header)
+        return n
+    if fmt == "sqlite":
+        if out.exists():
+            out.unlink()
+        con = sqlite3.connect(out)
+        try:
+            con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            con.execute(
+                "CREATE TABLE files (seq INTEGER PRIMARY KEY, path TEXT NOT NULL, sha256 TEXT NOT NULL,"
+                " file TEXT NOT NULL, node_count INTEGER NOT NULL, nodes TEXT NOT NULL)"
+            )
+            con.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v, ensure_ascii=False)) for k, v in header.items()])
+            for rec in records:
+                b = rec.json_block()
+                con.execute(
+                    "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (n, rec.path, rec.sha256, b["file"], b["node_count"], json.dumps(b["nodes"], ensure_ascii=False)),
+                )
+                n += 1
+            con.execute("CREATE INDEX files_path ON files (path)")
+            con.commit()
+        finally:
+            con.close()
+        return n
+
+    def blocks() -> Iterator[Dict[str, Any]]:
+        nonlocal n
+        for rec in records:
+            n += 1
+            b = rec.json_block()
+            yield {**b, "path": rec.path, "sha256": rec.sha256} if keys else b
+
+    with open_text(out, "w") as fp:
+        if fmt == "jsonl":
+            fp.write(json.dumps(header, ensure_ascii=False) + "\n")
+            for b in blocks():
+                fp.write(json.dumps(b, ensure_ascii=False) + "\n")
+        else:
+            write_export_json(fp, header, blocks())
+    return n
+
+class ShardReader:
+    """Lê uma saída de shard (ou de merge) em qualquer formato: `header` e iteração de ShardRecord."""
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.format = output_format(self.path)
+        self._close: List[Any] = []
+        if self.format == "astb":
+            r = BinaryReader(self.path)
+            self._close.append(r)
+            self._astb = r
+            self.header = {k: v for k, v in r.header.items() if k not in ("paths", "sha256")}
+        elif self.format == "sqlite":
+            self._con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._close.append(self._con)
+            self.header = {k: json.loads(v) for k, v in self._con.execute("SELECT key, value FROM meta")}
+        elif self.format == "jsonl":
+            fp = open_text(self.path)
+            self._close.append(fp)
+            self._fp = fp
+            first = json.loads(fp.readline() or "{}")
+            if "nodes" in first:
+                raise ValueError(f"{self.path}: missing JSONL header line")
+            self.header = first
+        else:
+            raise ValueError(f"{self.path}: shard outputs are JSONL, {ASTB_SUFFIX} or SQLite")
+
+    @property
+    def shard(self) -> Optional[int]:
+        return self.header.get("shard")
+
+    def __iter__(self) -> Iterator[ShardRecord]:
+        if self.format == "astb":
+            r = self._astb
+            paths, hashes = r.header.get("paths"), r.header.get("sha256")
+            if paths is None or hashes is None:
+                raise ValueError(f"{self.path} has no per-file paths/hashes (not a shard output)")
+            for i, file in enumerate(r.files):
+                yield ShardRecord(path=paths[i], sha256=hashes[i], file=file, raw=r.raw_block(i))
+        elif self.format == "sqlite":
+            rows = self._con.execute("SELECT path, sha256, file, node_count, nodes FROM files ORDER BY seq")
+            for path, sha, file, count, nodes in rows:
+                block = {"file": file, "node_count": count, "nodes": json.loads(nodes)}
+                yield ShardRecord(path=path, sha256=sha, file=file, block=block)
+        else:
+            for line in self._fp:
+                if not line.strip():
+                    continue
+                b = json.loads(line)
+                try:
+                    path, sha = b.pop("path"), b.pop("sha256")
+                except KeyError:
+                    raise ValueError(f"{self.path} has no per-file paths/hashes (not a shard output)") from None
+                yield ShardRecord(path=path, sha256=sha, file=b["file"], block=b)
+
+    def close(self) -> None:
+        for c in self._close:
+            c.close()
+        self._close = []
+
+    def __enter__(self) -> "ShardReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+# ---------------------------
+# Execução de um shard
+# ---------------------------
+
+@dataclass
+class ShardReport:
+    shard: int
+    output: str
+    files: int = 0
+    missing: List[str] = field(default_factory=list)   # no manifest, mas não existem mais
+    changed: List[str] = field(default_factory=list)   # conteúdo diferente do hash do manifest
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+def run_shard(
+    manifest: Manifest,
+    shard: int,
+    out_path: Path | str,
+    *,
+    root: Path | str | None = None,
+    plugins: Optional[Iterable[str]] = ("pass_plugins.builtin",),
+    memo: Any = None,
+    workers: int = 1,
+    chunk_size: int = 16,
+    transfer: str = "pickle",
+    on_file: Any = None,
+) -> ShardReport:
+    """
+    Analyzes the files of one shard and writes them, each with its manifest path and content
+    hash, to out_path (.jsonl[.gz], .astb or .sqlite). `root` overrides the manifest root when the
+    tree is checked out elsewhere on this machine. Files that changed since the manifest are written
+    with their new hash (merge against the manifest then reports them as stale).
+    """
+    out = Path(out_path)
+    if output_format(out) not in SHARD_FORMATS:
+        raise ValueError(f"{out}: shard outputs must be .jsonl, {ASTB_SUFFIX} or .sqlite")
+    base = Path(root if root is not None else manifest.root).resolve()
+    base = base.parent if base.is_file() else base   # mesma regra de build_manifest
+    entries = manifest.shard_files(shard)
+    report = ShardReport(shard=shard, output=str(out))
+    present = []
+    for e in entries:
+        if (base / e.path).is_file():
+            present.append(e)
+        else:
+            report.missing.append(e.path)
+    if report.missing:
+        logger.warning(f"shard {shard}: {len(report.missing)} files from the manifest no longer exist")
+
+    result = analyze_path(
+        base,
+        strategy=manifest.strategy,
+        plugins=plugins,
+        memo=memo,
+        on_file=on_file,
+        workers=workers,
+        chunk_size=chunk_size,
+        transfer=transfer,
+        files=[base / e.path for e in present],
+    )
+    header = {"strategy": result.strategy, "manifest": manifest.id, "shard": shard, "n_shards": manifest.n_shards}
+
+    def records() -> Iterator[ShardRecord]:
+        for e, fa in zip(present, result.files):
+            sha = _sha256(fa.file)
+            if sha != e.sha256:
+                report.changed.append(e.path)
+            if isinstance(fa.nodes_json, BlockNodes):
+                yield ShardRecord(path=e.path, sha256=sha, file=str(fa.file), raw=fa.nodes_json.block.raw)
+            else:
+                block = {"file": str(fa.file), "node_count": len(fa.nodes_json), "nodes": fa.nodes_json}
+                yield ShardRecord(path=e.path, sha256=sha, file=str(fa.file), block=block)
+
+    report.files = write_records(out, header, records())
+    report.stats = result.stats
+    if report.changed:
+        logger.warning(f"shard {shard}: {len(report.changed)} files changed since the manifest was built")
+    return report
+
+# ---------------------------
+# Merge
+# ---------------------------
+
+@dataclass
+class MergeReport:
+    output: str
+    files: int = 0
+    duplicates: int = 0                                   # mesmo arquivo e mesmo hash em mais de uma saída
+    conflicts: List[str] = field(default_factory=list)    # mesmo arquivo, hashes diferentes (fica o primeiro)
+    stale: List[str] = field(default_factory=list)        # hash diferente do manifest (descartado)
+    unexpected: List[str] = field(default_factory=list)   # fora do manifest (descartado)
+    missing: List[str] = field(default_factory=list)      # no manifest, sem saída válida
+    shards_missing: List[int] = field(default_factory=list)
+
+def merge_shards(
+    inputs: Sequence[Path | str],
+    out_path: Path | str,
+    *,
+    manifest: Manifest | None = None,
+) -> MergeReport:
+    """
+    Merges shard outputs (any mix of .jsonl/.astb/.sqlite) into out_path (.json, .jsonl[.gz],
+    .astb or .sqlite), in shard order. A file seen again with the same content hash is a duplicate
+    (e.g. a retried shard) and is dropped; with a `manifest`, records whose hash differs from it
+    are stale and dropped, and files without any valid record are reported as missing.
+    JSON/JSONL outputs have exactly the shape of export_json/export_jsonl.
+    """
+    readers = [ShardReader(p) for p in inputs]
+    try:
+        readers.sort(key=lambda r: (r.shard is None, r.shard if r.shard is not None else 0))
+        strategies = {r.header.get("strategy") for r in readers}
+        if len(strategies) > 1:
+            raise ValueError(f"Shard outputs mix strategies: {sorted(map(str, strategies))}")
+        ids = {r.header.get("manifest") for r in readers} - {None}
+        if manifest is not None and ids - {manifest.id}:
+            raise ValueError(f"Shard outputs come from another manifest ({sorted(ids)}, expected {manifest.id})")
+        if len(ids) > 1:
+            logger.warning(f"merging shard outputs from {len(ids)} different manifests")
+
+        report = MergeReport(output=str(out_path))
+        expected = manifest.by_path() if manifest is not None else {}
+        seen: Dict[str, str] = {}
+
+        def merged() -> Iterator[ShardRecord]:
+            for r in readers:
+                for rec in r:
+                    if manifest is not None:
+                        entry = expected.get(rec.path)
+                        if entry is None:
+                            report.unexpected.append(rec.path)
+                            continue
+                        if rec.sha256 != entry.sha256:
+                            report.stale.append(rec.path)
+                            continue
+                    prev = seen.get(rec.path)
+                    if prev is not None:
+                        if prev == rec.sha256:
+                            report.duplicates += 1
+                        else:
+                            report.conflicts.append(rec.path)
+                        continue
+                    seen[rec.path] = rec.sha256
+                    yield rec
+
+        header = {"strategy": readers[0].header.get("strategy")} if readers else {}
+        report.files = write_records(out_path, header, merged(), keys=False)
+    finally:
+        for r in readers:
+            r.close()
+
+    if manifest is not None:
+        report.missing = [e.path for e in manifest.files if e.path not in seen]
+        have = {r.shard for r in readers}
+        report.shards_missing = [k for k in range(manifest.n_shards) if k not in have and manifest.shard_files(k)]
+    for name in ("conflicts", "stale", "unexpected", "missing"):
+        items = getattr(report, name)
+        if items:
+            logger.warning(f"merge: {len(items)} {name} files (first: {items[0]})")
+    return report
+
+# ---------------------------
+# Execução local (processos no lugar das máquinas)
+# ---------------------------
+
+def shard_output_name(shard: int, fmt: str = "jsonl") -> str:
+    ext = {"jsonl": ".jsonl", "astb": ASTB_SUFFIX, "sqlite": ".sqlite"}[fmt]
+    return f"shard-{shard:04d}{ext}"
+
+def run_local(
+    manifest_path: Path | str,
+    out_dir: Path | str,
+    *,
+    processes: int | None = None,
+    fmt: str = "jsonl",
+    extra_args: Sequence[str] = (),
+) -> List[Path]:
+    """
+    Runs every shard of the manifest as an independent `cli.py run-shard` process (at most
+    `processes` at a time), the way separate machines would, and returns the shard outputs.
+    Raises RuntimeError if any shard process fails.
+    """
+    if fmt not in SHARD_FORMATS:
+        raise ValueError(f"Invalid shard format: {fmt}. Options: {SHARD_FORMATS}")
+    manifest = Manifest.load(manifest_path)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    cli = Path(__file__).resolve().with_name("cli.py")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(cli.parent), env.get("PYTHONPATH")]))
+
+    todo = [k for k in range(manifest.n_shards) if manifest.shard_files(k)]
+    outputs = [out / shard_output_name(k, fmt) for k in todo]
+
+    def run(k: int, target: Path) -> int:
+        cmd = [sys.executable, str(cli), "run-shard", str(manifest_path), "--shard", str(k), "-o", str(target), "-q", *extra_args]
+        logger.info(f"run_local: shard {k}/{manifest.n_shards} -> {target}")
+        return subprocess.run(cmd, env=env).returncode
+
+    # threads só esperam os processos; o trabalho é feito fora deste interpretador
+    with ThreadPoolExecutor(max_workers=max(1, processes or os.cpu_count() or 1)) as pool:
+        codes = list(pool.map(run, todo, outputs))
+    failed = [k for k, code in zip(todo, codes) if code != 0]
+    if failed:
+        raise RuntimeError(f"Shard processes failed: {failed}")
+    return outputs
@@ -0,0 +1,372 @@
+"""
+Estágio entre arquivos: tabela de símbolos (qname -> definição) e grafo de imports do repositório,
+com bases e decoradores resolvidos para as definições e propriedades transitivas (herança, abstração).
+
+Atualização incremental: `update_file` troca só os dados do arquivo e re-resolve as arestas dos
+módulos que consultaram o módulo alterado (ou um nome que ele passou a definir).
+"""
+from __future__ import annotations
+import ast
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from astcore.model import DetachedNode, TNode
+
+if TYPE_CHECKING:
+    from service import AnalysisResult, FileAnalysis
+
+_MAX_HOPS = 16   # reexportações encadeadas (pkg/__init__ -> pkg.base -> ...)
+
+@dataclass
+class Symbol:
+    qname: str                       # module.Classe.metodo
+    kind: str                        # "class" | "function" | "method"
+    module: str
+    file: str
+    lineno: Optional[int] = None
+    bases: List[str] = field(default_factory=list)          # como escritas no código
+    decorators: List[str] = field(default_factory=list)     # idem
+    metaclass: Optional[str] = None
+    class_kind: Optional[str] = None
+    abstract_methods: List[str] = field(default_factory=list)
+    methods: List[str] = field(default_factory=list)        # métodos definidos na própria classe
+
+@dataclass
+class ModuleInfo:
+    name: str
+    file: str
+    aliases: Dict[str, str] = field(default_factory=dict)   # nome local -> nome absoluto importado
+    star_imports: List[str] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)        # alvos absolutos dos imports (módulos ou módulo.nome)
+    symbols: List[str] = field(default_factory=list)
+
+def _module_name(t: TNode | None, file: Path) -> str:
+    if t is None or t.module is None:
+        return file.stem
+    if t.module == "__init__":
+        return t.package or "__init__"
+    return f"{t.package}.{t.module}" if t.package else t.module
+
+def _strip_args(expr: str) -> str:
+    # "Generic[T]" -> "Generic", "app.route('/')" -> "app.route"
+    for ch in "[(":
+        expr = expr.split(ch, 1)[0]
+    return expr.strip()
+
+def _resolve_relative(module: str, is_package: bool, level: int, target: Optional[str]) -> str:
+    parts = module.split(".") if module else []
+    if not is_package:
+        parts = parts[:-1]
+    if level > 1:
+        parts = parts[:len(parts) - (level - 1)] if level - 1 <= len(parts) else []
+    if target:
+        parts.append(target)
+    return ".".join(parts)
+
+def _definitions(body: List[ast.stmt], prefix: str, in_class: bool) -> Iterator[Tuple[str, str, ast.AST]]:
+    """(qname local, tipo, nó) das definições aninhadas; qname segue o aninhamento real no ast."""
+    for n in body:
+        if isinstance(n, ast.ClassDef):
+            q = f"{prefix}{n.name}"
+            yield q, "class", n
+            yield from _definitions(n.body, q + ".", True)
+        elif isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            q = f"{prefix}{n.name}"
+            yield q, ("method" if in_class else "function"), n
+            yield from _definitions(n.body, q + ".", False)
+        else:
+            # definições dentro de if/try/with/for no nível do bloco
+            for name in ("body", "orelse", "finalbody", "handlers"):
+                sub = getattr(n, name, None)
+                if isinstance(sub, list) and sub and isinstance(sub[0], (ast.stmt, ast.excepthandler)):
+                    for item in sub:
+                        inner = item.body if isinstance(item, ast.excepthandler) else [item]
+                        yield from _definitions(inner, prefix, in_class)
+
+def _is_syntax_error(fa: "FileAnalysis") -> bool:
+    nodes = fa.nodes_json
+    return isinstance(nodes, list) and len(nodes) == 1 and "error" in nodes[0]
+
+def extract_module(fa: "FileAnalysis") -> Tuple[ModuleInfo, List[Symbol]]:
+    """Símbolos e imports de um arquivo analisado (ast do módulo + campos dos TNodes)."""
+    file = Path(fa.file)
+    by_node = {id(t.py_node): t for t in fa.tnodes}
+    # node_type e não isinstance: depois de detach o py_node é um DetachedNode
+    module_t = next((t for t in fa.tnodes if t.node_type == "Module"), None)
+    if module_t is None and not _is_syntax_error(fa):
+        raise ValueError(f"{fa.file}: result has no TNodes (shm transfer?); use transfer='pickle' or index it from on_file")
+    if module_t is not None and isinstance(module_t.py_node, DetachedNode):
+        raise ValueError(f"{fa.file}: detached result has no AST; index it before detaching (on_file)")
+    module = _module_name(module_t, file)
+    is_package = file.stem == "__init__"
+    info = ModuleInfo(name=module, file=str(fa.file))
+    if module_t is None:   # SyntaxError: arquivo sem símbolos
+        return info, []
+
+    for n in ast.walk(module_t.py_node):
+        if isinstance(n, ast.Import):
+            for a in n.names:
+                info.imports.append(a.name)
+                if a.asname:
+                    info.aliases[a.asname] = a.name
+                else:
+                    head = a.name.split(".", 1)[0]
+                    info.aliases.setdefault(head, head)
+        elif isinstance(n, ast.ImportFrom):
+            base = _resolve_relative(module, is_package, n.level, n.module) if n.level else (n.module or "")
+            for a in n.names:
+                if a.name == "*":
+                    info.star_imports.append(base)
+                    info.imports.append(base)
+                    continue
+                target = f"{base}.{a.name}" if base else a.name
+                info.imports.append(target)
+                info.aliases[a.asname or a.name] = target
+
+    symbols: List[Symbol] = []
+    classes: Dict[str, Symbol] = {}
+    for local, kind, n in _definitions(module_t.py_node.body, "", False):
+        t = by_node.get(id(n))
+        sym = Symbol(qname=f"{module}.{local}", kind=kind, module=module, file=str(fa.file), lineno=n.lineno)
+        if t is not None:
+            sym.bases = [_strip_args(b) for b in t.base_classes]
+            sym.decorators = [_strip_args(d) for d in t.decorators]
+            sym.metaclass = _strip_args(t.metaclass) if t.metaclass else None
+            sym.class_kind = t.class_kind
+            sym.abstract_methods = list(t.abstract_methods)
+        symbols.append(sym)
+        if kind == "class":
+            classes[local] = sym
+        elif kind == "method":
+            owner, _, name = local.rpartition(".")
+            if owner in classes:
+                classes[owner].methods.append(name)
+    info.symbols = [s.qname for s in symbols]
+    return info, symbols
+
+class SymbolGraph:
+    """
+    Tabela de símbolos e grafos do repositório. Alimente com `add_result`, ou arquivo a arquivo
+    com `update_file` (serve como `on_file` de service.analyze_path); `remove_file` tira um arquivo.
+    """
+    def __init__(self):
+        self.modules: Dict[str, ModuleInfo] = {}
+        self.symbols: Dict[str, Symbol] = {}
+        self.bases: Dict[str, List[str]] = {}         # classe -> bases resolvidas (aresta de herança)
+        self.decorators: Dict[str, List[str]] = {}    # definição -> decoradores resolvidos
+        self._module_of_file: Dict[str, str] = {}
+        self._deps: Dict[str, Set[str]] = {}          # módulo -> nomes consultados ao resolver suas arestas
+        self._rdeps: Dict[str, Set[str]] = defaultdict(set)
+        self._derived: Dict[Tuple[str, str], object] = {}   # memo das propriedades transitivas
+
+    # ----- atualização -----
+
+    def add_result(self, result: "AnalysisResult") -> None:
+        """Indexa todos os arquivos e resolve as arestas uma vez só no fim."""
+        touched: Set[str] = set()
+        added: Set[str] = set()
+        for fa in result.files:
+            name, names = self._insert(fa)
+            touched |= names
+            added.add(name)
+        self._refresh(self._dependents(touched) | added)
+
+    def update_file(self, fa: "FileAnalysis") -> None:
+        """(Re)indexa um arquivo e re-resolve só as arestas afetadas."""
+        name, touched = self._insert(fa)
+        self._refresh(self._dependents(touched) | {name})
+
+    def _insert(self, fa: "FileAnalysis") -> Tuple[str, Set[str]]:
+        info, symbols = extract_module(fa)
+        touched = self._drop(str(fa.file))
+        old = self.modules.get(info.name)
+        if old is not None and old.file != info.file:   # mesmo módulo vindo de outro arquivo
+            touched |= self._drop(old.file)
+        self.modules[info.name] = info
+        self._module_of_file[info.file] = info.name
+        for s in symbols:
+            self.symbols[s.qname] = s
+        return info.name, touched | self._names_of(info)
+
+    def remove_file(self, file: str | Path) -> None:
+        touched = self._drop(str(file))
+        self._refresh(self._dependents(touched))
+
+    def _names_of(self, info: ModuleInfo) -> Set[str]:
+        return {info.name, *info.symbols, *(f"{info.name}.{a}" for a in info.aliases)}
+
+    def _drop(self, file: str) -> Set[str]:
+        module = self._module_of_file.pop(file, None)
+        if module is None:
+            return set()
+        info = self.modules.pop(module)
+        for q in info.symbols:
+            self.symbols.pop(q, None)
+            self.bases.pop(q, None)
+            self.decorators.pop(q, None)
+        for name in self._deps.pop(module, ()):
+            self._rdeps[name].discard(module)
+        return self._names_of(info)
+
+    def _dependents(self, names: Iterable[str]) -> Set[str]:
+        out: Set[str] = set()
+        for name in names:
+            out |= self._rdeps.get(name, set())
+        return {m for m in out if m in self.modules}
+
+    def _refresh(self, modules: Iterable[str]) -> None:
+        self._derived.clear()
+        for module in modules:
+            if module not in self.modules:   # removido no mesmo lote
+                continue
+            for name in self._deps.pop(module, ()):
+                self._rdeps[name].discard(module)
+            deps: Set[str] = set()
+            info = self.modules[module]
+            for q in info.symbols:
+                s = self.symbols[q]
+                if s.kind == "class":
+                    self.bases[q] = [self._resolve(module, b, deps) for b in s.bases]
+                if s.decorators:
+                    self.decorators[q] = [self._resolve(module, d, deps) for d in s.decorators]
+            self._deps[module] = deps
+            for name in deps:
+                self._rdeps[name].add(module)
+
+    # ----- resolução de nomes -----
+
+    def resolve(self, module: str, name: str) -> str:
+        """Nome absoluto de `name` como visto de dentro de `module` (definição do repo ou nome externo)."""
+        return self._resolve(module, _strip_args(name), set())
+
+    def _resolve(self, module: str, dotted: str, deps: Set[str]) -> str:
+        head, _, rest = dotted.partition(".")
+        info = self.modules.get(module)
+        full = dotted
+        if info is not None:
+            local = f"{module}.{head}"
+            deps.add(local)
+            if local in self.symbols:
+                full = f"{module}.{dotted}"
+            elif head in info.aliases:
+                full = info.aliases[head] + (f".{rest}" if rest else "")
+            else:
+                for star in info.star_imports:
+                    deps.add(star)
+                    deps.add(f"{star}.{head}")
+                    star_info = self.modules.get(star)
+                    if star_info and (f"{star}.{head}" in self.symbols or head in star_info.aliases):
+                        full = f"{star}.{dotted}"
+                        break
+        return self._canonical(full, deps)
+
+    def _canonical(self, full: str, deps: Set[str]) -> str:
+        """Segue reexportações (`from .base import X` em pkg/__init__) até a definição."""
+        for _ in range(_MAX_HOPS):
+            deps.add(full)
+            if full in self.symbols or full in self.modules:
+                return full
+            parts = full.split(".")
+            for i in range(len(parts) - 1, 0, -1):
+                mod = ".".join(parts[:i])
+                deps.add(mod)
+                if mod in self.modules:
+                    break
+            else:
+                return full   # externo (stdlib, dependências)
+            info = self.modules[mod]
+            head, rest = parts[i], parts[i + 1:]
+            nxt = None
+            if head in info.aliases:
+                nxt = info.aliases[head]
+            else:
+                for star in info.star_imports:
+                    deps.add(f"{star}.{head}")
+                    if f"{star}.{head}" in self.symbols or f"{star}.{head}" in self.modules:
+                        nxt = f"{star}.{head}"
+                        break
+            if nxt is None:
+                return full
+            new = ".".join([nxt, *rest])
+            if new == full:
+                return full
+            full = new
+        return full
+
+    # ----- consultas -----
+
+    def module_of(self, file: str | Path) -> Optional[str]:
+        return self._module_of_file.get(str(file))
+
+    def imports(self, module: str) -> List[str]:
+        """Módulos do repositório importados por `module` (arestas do grafo de imports)."""
+        out: List[str] = []
+        for target in self.modules[module].imports:
+            parts = target.split(".")
+            for i in range(len(parts), 0, -1):
+                mod = ".".join(parts[:i])
+                if mod in self.modules:
+                    if mod != module and mod not in out:
+                        out.append(mod)
+                    break
+        return out
+
+    def import_graph(self) -> Dict[str, List[str]]:
+        return {m: self.imports(m) for m in self.modules}
+
+    def importers(self, module: str) -> List[str]:
+        return [m for m in self.modules if module in self.imports(m)]
+
+    def ancestors(self, qname: str) -> List[str]:
+        """Bases transitivas em profundidade (nomes externos aparecem como folhas)."""
+        key = ("ancestors", qname)
+        if key not in self._derived:
+            out: List[str] = []
+            seen = {qname}
+            stack = list(reversed(self.bases.get(qname, [])))
+            while stack:
+                b = stack.pop()
+                if b in seen:
+                    continue
+                seen.add(b)
+                out.append(b)
+                stack.extend(reversed(self.bases.get(b, [])))
+            self._derived[key] = out
+        return self._derived[key]   # type: ignore[return-value]
+
+    def subclasses(self, qname: str, transitive: bool = False) -> List[str]:
+        if transitive:
+            return [q for q in self.bases if qname in self.ancestors(q)]
+        return [q for q, bs in self.bases.items() if qname in bs]
+
+    def inherits_from(self, qname: str, base: str) -> bool:
+        return base in self.ancestors(qname)
+
+    def unimplemented_abstract_methods(self, qname: str) -> FrozenSet[str]:
+        """Métodos abstratos herdados ou declarados que a classe ainda não implementa."""
+        key = ("abstract", qname)
+        if key not in self._derived:
+            self._derived[key] = frozenset()   # guarda contra herança cíclica
+            s = self.symbols[qname]
+            inherited: Set[str] = set()
+            for b in self.bases.get(qname, []):
+                if b in self.symbols and self.symbols[b].kind == "class":
+                    inherited |= self.unimplemented_abstract_methods(b)
+            self._derived[key] = frozenset((inherited - set(s.methods)) | set(s.abstract_methods))
+        return self._derived[key]   # type: ignore[return-value]
+
+    def is_abstract(self, qname: str) -> bool:
+        """Abstrata pela própria declaração (ABC, ABCMeta, Protocol) ou por métodos abstratos herdados."""
+        s = self.symbols[qname]
+        return s.class_kind in ("abstract", "protocol") or bool(self.unimplemented_abstract_methods(qname))
+
+    def is_abstract_via_inheritance(self, qname: str) -> bool:
+        return self.symbols[qname].class_kind == "concrete" and bool(self.unimplemented_abstract_methods(qname))
+
+    def resolved_class_kind(self, qname: str) -> Optional[str]:
+        """class_kind do pass, corrigido com o que só se sabe olhando as bases em outros módulos."""
+        if self.is_abstract_via_inheritance(qname):
+            return "abstract"
+        return self.symbols[qname].class_kind
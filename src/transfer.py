@@ -0,0 +1,99 @@
+"""
+Transferência worker -> pai por memória compartilhada: o worker codifica os arquivos de um lote
+em blocos binfmt num único segmento; o pai mapeia o segmento e usa os blocos direto (sem pickle
+de dicts nó a nó). O pai faz unlink ao anexar; o mapeamento vive enquanto houver blocos usando-o.
+"""
+from __future__ import annotations
+import os
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Sequence, Tuple
+
+from binfmt import FileBlock, encode_block
+
+Entry = Tuple[str, int, int]   # (arquivo, offset, tamanho) dentro do segmento
+
+def _create(size: int) -> shared_memory.SharedMemory:
+    # quem libera o segmento é o pai (unlink ao anexar), não o resource tracker do worker
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    return _create_untracked_legacy(size)
+
+def _create_untracked_legacy(size: int) -> shared_memory.SharedMemory:
+    """
+    Python < 3.13 (sem track=False): cria e desregistra do resource tracker. No POSIX o tracker
+    registra o nome com a barra inicial que `shm.name` omite; no Windows não há tracker.
+    """
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    if os.name == "posix":
+        resource_tracker.unregister("/" + shm.name, "shared_memory")
+    return shm
+
+def write_blocks(files: Sequence[Tuple[str, List[Dict[str, Any]]]]) -> Tuple[str, List[Entry]]:
+    """Codifica (arquivo, nodes_json) em blocos consecutivos de um segmento novo; devolve nome e índice."""
+    blocks = [(file, encode_block(file, nodes)) for file, nodes in files]
+    entries: List[Entry] = []
+    pos = 0
+    for file, b in blocks:
+        pos += -pos % 8
+        entries.append((file, pos, len(b)))
+        pos += len(b)
+    shm = _create(max(pos, 1))
+    try:
+        for (_, off, length), (_, b) in zip(entries, blocks):
+            shm.buf[off:off + length] = b
+        return shm.name, entries
+    finally:
+        shm.close()
+
+class _Attached(shared_memory.SharedMemory):
+    # close() falha com BufferError enquanto houver visões vivas; no __del__ isso não é erro
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except (OSError, BufferError):
+            pass
+
+# segmentos soltos pelo pai com visões ainda vivas (ex.: arrays de Block.column); close() é
+# retentado a cada novo anexo, até as visões sumirem
+_busy: List[shared_memory.SharedMemory] = []
+_busy_lock = threading.Lock()
+
+def _try_close(shm: shared_memory.SharedMemory) -> bool:
+    try:
+        shm.close()
+        return True
+    except BufferError:
+        return False
+
+def _reap() -> None:
+    with _busy_lock:
+        _busy[:] = [shm for shm in _busy if not _try_close(shm)]
+
+def discard(name: str) -> None:
+    """Remove um segmento que o pai nunca vai anexar (lote abandonado por erro ou interrupção)."""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.unlink()
+    shm.close()
+
+class SharedSegment:
+    """Segmento anexado pelo pai. O nome é removido na hora; a memória some com o último bloco."""
+    def __init__(self, name: str):
+        _reap()
+        self._shm = _Attached(name=name)
+        self._shm.unlink()
+        self.buf = self._shm.buf
+
+    def blocks(self, entries: Sequence[Entry]) -> List[FileBlock]:
+        return [FileBlock(self.buf[off:off + length], owner=self) for _, off, length in entries]
+
+    def __del__(self) -> None:
+        shm, self._shm = getattr(self, "_shm", None), None
+        self.buf = None
+        if shm is not None and not _try_close(shm):
+            with _busy_lock:
+                _busy.append(shm)
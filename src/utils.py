@@ -1,21 +1,92 @@
 """
 Module utils for AST processing: unparse, decorators, visibility, naming, comments.
 """
-import ast, re
+import ast, gzip, re, sys, threading
+from collections import OrderedDict
+from functools import lru_cache
 from io import BytesIO
+from pathlib import Path
 import tokenize
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Optional, TextIO, Tuple
+
+# ---- caches: anotações/defaults e identificadores se repetem muito (self, str, Optional[int]) ----
+_UNPARSE_CACHE_SIZE = 8192
+_UNPARSE_MAX_NODES = 16      # só subárvores pequenas entram no cache
+_SPLIT_CACHE_SIZE = 65536
+
+_unparse_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_unparse_stats = {"hits": 0, "misses": 0, "uncacheable": 0}
+_unparse_lock = threading.Lock()   # LRU e contadores compartilhados entre threads (modo thread)
+
+def _small_subtree_key(node: ast.AST, budget: list[int]) -> Optional[tuple]:
+    """Chave estrutural barata para anotações simples; None se a subárvore for grande ou não suportada."""
+    budget[0] -= 1
+    if budget[0] < 0:
+        return None
+    if isinstance(node, ast.Name):
+        return ("N", node.id)
+    if isinstance(node, ast.Constant):
+        # o tipo entra na chave: 1, 1.0 e True têm o mesmo hash
+        return ("C", type(node.value).__name__, node.value, node.kind)
+    if isinstance(node, ast.Attribute):
+        value = _small_subtree_key(node.value, budget)
+        return None if value is None else ("A", value, node.attr)
+    if isinstance(node, ast.Subscript):
+        value = _small_subtree_key(node.value, budget)
+        sl = _small_subtree_key(node.slice, budget) if value is not None else None
+        return None if sl is None else ("S", value, sl)
+    if isinstance(node, (ast.Tuple, ast.List)):
+        elts = []
+        for e in node.elts:
+            k = _small_subtree_key(e, budget)
+            if k is None:
+                return None
+            elts.append(k)
+        return (type(node).__name__, tuple(elts))
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        left = _small_subtree_key(node.left, budget)
+        right = _small_subtree_key(node.right, budget) if left is not None else None
+        return None if right is None else ("|", left, right)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.Not)):
+        operand = _small_subtree_key(node.operand, budget)
+        return None if operand is None else ("U", type(node.op).__name__, operand)
+    return None
 
 def unparse_safe(node: Optional[ast.AST]) -> Optional[str]:
     """
     Try to convert an AST node back to source code using ast.unparse.
+    Small annotation/default subtrees are served from a bounded LRU cache.
     """
     if node is None:
         return None
-    try: 
-        return ast.unparse(node)
+    key = _small_subtree_key(node, [_UNPARSE_MAX_NODES])
+    if key is None:
+        with _unparse_lock:
+            _unparse_stats["uncacheable"] += 1
+        try:
+            return ast.unparse(node)
+        except Exception:
+            return None
+    with _unparse_lock:
+        try:
+            cached = _unparse_cache.get(key)
+        except TypeError:  # constante não-hashable
+            cached, key = None, None
+        if cached is not None:
+            _unparse_cache.move_to_end(key)
+            _unparse_stats["hits"] += 1
+            return cached
+        _unparse_stats["misses"] += 1
+    try:
+        text = sys.intern(ast.unparse(node))
     except Exception:
         return None
+    if key is not None:
+        with _unparse_lock:
+            _unparse_cache[key] = text
+            if len(_unparse_cache) > _UNPARSE_CACHE_SIZE:
+                _unparse_cache.popitem(last=False)
+    return text
 
 def decorator_to_str(node: ast.AST) -> str:
     """
@@ -47,6 +118,11 @@ def decorator_to_str(node: ast.AST) -> str:
     except Exception:
         return "<unknown>"
 
+def dotted_names(dotted: str) -> Tuple[str, ...]:
+    """Formas pelas quais um nome pontuado é procurado: o nome todo e a última parte ("functools.lru_cache", "lru_cache")."""
+    last = dotted.rsplit(".", 1)[-1]
+    return (dotted,) if last == dotted else (dotted, last)
+
 def classify_visibility(name: Optional[str]) -> Optional[str]:
     """Classifica a visibilidade de um nome com base em convenções de nomenclatura Python."""   
     if not name: 
@@ -131,17 +207,15 @@ _CAMEL_SPLIT: re.Pattern = re.compile(r'''
     _+                               # snake_case: separa nos underscores
 ''', re.X)
 
+@lru_cache(maxsize=_SPLIT_CACHE_SIZE)
+def _split_identifier_cached(name: str) -> tuple[str, ...]:
+    parts = [p for p in _CAMEL_SPLIT.split(name) if p and p != "_"]
+    # acrônimos (HTTP) ficam como uma peça; o token final é sempre minúsculo e internado
+    return tuple(sys.intern(p.lower()) for p in parts)
+
 def split_identifier(name: str) -> list[str]:
     """Divide um identificador em tokens, lidando com camelCase e snake_case."""
-    parts = [p for p in _CAMEL_SPLIT.split(name) if p and p != "_"]
-    tokens = []
-    for p in parts:
-        # manter acrônimos como uma peça (HTTP) mas normalizar case no token final
-        if p.isupper() and len(p) > 1:
-            tokens.append(p.lower())
-        else:
-            tokens.append(p.lower())
-    return tokens
+    return list(_split_identifier_cached(name))
 
 def detect_naming_style(name: str) -> str:
     """Detecta o estilo de nomenclatura de um identificador."""
@@ -149,3 +223,36 @@ def detect_naming_style(name: str) -> str:
     if name[:1].isupper(): return "PascalCase"
     if any(ch.isupper() for ch in name): return "camelCase"
     return "lower"
+
+# ---- estatísticas dos caches ----
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Retorna hits/misses/tamanho dos caches de split_identifier e unparse_safe."""
+    info = _split_identifier_cached.cache_info()
+    return {
+        "split_identifier": {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+        },
+        "unparse": {
+            **_unparse_stats,
+            "size": len(_unparse_cache),
+            "maxsize": _UNPARSE_CACHE_SIZE,
+        },
+    }
+
+def clear_caches() -> None:
+    """Esvazia os caches e zera as estatísticas."""
+    _split_identifier_cached.cache_clear()
+    with _unparse_lock:
+        _unparse_cache.clear()
+        for k in _unparse_stats:
+            _unparse_stats[k] = 0
+
+def open_text(path: str | Path, mode: str = "r") -> TextIO:
+    """Abre um arquivo texto UTF-8; com sufixo .gz, passa por gzip de forma transparente."""
+    p = Path(path)
+    if p.suffix == ".gz":
+        return gzip.open(p, mode + "t", encoding="utf-8")
+    return p.open(mode, encoding="utf-8")
@@ -0,0 +1,8 @@
+# Os módulos usam imports absolutos a partir de src/ (como em `cd src && python cli.py`).
+import os
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+os.environ.setdefault("GRAPH_AST_LOG_FILE", "")   # testes não escrevem app.log
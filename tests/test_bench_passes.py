@@ -0,0 +1,33 @@
+import ast
+
+import bench.passes as bp
+from astcore.pass_registry import PassSpec
+
+def _temporaries(t, n, ctx):
+    # lista grande criada e descartada: nada fica no nó
+    return len([n.name] * 10_000)
+
+def _keeps(t, n, ctx):
+    t.args = [n.name] * 200   # ~1.6 KB por nó
+
+def test_peak_sees_temporaries_that_retained_misses(tmp_path, monkeypatch):
+    (tmp_path / "m.py").write_text("def a(): pass\ndef b(): pass\n")
+    specs = {
+        "temporaries": PassSpec(name="temporaries", fn=_temporaries, requires=(), node_types=(ast.FunctionDef,)),
+        "keeps": PassSpec(name="keeps", fn=_keeps, requires=(), node_types=(ast.FunctionDef,), provides=("args",)),
+    }
+    monkeypatch.setattr(bp, "_registered", lambda: specs)
+    corpus = bp.parse_corpus(tmp_path)
+
+    temp = bp.bench_pass("temporaries", corpus, tmp_path, rounds=1)
+    assert temp.nodes == 2
+    assert temp.retained_bytes_per_node < 1000 and temp.peak_bytes_per_node > 70_000
+
+    keeps = bp.bench_pass("keeps", corpus, tmp_path, rounds=1)
+    assert keeps.retained_bytes_per_node >= 1000 and keeps.peak_bytes_per_node >= 1000
+
+def test_compare_flags_peak_regressions_and_skips_old_baselines():
+    r = bp.PassResult("p", nodes=10, ns_per_node=1, best_ns_per_node=1, retained_blocks_per_node=0,
+                      retained_bytes_per_node=0, peak_bytes_per_node=5000)
+    assert bp.compare([r], {"passes": {"p": {"ns_per_node": 1, "peak_bytes_per_node": 1000}}}, 0.25)
+    assert bp.compare([r], {"passes": {"p": {"ns_per_node": 1, "blocks_per_node": 0}}}, 0.25) == []
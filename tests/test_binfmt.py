@@ -0,0 +1,17 @@
+import json
+
+from conftest import SRC
+
+import pytest
+
+from binfmt import binary_to_json
+from service import analyze_path, export_binary, export_json
+
+@pytest.mark.parametrize("fields", [None, ["name", "qname", "lineno"], ["nonexistent"]])
+def test_astb_roundtrip_matches_json(tmp_path, fields):
+    # ["nonexistent"]: todos os nós viram {} e o bloco tem registros de largura zero
+    result = analyze_path(SRC / "astcore")
+    export_json(result, tmp_path / "a.json", fields=fields)
+    export_binary(result, tmp_path / "a.astb", fields=fields)
+    binary_to_json(tmp_path / "a.astb", tmp_path / "b.json")
+    assert json.loads((tmp_path / "b.json").read_text()) == json.loads((tmp_path / "a.json").read_text())
@@ -0,0 +1,11 @@
+import sys
+
+import cli
+import memprof
+
+def test_peak_rss_mb_without_resource_module(monkeypatch):
+    monkeypatch.setitem(sys.modules, "resource", None)   # como no Windows: import resource falha
+    monkeypatch.setattr(memprof, "current_rss", lambda: 50_000_000)
+    assert cli.peak_rss_mb() == 50.0
+    monkeypatch.setattr(memprof, "current_rss", lambda: None)
+    assert cli.peak_rss_mb() is None
@@ -0,0 +1,41 @@
+from conftest import SRC
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from embeddings.dataset import build_tokens_dataframe, is_usecase_candidate, tokens_dataset
+from embeddings.tokens import iter_tokens_from_file, iter_tokens_from_result
+from service import analyze_path, export_json
+
+@pytest.fixture(scope="module")
+def tokens():
+    return list(iter_tokens_from_result(analyze_path(SRC)))
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 50])
+def test_chunked_frame_matches_single_chunk(tokens, chunk_size):
+    # chunks pequenos: colunas só com None em uns e str em outros
+    whole, _ = tokens_dataset(tokens, chunk_size=1 << 20)
+    chunked, _ = tokens_dataset(tokens, chunk_size=chunk_size)
+    assert len(chunked) == len(whole) > chunk_size
+    pd.testing.assert_frame_equal(chunked, whole)
+    for c in ("node_type", "method_kind", "class_kind"):
+        assert isinstance(chunked[c].dtype, pd.CategoricalDtype)
+
+def test_tokens_are_a_csr_corpus(tokens):
+    df, corpus = tokens_dataset(tokens, chunk_size=5)
+    assert "tokens_list" not in df and "tokens_str" not in df
+    candidates = [t for t in tokens if is_usecase_candidate(t)]
+    assert len(corpus) == len(df) == len(candidates)
+    assert [corpus.decode(i) for i in range(len(corpus))] == [list(t.flat) for t in candidates]
+
+def test_empty_input():
+    df, corpus = tokens_dataset([])
+    assert len(df) == 0 and len(corpus) == 0
+
+def test_build_tokens_dataframe_keeps_the_tokens(tmp_path):
+    path = export_json(analyze_path(SRC / "astcore"), tmp_path / "ast.json")
+    df, corpus = build_tokens_dataframe(path, chunk_size=4)
+    candidates = [t for t in iter_tokens_from_file(path) if is_usecase_candidate(t)]
+    assert len(df) == len(corpus) == len(candidates) > 0
+    assert corpus.decode(0) == list(candidates[0].flat)
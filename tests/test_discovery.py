@@ -0,0 +1,33 @@
+from discovery import DiscoveryStats, iter_py_files
+
+def _touch(root, *rels):
+    for rel in rels:
+        p = root / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text("x = 1\n")
+
+def test_build_dirs_pruned_only_at_root_and_when_not_packages(tmp_path):
+    _touch(
+        tmp_path,
+        "build/lib/mod.py", "dist/pkg/mod.py",                   # saída de build na raiz: poda
+        "pkg/__init__.py", "pkg/build/__init__.py", "pkg/build/steps.py", "pkg/dist/upload.py",
+        "tools/build/__init__.py",
+        "pkg/__pycache__/stale.py",
+    )
+    stats = DiscoveryStats()
+    found = {p.relative_to(tmp_path).as_posix() for p in iter_py_files(tmp_path, stats=stats)}
+    assert found == {
+        "pkg/__init__.py", "pkg/build/__init__.py", "pkg/build/steps.py", "pkg/dist/upload.py",
+        "tools/build/__init__.py",
+    }
+    assert stats.build_dirs_pruned == 2 and stats.dirs_pruned == 3
+
+def test_root_build_package_is_kept(tmp_path):
+    _touch(tmp_path, "build/__init__.py", "build/core.py")
+    stats = DiscoveryStats()
+    assert len(list(iter_py_files(tmp_path, stats=stats))) == 2
+    assert stats.build_dirs_pruned == 0
+
+def test_default_excludes_off_keeps_build_output(tmp_path):
+    _touch(tmp_path, "build/lib/mod.py")
+    assert len(list(iter_py_files(tmp_path, default_excludes=False))) == 1
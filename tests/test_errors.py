@@ -0,0 +1,38 @@
+import logging
+
+import pytest
+
+from astcore import PassDependencyError, PluginError
+from logger import logger
+from pass_plugins.loader import load_pass_plugins
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+@pytest.fixture
+def records():
+    h = _Records()
+    logger.addHandler(h)
+    yield h.messages
+    logger.removeHandler(h)
+
+def test_constructing_plugin_error_does_not_log(records):
+    PluginError("boom")
+    PassDependencyError("cycle")
+    assert records == []
+
+def test_loader_logs_invalid_plugin_once(records, tmp_path, monkeypatch):
+    (tmp_path / "bad_plugin.py").write_text(
+        "from astcore.pass_registry import register_pass\n"
+        "def initialize():\n"
+        "    register_pass(name='loops', requires=('loops',))(lambda t, n, ctx: None)\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    with pytest.raises(PassDependencyError):
+        load_pass_plugins(["bad_plugin"])
+    assert len(records) == 1 and "bad_plugin" in records[0] and "cannot require itself" in records[0]
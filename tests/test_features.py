@@ -0,0 +1,58 @@
+import zlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from conftest import SRC
+from embeddings.features import FeatureBuilder, FieldWeights
+from embeddings.tokens import iter_tokens_from_result
+from embeddings.vocab import Vocabulary
+from service import analyze_path
+
+@pytest.fixture(scope="module")
+def tokens():
+    return list(iter_tokens_from_result(analyze_path(SRC / "astcore")))
+
+def test_hash_mode_has_no_vocabulary(tokens):
+    fb = FeatureBuilder(mode="hash", n_features=1 << 10)
+    fb.update("a", tokens)
+    X = fb.build()
+    assert fb.vocab is None and X.shape == (len(tokens), 1 << 10)
+    cols, _ = X.row(0)
+    expected = {zlib.crc32(tok.encode("utf-8")) % (1 << 10) for tok in tokens[0].flat}
+    assert set(cols.tolist()) == expected
+    with pytest.raises(ValueError):
+        FeatureBuilder(mode="hash", vocab=Vocabulary())
+
+def test_transform_terms_keeps_unseen_terms_only_in_hash_mode(tokens):
+    terms = ["walker", "zzz_never_seen"]
+    unseen = zlib.crc32(b"zzz_never_seen") % (1 << 12)
+    hashed = FeatureBuilder(mode="hash", n_features=1 << 12)
+    hashed.update("a", tokens)
+    hashed.build()
+    assert unseen in hashed.transform_terms(terms).row(0)[0].tolist()
+
+    tfidf = FeatureBuilder(mode="tfidf")
+    tfidf.update("a", tokens)
+    tfidf.build()
+    assert tfidf.transform_terms(terms).nnz == 1
+
+def test_hash_model_roundtrip(tokens, tmp_path):
+    fb = FeatureBuilder(mode="hash", n_features=1 << 12)
+    fb.update("a", tokens)
+    fb.build()
+    fb.save_model(tmp_path)
+    assert not (tmp_path / "vocab.json").exists()
+    loaded = FeatureBuilder.load_model(tmp_path)
+    a, b = fb.transform(tokens[:20]), loaded.transform(tokens[:20])
+    assert np.array_equal(a.indices, b.indices) and np.allclose(a.data, b.data)
+
+@pytest.mark.parametrize("mode", ["hash", "tfidf"])
+def test_sublinear_tf_with_small_field_weights_stays_positive(tokens, mode):
+    weights = FieldWeights(path=0.3, docstring=0.3, comments=0.1)
+    fb = FeatureBuilder(mode=mode, weights=weights, sublinear_tf=True)
+    fb.update("a", tokens)
+    X = fb.build()
+    assert X.nnz and (X.data > 0).all()
+    assert (fb.transform(tokens[:20]).data > 0).all()
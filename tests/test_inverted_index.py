@@ -0,0 +1,40 @@
+from conftest import SRC
+
+import pytest
+
+from embeddings.inverted_index import InvertedIndex, Query, Term
+from service import analyze_path
+
+@pytest.fixture(scope="module")
+def index():
+    idx = InvertedIndex()
+    analyze_path(SRC / "astcore", on_file=idx.add_file)
+    return idx
+
+def test_decorator_facet_matches_dotted_name_and_last_part(index):
+    # astcore/model.py: @dataclass e @dataclass(frozen=True, slots=True)
+    hits = index.search(Term("decorator", "dataclass") & Term("node_type", "ClassDef"))
+    assert any(label.endswith(".TNode") for label in hits)
+    assert any(label.endswith(".DetachedNode") for label in hits)
+
+def test_decorator_facet_is_exact(index):
+    # o campo de tokens "decorators" é dividido/minúsculo; a faceta não
+    assert index.search(Term("decorator", "Dataclass")) == []
+    assert index.search(Term("decorators", "Dataclass"))
+
+def test_saved_index_keeps_facet(index, tmp_path):
+    index.save(tmp_path)
+    loaded = InvertedIndex.load(tmp_path)
+    q = Term("decorator", "dataclass")
+    assert loaded.search(q) == index.search(q)
+
+def test_query_is_abstract():
+    with pytest.raises(TypeError):
+        Query()
+
+def test_decorator_facet_dotted(tmp_path):
+    (tmp_path / "m.py").write_text("import functools\n\n@functools.lru_cache(maxsize=1)\ndef cached():\n    pass\n")
+    idx = InvertedIndex()
+    analyze_path(tmp_path, on_file=idx.add_file)
+    assert len(idx.search(Term("decorator", "functools.lru_cache"))) == 1
+    assert idx.search(Term("decorator", "lru_cache")) == idx.search(Term("decorator", "functools.lru_cache"))
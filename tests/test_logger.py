@@ -0,0 +1,24 @@
+import logging
+
+import pytest
+
+from logger import ENV_LEVEL, configure_logging, level_from_env
+
+@pytest.fixture
+def restore_logger():
+    yield
+    configure_logging(log_file=None)
+
+def test_unknown_level_raises_naming_valid_levels():
+    with pytest.raises(ValueError, match="'verbose'.*WARNING"):
+        configure_logging("verbose", log_file=None)
+
+@pytest.mark.parametrize("level, expected", [("debug", logging.DEBUG), (" Warning ", logging.WARNING), ("15", 15), (logging.ERROR, logging.ERROR)])
+def test_valid_levels(level, expected, restore_logger):
+    assert configure_logging(level, log_file=None, use_queue=False).level == expected
+
+def test_env_level_falls_back_to_default(monkeypatch):
+    monkeypatch.setenv(ENV_LEVEL, "VERBOSE")
+    assert level_from_env() == logging.INFO
+    monkeypatch.setenv(ENV_LEVEL, "error")
+    assert level_from_env() == logging.ERROR
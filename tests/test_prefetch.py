@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+from prefetch import IOStats, Prefetcher
+
+@pytest.fixture
+def files(tmp_path):
+    out = []
+    for i in range(12):
+        p = tmp_path / f"f{i:02d}.py"
+        p.write_bytes(bytes([65 + i]) * 100)
+        out.append(p)
+    return out
+
+class _Counting(Prefetcher):
+    """Conta leituras já executadas pelo pool e ainda não entregues."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = 0
+        self._count_lock = threading.Lock()
+
+    def _read(self, p):
+        with self._count_lock:
+            self.started += 1
+        return super()._read(p)
+
+@pytest.mark.parametrize("max_bytes, in_flight", [(250, 2), (100, 1), (10, 1)])
+def test_byte_budget_bounds_reads_in_flight(files, max_bytes, in_flight):
+    pf = _Counting(files, depth=10, max_bytes=max_bytes, threads=4)
+    got = []
+    for delivered, (p, data) in enumerate(pf, 1):
+        time.sleep(0.01)   # dá tempo ao pool de ler tudo o que já foi submetido
+        assert pf.reserved <= max(max_bytes, 100)
+        assert pf.started - delivered <= in_flight
+        got.append((p, data))
+    assert got == [(p, p.read_bytes()) for p in files]
+    assert pf.reserved == 0
+
+def test_depth_zero_reads_synchronously(files, tmp_path):
+    stats = IOStats()
+    missing = tmp_path / "missing.py"
+    pf = _Counting([*files[:3], missing], depth=0, stats=stats)
+    out = []
+    for delivered, (p, data) in enumerate(pf, 1):
+        assert pf.started == delivered   # nada lido adiantado
+        out.append(data)
+    assert out[:3] == [p.read_bytes() for p in files[:3]]
+    assert isinstance(out[3], OSError)
+    assert stats.files == 4 and stats.bytes == 300 and pf.reserved == 0
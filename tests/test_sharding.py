@@ -0,0 +1,48 @@
+import json
+
+from service import analyze_path, export_json
+from sharding import Manifest, build_manifest, merge_shards, run_local, run_shard
+
+def _package(root):
+    pkg = root / "pkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("from .base import Base\n")
+    for i in range(8):
+        (pkg / f"mod{i}.py").write_text(
+            f"class C{i}:\n    '''Classe {i}.'''\n    def run(self, x):\n        return x + {i}\n" * (i + 1)
+        )
+    return pkg
+
+def test_shard_run_local_merge_equals_single_run(tmp_path):
+    pkg = _package(tmp_path)
+    manifest = build_manifest(pkg, 3)
+    assert {e.shard for e in manifest.files} == {0, 1, 2}
+    manifest_path = manifest.save(tmp_path / "manifest.json")
+
+    outputs = run_local(manifest_path, tmp_path / "shards", processes=3)
+    report = merge_shards(outputs, tmp_path / "merged.json", manifest=Manifest.load(manifest_path))
+    assert report.files == len(manifest.files) and not report.missing and not report.stale
+
+    single = export_json(analyze_path(pkg), tmp_path / "single.json")
+    assert json.loads((tmp_path / "merged.json").read_text()) == json.loads(single.read_text())
+
+def test_merge_drops_duplicates_and_changed_files(tmp_path):
+    pkg = _package(tmp_path)
+    manifest = build_manifest(pkg, 2)
+    out0 = run_shard(manifest, 0, tmp_path / "s0.jsonl").output
+    changed = next(e for e in manifest.files if e.shard == 1)
+    (pkg / changed.path).write_text("x = 'editado depois do manifest'\n")
+    shard1 = run_shard(manifest, 1, tmp_path / "s1.jsonl")
+    assert shard1.changed == [changed.path]
+
+    report = merge_shards([out0, out0, shard1.output], tmp_path / "merged.jsonl", manifest=manifest)
+    assert report.duplicates == len(manifest.shard_files(0))
+    assert report.stale == [changed.path] and report.missing == [changed.path]
+    assert report.files == len(manifest.files) - 1
+
+def test_single_file_manifest(tmp_path):
+    f = tmp_path / "x.py"
+    f.write_text("def f():\n    return 1\n")
+    manifest = build_manifest(f, 1)
+    report = run_shard(manifest, 0, tmp_path / "s0.jsonl")
+    assert report.files == 1 and not report.missing
@@ -0,0 +1,40 @@
+from conftest import SRC
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from embeddings.features import token_label
+from embeddings.similarity import MinHashLSH, SimilarityIndex
+from embeddings.tokens import iter_tokens_from_result
+from service import analyze_path
+
+@pytest.fixture(scope="module")
+def index():
+    tokens = list(iter_tokens_from_result(analyze_path(SRC / "embeddings")))
+    return SimilarityIndex.build(tokens, lsh=MinHashLSH()), tokens
+
+def test_methods_get_distinct_labels(index):
+    idx, tokens = index
+    inits = [token_label(t) for t in tokens if t.name == "__init__"]
+    assert len(inits) > 1 and len(set(inits)) == len(inits)
+    assert sum(label.endswith("similarity.SimilarityIndex.__init__") for label in inits) == 1
+
+def test_query_by_qname_or_label(index):
+    idx, tokens = index
+    label = next(token_label(t) for t in tokens if t.qname == "SimilarityIndex.__init__")
+    by_qname = idx.query("SimilarityIndex.__init__", k=5)
+    assert by_qname == idx.query(label, k=5) and by_qname
+    assert all(other != label for other, _ in by_qname)
+    assert idx.near_duplicates("SimilarityIndex.__init__", threshold=0.0) is not None
+
+def test_unknown_or_ambiguous_qname_raises(index):
+    idx, _ = index
+    with pytest.raises(KeyError, match="ambiguous"):
+        idx.query("__init__")
+    with pytest.raises(KeyError, match="no definition"):
+        idx.query("NoSuchClass.method")
+
+def test_free_text(index):
+    idx, _ = index
+    assert idx.query("cosine similarity top k", k=3, text=True)
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+from bench.startup import BUDGETS_US, LAZY, check, measure
+
+@pytest.mark.parametrize("module", sorted(LAZY))
+def test_entry_point_keeps_heavy_imports_lazy(module):
+    _us, imported = measure(module, runs=1)
+    assert not [m for m in LAZY[module] if m in imported]
+
+# orçamento em tempo absoluto: depende da máquina, então só roda quando pedido
+# (GRAPH_AST_TIMING_TESTS=1 python -m pytest tests/test_startup.py)
+@pytest.mark.skipif(os.environ.get("GRAPH_AST_TIMING_TESTS") != "1", reason="set GRAPH_AST_TIMING_TESTS=1 to check import-time budgets")
+def test_import_budget_holds():
+    # mediana de 5 interpretadores frescos por entry point, como em `python -m bench.startup`
+    assert check(BUDGETS_US, runs=5) == []
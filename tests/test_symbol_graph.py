@@ -0,0 +1,83 @@
+from conftest import SRC
+
+import pytest
+
+from service import analyze_path
+from symbol_graph import SymbolGraph, extract_module
+
+def test_extracts_symbols():
+    r = analyze_path(SRC / "astcore")
+    assert sum(len(extract_module(fa)[1]) for fa in r.files) > 0
+
+@pytest.mark.parametrize("kwargs", [{"detach": True}, {"workers": 2, "transfer": "shm"}])
+def test_results_without_ast_fail_loudly(kwargs):
+    r = analyze_path(SRC / "astcore", **kwargs)
+    with pytest.raises(ValueError):
+        extract_module(r.files[0])
+
+def test_syntax_error_has_no_symbols(tmp_path):
+    bad = tmp_path / "bad.py"
+    bad.write_text("def f(:\n")
+    info, symbols = extract_module(analyze_path(bad).files[0])
+    assert symbols == [] and info.name == "bad"
+
+FILES = {
+    "app/__init__.py": "from .base import Base\n",
+    "app/base.py": "import abc\n\nclass Base(abc.ABC):\n    @abc.abstractmethod\n    def run(self): ...\n",
+    "app/deco.py": "def register(cls):\n    return cls\n",
+    "app/impl.py": "from app import Base\nfrom .deco import register\n\n@register\nclass Impl(Base):\n    def helper(self): ...\n",
+    "app/other.py": "class Other:\n    pass\n",
+}
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    for rel, text in FILES.items():
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_text(text)
+    g = SymbolGraph()
+    g.add_result(analyze_path(tmp_path))
+    refreshed = []
+    refresh = g._refresh
+    def spy(modules):
+        modules = set(modules)
+        refreshed.append(modules)
+        refresh(modules)
+    monkeypatch.setattr(g, "_refresh", spy)
+    return tmp_path, g, refreshed
+
+def _reanalyze(root, rel, text, g):
+    (root / rel).write_text(text)
+    g.update_file(analyze_path(root, files=[root / rel]).files[0])
+
+def test_cross_module_resolution_and_abstractness(repo):
+    _root, g, _ = repo
+    # base reexportada por app/__init__ resolve até a definição; decorador de outro módulo idem
+    assert g.bases["app.impl.Impl"] == ["app.base.Base"]
+    assert g.decorators["app.impl.Impl"] == ["app.deco.register"]
+    assert g.symbols["app.impl.Impl"].class_kind == "concrete"
+    assert g.is_abstract_via_inheritance("app.impl.Impl")
+    assert g.resolved_class_kind("app.impl.Impl") == "abstract"
+    assert g.unimplemented_abstract_methods("app.impl.Impl") == {"run"}
+    assert g.inherits_from("app.impl.Impl", "abc.ABC")
+    assert "app.base" in g.imports("app") and "app" in g.imports("app.impl")
+
+def test_update_file_refreshes_only_affected_modules(repo):
+    root, g, refreshed = repo
+    _reanalyze(root, "app/impl.py", FILES["app/impl.py"] + "    def run(self): ...\n", g)
+    assert refreshed == [{"app.impl"}]
+    assert not g.is_abstract_via_inheritance("app.impl.Impl")
+    assert g.resolved_class_kind("app.impl.Impl") == "concrete"
+
+    # mudar a base re-resolve só quem resolveu arestas por ela (app.impl), não app.other
+    _reanalyze(root, "app/base.py", "class Base:\n    def run(self): ...\n", g)
+    assert refreshed[-1] == {"app.base", "app.impl"}
+    assert g.bases["app.impl.Impl"] == ["app.base.Base"] and not g.is_abstract("app.impl.Impl")
+
+def test_remove_file_updates_dependents_without_rebuild(repo):
+    root, g, refreshed = repo
+    g.remove_file(root / "app" / "base.py")
+    assert "app.base" not in g.modules and "app.base.Base" not in g.symbols
+    assert "app.other" not in refreshed[-1] and "app.impl" in refreshed[-1]
+    # sem a definição, a base fica como nome externo e a abstração herdada some
+    assert g.bases["app.impl.Impl"] == ["app.base.Base"]
+    assert not g.is_abstract_via_inheritance("app.impl.Impl")
@@ -0,0 +1,6 @@
+from bench.threads import DEFAULT_PATH, run
+
+def test_threaded_output_equals_serial():
+    # mesmo stress do `python -m bench.threads`, numa rodada: threads forçadas sob o GIL,
+    # switch interval mínimo e memo pequeno para disputar caches e despejos
+    assert run(DEFAULT_PATH, threads=8, rounds=1, chunk_size=2, switch=1e-6) == []
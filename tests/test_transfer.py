@@ -0,0 +1,35 @@
+import os
+from pathlib import Path
+
+from conftest import SRC
+
+import pytest
+
+from service import analyze_path
+
+SHM = Path("/dev/shm")
+pytestmark = pytest.mark.skipif(not SHM.is_dir(), reason="needs POSIX shared memory in /dev/shm")
+
+def _segments():
+    return {p.name for p in SHM.iterdir() if p.name.startswith(("psm_", "wnsm_"))}
+
+class Stop(Exception):
+    pass
+
+def test_shm_segments_released_when_on_file_raises():
+    before = _segments()
+    seen = []
+
+    def on_file(fa):
+        seen.append(fa)
+        if len(seen) == 3:
+            raise Stop
+
+    with pytest.raises(Stop):
+        analyze_path(SRC, workers=2, chunk_size=2, transfer="shm", on_file=on_file)
+    assert _segments() - before == set()
+
+def test_shm_results_match_pickle():
+    a = analyze_path(SRC / "astcore", workers=2, chunk_size=2, transfer="shm")
+    b = analyze_path(SRC / "astcore", workers=2, chunk_size=2, transfer="pickle")
+    assert [list(fa.nodes_json) for fa in a.files] == [list(fa.nodes_json) for fa in b.files]
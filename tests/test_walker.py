@@ -0,0 +1,46 @@
+import ast
+
+import pytest
+
+from astcore import PassRegistrationError
+from astcore.model import Ctx
+from astcore.pass_registry import REGISTRY, PassRegistry, PassSpec, register_pass
+from astcore.phase import Phase
+from astcore.walker import walk_module
+from pass_plugins.loader import load_pass_plugins
+
+SOURCE = "import abc\n\nclass A(abc.ABC):\n    def run(self): ...\n"
+
+def _registry_with(*extra: PassSpec) -> PassRegistry:
+    load_pass_plugins(["pass_plugins.builtin"])
+    registry = PassRegistry()
+    for phase in Phase:
+        for s in REGISTRY.get_for_phase(phase):
+            registry.register(s)
+    for s in extra:
+        registry.register(s)
+    return registry
+
+def test_post_pass_sees_enrich_batch_results():
+    seen = {}
+    def read(t, n, ctx):
+        seen[n.name] = (t.class_kind, t.naming_style)
+    registry = _registry_with(PassSpec(name="post_reader", fn=read, requires=(), phase=Phase.POST, node_types=(ast.ClassDef,)))
+    assert registry.plan(Phase.ENRICH).batch   # class_kind/naming_conventions são batch
+
+    tnodes = walk_module(ast.parse(SOURCE), Ctx(lines=SOURCE.splitlines()), strategy="recursive_pre", registry=registry)
+    assert seen == {"A": ("abstract", "PascalCase")}
+    assert next(t for t in tnodes if t.name == "A").class_kind == "abstract"
+
+def test_post_passes_run_in_exit_order():
+    order = []
+    registry = _registry_with(PassSpec(
+        name="post_order", fn=lambda t, n, ctx: order.append(type(n).__name__), requires=(),
+        phase=Phase.POST, node_types=(ast.ClassDef, ast.FunctionDef),
+    ))
+    walk_module(ast.parse(SOURCE), Ctx(lines=SOURCE.splitlines()), strategy="recursive_pre", registry=registry)
+    assert order == ["FunctionDef", "ClassDef"]
+
+def test_batch_pass_outside_enrich_or_post_is_rejected():
+    with pytest.raises(PassRegistrationError):
+        register_pass(name="pre_batch", phase=Phase.PRE, batch=True)(lambda items, ctx: None)